@@ -0,0 +1,32 @@
+"""Prefix indexes for the rule typeahead search
+
+Revision ID: 0b7d3a5e9f64
+Revises: 6f1c9e4a7b20
+Create Date: 2026-10-18 19:47:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d3a5e9f64'
+down_revision = '6f1c9e4a7b20'
+branch_labels = None
+depends_on = None
+
+# MySQL can only index TEXT columns by prefix
+INDEXED_COLUMNS = ('source_ip', 'destination_ip', 'source_host', 'destination_host')
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('firewall_rules')}
+    for column in INDEXED_COLUMNS:
+        name = f'ix_firewall_rules_{column}'
+        if name not in indexes:
+            op.create_index(name, 'firewall_rules', [column], mysql_length=64)
+
+
+def downgrade():
+    for column in reversed(INDEXED_COLUMNS):
+        op.drop_index(f'ix_firewall_rules_{column}', table_name='firewall_rules')
@@ -0,0 +1,39 @@
+"""Protocol and port ranges of rules, requests and templates
+
+Revision ID: 1c6a8e3b5f72
+Revises: 8e2f4c7a1d39
+Create Date: 2026-10-18 19:51:00.000000
+
+`flask index-addresses` fills the table for rows that predate it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c6a8e3b5f72'
+down_revision = '8e2f4c7a1d39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'service_ranges' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'service_ranges',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_type', sa.String(length=20), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('protocol', sa.String(length=10), nullable=False),
+        sa.Column('port_lo', sa.Integer(), nullable=False),
+        sa.Column('port_hi', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_service_ranges_owner', 'service_ranges', ['owner_type', 'owner_id'])
+    op.create_index('ix_service_ranges_range', 'service_ranges',
+                    ['owner_type', 'protocol', 'port_lo', 'port_hi'])
+
+
+def downgrade():
+    op.drop_table('service_ranges')
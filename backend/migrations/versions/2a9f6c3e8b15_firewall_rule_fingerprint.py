@@ -0,0 +1,28 @@
+"""Row fingerprint on firewall rules for the delta sync
+
+Revision ID: 2a9f6c3e8b15
+Revises: 7e4b1a9d3c62
+Create Date: 2026-10-18 19:36:00.000000
+
+Existing rules have no fingerprint, so the next sync rewrites each of them once.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a9f6c3e8b15'
+down_revision = '7e4b1a9d3c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('firewall_rules')}
+    if 'fingerprint' not in columns:
+        op.add_column('firewall_rules', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('firewall_rules') as batch_op:
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,30 @@
+"""Insert token on requests for reading back bulk-inserted ids
+
+Revision ID: 2f8d4b6a1e57
+Revises: 5a7c2e9f3b81
+Create Date: 2026-10-18 20:19:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8d4b6a1e57'
+down_revision = '5a7c2e9f3b81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'insert_batch' not in {column['name'] for column in inspector.get_columns('acl_requests')}:
+        op.add_column('acl_requests', sa.Column('insert_batch', sa.String(length=36), nullable=True))
+    if 'ix_acl_requests_insert_batch' not in {index['name'] for index in inspector.get_indexes('acl_requests')}:
+        op.create_index('ix_acl_requests_insert_batch', 'acl_requests', ['insert_batch'])
+
+
+def downgrade():
+    op.drop_index('ix_acl_requests_insert_batch', table_name='acl_requests')
+    with op.batch_alter_table('acl_requests') as batch_op:
+        batch_op.drop_column('insert_batch')
@@ -0,0 +1,36 @@
+"""Composite indexes for the keyset-paginated request listing
+
+Revision ID: 3b9e5f1d7a26
+Revises: 1c6a8e3b5f72
+Create Date: 2026-10-18 19:58:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e5f1d7a26'
+down_revision = '1c6a8e3b5f72'
+branch_labels = None
+depends_on = None
+
+# Every listing filter followed by the (created_at, id) keyset sort
+INDEXES = {
+    'ix_acl_requests_created': ['created_at', 'id'],
+    'ix_acl_requests_status_created': ['status', 'created_at', 'id'],
+    'ix_acl_requests_requester_created': ['requester', 'created_at', 'id'],
+    'ix_acl_requests_scope_created': ['system_type', 'category', 'created_at', 'id'],
+}
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('acl_requests')}
+    for name, columns in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'acl_requests', columns)
+
+
+def downgrade():
+    for name in reversed(list(INDEXES)):
+        op.drop_index(name, table_name='acl_requests')
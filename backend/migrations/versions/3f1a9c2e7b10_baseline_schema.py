@@ -0,0 +1,108 @@
+"""Baseline schema: requests, firewall rules, users and templates
+
+Revision ID: 3f1a9c2e7b10
+Revises:
+Create Date: 2026-10-18 19:30:00.000000
+
+Deployments created before migrations existed already have these tables
+from db.create_all(); tables that exist are left alone, so upgrading such
+a database needs no stamp.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2e7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tables = existing_tables()
+
+    if 'acl_requests' not in tables:
+        op.create_table(
+            'acl_requests',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('requester', sa.String(length=100), nullable=False),
+            sa.Column('system_type', sa.String(length=100), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('source_ip', sa.Text(), nullable=False),
+            sa.Column('source_host', sa.Text(), nullable=False),
+            sa.Column('destination_ip', sa.Text(), nullable=False),
+            sa.Column('destination_host', sa.Text(), nullable=False),
+            sa.Column('service', sa.Text(), nullable=False),
+            sa.Column('reason', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('template_id', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'firewall_rules' not in tables:
+        op.create_table(
+            'firewall_rules',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('system_type', sa.String(length=255), nullable=True),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('source_ip', sa.Text(), nullable=True),
+            sa.Column('source_host', sa.Text(), nullable=True),
+            sa.Column('destination_ip', sa.Text(), nullable=True),
+            sa.Column('destination_host', sa.Text(), nullable=True),
+            sa.Column('service', sa.Text(), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'Users' not in tables:
+        op.create_table(
+            'Users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=120), nullable=False),
+            sa.Column('name', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password', sa.String(length=255), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('role', sa.String(length=45), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'templates' not in tables:
+        op.create_table(
+            'templates',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('template_name', sa.String(length=100), nullable=False),
+            sa.Column('requester', sa.String(length=100), nullable=True),
+            sa.Column('system_type', sa.String(length=100), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('source_ip', sa.Text(), nullable=False),
+            sa.Column('source_host', sa.Text(), nullable=False),
+            sa.Column('destination_ip', sa.Text(), nullable=False),
+            sa.Column('destination_host', sa.Text(), nullable=False),
+            sa.Column('service', sa.Text(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('action', sa.String(length=20), nullable=True),
+            sa.Column('created_by', sa.String(length=50), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('rule_index', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('templates')
+    op.drop_table('Users')
+    op.drop_table('firewall_rules')
+    op.drop_table('acl_requests')
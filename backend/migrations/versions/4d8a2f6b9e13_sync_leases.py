@@ -0,0 +1,35 @@
+"""Sync leases for electing a single sync runner
+
+Revision ID: 4d8a2f6b9e13
+Revises: 9b3e7d2f1c48
+Create Date: 2026-10-18 19:43:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8a2f6b9e13'
+down_revision = '9b3e7d2f1c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'sync_leases' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'sync_leases',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_leases')
@@ -0,0 +1,51 @@
+"""Reviewer comments and full-text search text on requests
+
+Revision ID: 5a7c2e9f3b81
+Revises: 3b9e5f1d7a26
+Create Date: 2026-10-18 20:00:00.000000
+
+`flask index-search` fills the search text of requests that predate it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c2e9f3b81'
+down_revision = '3b9e5f1d7a26'
+branch_labels = None
+depends_on = None
+
+
+def is_mysql():
+    return op.get_bind().dialect.name == 'mysql'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('acl_requests')}
+    if 'comments' not in columns:
+        op.add_column('acl_requests', sa.Column('comments', sa.JSON(), nullable=True))
+    if 'search_text' not in columns:
+        op.add_column('acl_requests', sa.Column('search_text', sa.Text(), nullable=True))
+    indexes = {index['name'] for index in inspector.get_indexes('acl_requests')}
+    if is_mysql() and 'ix_acl_requests_search_text' not in indexes:
+        op.create_index('ix_acl_requests_search_text', 'acl_requests', ['search_text'],
+                        mysql_prefix='FULLTEXT')
+
+    if 'search_state' not in inspector.get_table_names():
+        op.create_table(
+            'search_state',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('generation', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('search_state')
+    if is_mysql():
+        op.drop_index('ix_acl_requests_search_text', table_name='acl_requests')
+    with op.batch_alter_table('acl_requests') as batch_op:
+        batch_op.drop_column('search_text')
+        batch_op.drop_column('comments')
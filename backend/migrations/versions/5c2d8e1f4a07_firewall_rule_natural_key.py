@@ -0,0 +1,44 @@
+"""Natural key on firewall rules for the bulk upsert
+
+Revision ID: 5c2d8e1f4a07
+Revises: 3f1a9c2e7b10
+Create Date: 2026-10-18 19:32:00.000000
+
+The column starts out empty on existing rules; the next sync fills it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2d8e1f4a07'
+down_revision = '3f1a9c2e7b10'
+branch_labels = None
+depends_on = None
+
+
+def has_column(table, column):
+    return any(c['name'] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def has_unique(table, column):
+    """Whether the column is unique on its own, under whatever name create_all gave it"""
+    inspector = sa.inspect(op.get_bind())
+    return any(constraint['column_names'] == [column]
+               for constraint in inspector.get_unique_constraints(table)) or \
+        any(index['column_names'] == [column] and index['unique']
+            for index in inspector.get_indexes(table))
+
+
+def upgrade():
+    if not has_column('firewall_rules', 'natural_key'):
+        op.add_column('firewall_rules', sa.Column('natural_key', sa.String(length=64), nullable=True))
+    if not has_unique('firewall_rules', 'natural_key'):
+        # SQLite cannot add a constraint in place, so batch mode rebuilds the table there
+        with op.batch_alter_table('firewall_rules') as batch_op:
+            batch_op.create_unique_constraint('uq_firewall_rules_natural_key', ['natural_key'])
+
+
+def downgrade():
+    with op.batch_alter_table('firewall_rules') as batch_op:
+        batch_op.drop_column('natural_key')
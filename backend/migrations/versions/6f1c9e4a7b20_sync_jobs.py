@@ -0,0 +1,41 @@
+"""Background sync jobs for /api/force-sync
+
+Revision ID: 6f1c9e4a7b20
+Revises: 4d8a2f6b9e13
+Create Date: 2026-10-18 19:44:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1c9e4a7b20'
+down_revision = '4d8a2f6b9e13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'sync_jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'sync_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('requested_by', sa.String(length=120), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('active_key', sa.String(length=20), nullable=True),
+        sa.Column('stage', sa.String(length=20), nullable=True),
+        sa.Column('rows_processed', sa.Integer(), nullable=True),
+        sa.Column('outcome', sa.String(length=50), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('active_key')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_jobs')
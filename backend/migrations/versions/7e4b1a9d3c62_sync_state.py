@@ -0,0 +1,38 @@
+"""Sync state for conditional workbook fetches
+
+Revision ID: 7e4b1a9d3c62
+Revises: 5c2d8e1f4a07
+Create Date: 2026-10-18 19:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e4b1a9d3c62'
+down_revision = '5c2d8e1f4a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'sync_state' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'sync_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('last_modified', sa.String(length=100), nullable=True),
+        sa.Column('content_sha256', sa.String(length=64), nullable=True),
+        sa.Column('last_status', sa.String(length=50), nullable=True),
+        sa.Column('last_checked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
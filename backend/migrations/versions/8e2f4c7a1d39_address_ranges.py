@@ -0,0 +1,39 @@
+"""Integer address ranges of rules and requests
+
+Revision ID: 8e2f4c7a1d39
+Revises: 0b7d3a5e9f64
+Create Date: 2026-10-18 19:50:00.000000
+
+`flask index-addresses` fills the table for rows that predate it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f4c7a1d39'
+down_revision = '0b7d3a5e9f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'address_ranges' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'address_ranges',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_type', sa.String(length=20), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('side', sa.String(length=12), nullable=False),
+        sa.Column('start_int', sa.BigInteger(), nullable=False),
+        sa.Column('end_int', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_address_ranges_owner', 'address_ranges', ['owner_type', 'owner_id'])
+    op.create_index('ix_address_ranges_range', 'address_ranges',
+                    ['owner_type', 'side', 'start_int', 'end_int'])
+
+
+def downgrade():
+    op.drop_table('address_ranges')
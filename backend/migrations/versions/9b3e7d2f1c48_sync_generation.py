@@ -0,0 +1,39 @@
+"""Sync generations for the mark-and-sweep of removed rules
+
+Revision ID: 9b3e7d2f1c48
+Revises: 2a9f6c3e8b15
+Create Date: 2026-10-18 19:36:30.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e7d2f1c48'
+down_revision = '2a9f6c3e8b15'
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'sync_generation' not in existing_columns('firewall_rules'):
+        op.add_column('firewall_rules', sa.Column('sync_generation', sa.Integer(), nullable=True))
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('firewall_rules')}
+    if 'ix_firewall_rules_sync_generation' not in indexes:
+        op.create_index('ix_firewall_rules_sync_generation', 'firewall_rules', ['sync_generation'])
+    if 'generation' not in existing_columns('sync_state'):
+        op.add_column('sync_state',
+                      sa.Column('generation', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('sync_state') as batch_op:
+        batch_op.drop_column('generation')
+    op.drop_index('ix_firewall_rules_sync_generation', table_name='firewall_rules')
+    with op.batch_alter_table('firewall_rules') as batch_op:
+        batch_op.drop_column('sync_generation')
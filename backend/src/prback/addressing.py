@@ -0,0 +1,200 @@
+'''This module contains the helpers used to reason about rule addresses and services as numbers
+rather than strings: parsing the comma-separated address lists that validate_ip accepts into
+integer prefixes, a binary prefix trie that answers longest-prefix-match lookups in at most 32
+steps, and parsing the service lists that validate_service accepts into (protocol, port_lo,
+port_hi) ranges.
+'''
+import re
+
+IPV4_PATTERN = re.compile(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})(?:/(\d{1,2}))?$')
+
+# Wildcards that match everything and therefore say nothing about a specific address
+WILDCARD_ADDRESSES = frozenset(['any', 'all', 'subnet', '0.0.0.0'])
+
+# Named services accepted by validate_service and the (protocol, port_lo, port_hi) they stand for
+KNOWN_SERVICES = {
+    'http': (('tcp', 80, 80),),
+    'https': (('tcp', 443, 443),),
+    'ssh': (('tcp', 22, 22),),
+    'ftp': (('tcp', 20, 21),),
+    'ftps': (('tcp', 989, 990),),
+    'sftp': (('tcp', 22, 22),),
+    'smtp': (('tcp', 25, 25),),
+    'smtps': (('tcp', 465, 465),),
+    'pop3': (('tcp', 110, 110),),
+    'pop3s': (('tcp', 995, 995),),
+    'imap': (('tcp', 143, 143),),
+    'imaps': (('tcp', 993, 993),),
+    'dns': (('tcp', 53, 53), ('udp', 53, 53)),
+    'dhcp': (('udp', 67, 68),),
+    'snmp': (('udp', 161, 162),),
+    'ldap': (('tcp', 389, 389), ('udp', 389, 389)),
+    'ldaps': (('tcp', 636, 636),),
+    'telnet': (('tcp', 23, 23),),
+    'rdp': (('tcp', 3389, 3389), ('udp', 3389, 3389)),
+    'vnc': (('tcp', 5900, 5900),),
+    'nfs': (('tcp', 2049, 2049), ('udp', 2049, 2049)),
+    'smb': (('tcp', 445, 445),),
+    'mysql': (('tcp', 3306, 3306),),
+    'postgres': (('tcp', 5432, 5432),),
+    'mongodb': (('tcp', 27017, 27017),),
+    'redis': (('tcp', 6379, 6379),),
+    'kerberos': (('tcp', 88, 88), ('udp', 88, 88)),
+    'ntp': (('udp', 123, 123),),
+    'syslog': (('udp', 514, 514),),
+    'rsync': (('tcp', 873, 873),),
+}
+
+# Protocols accepted without a port; icmp ranges over ICMP types instead of ports
+PORTLESS_PROTOCOLS = {
+    'icmp': ('icmp', 0, 255),
+    'ip': ('any', 0, 65535),
+    'gre': ('gre', 0, 65535),
+    'esp': ('esp', 0, 65535),
+    'ah': ('ah', 0, 65535),
+    'any': ('any', 0, 65535),
+    'all': ('any', 0, 65535),
+}
+
+# Protocols whose ranges are ports; icmp ranges are ICMP types and gre/esp/ah have no ports
+PORT_PROTOCOLS = frozenset(['tcp', 'udp'])
+
+# Port range of a protocol-wide 'any' (any, all, ip)
+FULL_PORT_RANGE = (0, 65535)
+
+# protocol/port or protocol/lo-hi, and a bare port or lo-hi that applies to any protocol
+PROTOCOL_PORT_PATTERN = re.compile(r'^(tcp|udp|icmp)/(\d+)(?:-(\d+))?$')
+PORT_PATTERN = re.compile(r'^(\d+)(?:-(\d+))?$')
+
+
+def parse_ipv4_prefix(token):
+    """Parse 'a.b.c.d' or 'a.b.c.d/n' into (network_int, prefix_len), or None if it is not one.
+
+    Host bits below the prefix are cleared, so 10.1.2.5/24 becomes 10.1.2.0/24.
+    """
+    match = IPV4_PATTERN.match(token.strip())
+    if not match:
+        return None
+
+    address = 0
+    for octet in match.groups()[:4]:
+        if len(octet) > 1 and octet[0] == '0':
+            return None
+        value = int(octet)
+        if value > 255:
+            return None
+        address = (address << 8) | value
+
+    prefix_len = 32 if match.group(5) is None else int(match.group(5))
+    if prefix_len > 32:
+        return None
+
+    mask = (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+    return address & mask, prefix_len
+
+
+def parse_ipv4_prefixes(value, skip_wildcards=True):
+    """Parse a comma-separated address list into (network_int, prefix_len) pairs.
+
+    Wildcards (any/all/subnet/0.0.0.0 and /0 prefixes) are skipped unless
+    ``skip_wildcards`` is False, in which case they become 0.0.0.0/0.
+    Tokens that are not IPv4 addresses or prefixes are ignored.
+    """
+    prefixes = []
+    for token in str(value or '').split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if token.lower() in WILDCARD_ADDRESSES:
+            if not skip_wildcards:
+                prefixes.append((0, 0))
+            continue
+        prefix = parse_ipv4_prefix(token)
+        if prefix is None:
+            continue
+        if prefix[1] == 0 and skip_wildcards:
+            continue
+        prefixes.append(prefix)
+    return prefixes
+
+
+def prefix_range(network, prefix_len):
+    """First and last address, as integers, covered by a prefix"""
+    return network, network | (0xFFFFFFFF >> prefix_len)
+
+
+def format_prefix(network, prefix_len):
+    """Render an integer prefix as 'a.b.c.d/n'"""
+    octets = '.'.join(str((network >> shift) & 0xFF) for shift in (24, 16, 8, 0))
+    return f"{octets}/{prefix_len}"
+
+
+class PrefixTrie:
+    """Binary trie over IPv4 prefixes; each node is [zero_child, one_child, values]"""
+
+    def __init__(self):
+        self.root = [None, None, None]
+
+    def insert(self, network, prefix_len, value):
+        node = self.root
+        for depth in range(prefix_len):
+            bit = (network >> (31 - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            node[2] = []
+        node[2].append(value)
+
+    def covering_matches(self, network, prefix_len=32):
+        """Return [(matched_prefix_len, values), ...] of every prefix covering the query,
+        least specific first.
+
+        A query prefix is only covered by prefixes at most as long as itself.
+        """
+        node = self.root
+        matches = []
+        if node[2]:
+            matches.append((0, node[2]))
+        for depth in range(prefix_len):
+            node = node[(network >> (31 - depth)) & 1]
+            if node is None:
+                break
+            if node[2]:
+                matches.append((depth + 1, node[2]))
+        return matches
+
+
+def parse_service_ranges(value):
+    """Parse a comma-separated service list into unique (protocol, port_lo, port_hi) ranges.
+
+    Bare ports and ranges, 'ip' and 'any' use protocol 'any'. Tokens that are
+    not services, and ports outside 0-65535, are ignored.
+    """
+    ranges = []
+    for token in str(value or '').split(','):
+        token = token.strip().lower()
+        if not token:
+            continue
+
+        if token in KNOWN_SERVICES:
+            ranges.extend(KNOWN_SERVICES[token])
+            continue
+        if token in PORTLESS_PROTOCOLS:
+            ranges.append(PORTLESS_PROTOCOLS[token])
+            continue
+
+        match = PROTOCOL_PORT_PATTERN.match(token)
+        if match:
+            protocol, port_lo, port_hi = match.group(1), int(match.group(2)), match.group(3)
+        else:
+            match = PORT_PATTERN.match(token)
+            if not match:
+                continue
+            protocol, port_lo, port_hi = 'any', int(match.group(1)), match.group(2)
+
+        port_hi = port_lo if port_hi is None else int(port_hi)
+        if port_lo <= port_hi <= 65535:
+            ranges.append((protocol, port_lo, port_hi))
+
+    return list(dict.fromkeys(ranges))
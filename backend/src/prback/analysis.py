@@ -0,0 +1,221 @@
+'''This module finds redundant rules in the synced catalog. Each rule is normalized into boxes of
+(source prefix, destination prefix, protocol, port range). Rules with identical boxes are
+duplicates. A rule whose every box is covered by another rule of the same system type is either
+shadowed (the covering rule comes first, so this one is never hit) or contained (a later,
+broader rule makes it redundant).
+
+IPv4 prefixes either nest or are disjoint, so the rules whose source covers a prefix are the ones
+filed under one of its ancestors. Rules are bucketed by source prefix, then destination prefix,
+then protocol, with port ranges sorted by their lower bound under a tree of their upper bounds
+(PortRangeTree). A box is checked against the ancestors at the prefix lengths actually in use,
+and within a bucket only the tree nodes that can hold a covering range are visited, so a bucket
+shared by many rules costs O((k + 1) log n) for k covering ranges instead of a scan.
+
+Two limits are reported with every result (see REPORT_LIMITATIONS): coverage is only found when a
+single other rule covers every box, and rule order is rule id order, since the catalog does not
+keep the order rules are evaluated in.
+'''
+from bisect import bisect_right
+from collections import defaultdict
+
+from .addressing import parse_ipv4_prefixes, parse_service_ranges
+from .catalog import get_snapshot_entry, load_rules
+
+# Covering rule ids listed per finding at most
+RELATED_RULE_LIMIT = 10
+
+# What the findings cannot tell, shipped with the report and its export
+REPORT_LIMITATIONS = (
+    "A rule is only reported as shadowed or contained when one other rule covers all of it; "
+    "rules covered jointly by several rules are not reported.",
+    "Shadowed and contained are decided by rule id, in sync order, as the catalog does not store "
+    "the order the firewall evaluates rules in; check the device order before removing a rule.",
+)
+
+# Network mask for each prefix length
+PREFIX_MASKS = [(0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF for length in range(33)]
+
+
+def get_redundancy_report():
+    """Return the redundancy report for the current catalog version"""
+    return get_snapshot_entry(
+        "redundancy_report", lambda last_synced_at: analyze_redundancy(load_rules()))
+
+
+def rule_boxes(rule):
+    """Normalized, sorted boxes of a rule, or None when a dimension does not parse"""
+    sources = set(parse_ipv4_prefixes(rule.source_ip, skip_wildcards=False))
+    destinations = set(parse_ipv4_prefixes(rule.destination_ip, skip_wildcards=False))
+    services = parse_service_ranges(rule.service)
+    if not (sources and destinations and services):
+        return None
+    return tuple(sorted(
+        (source, destination, service)
+        for source in sources for destination in destinations for service in services))
+
+
+class PortRangeTree:
+    """Port ranges of one bucket sorted by lower bound, with a max tree over their upper bounds"""
+
+    def __init__(self, entries):
+        # entries: [(port_lo, port_hi, rule_id)] sorted
+        self.entries = entries
+        self.lower_bounds = [entry[0] for entry in entries]
+        self.size = 1
+        while self.size < len(entries):
+            self.size *= 2
+        # Leaves hold each range's port_hi; every inner node the max of its children
+        self.max_upper = [-1] * (2 * self.size)
+        for position, entry in enumerate(entries):
+            self.max_upper[self.size + position] = entry[1]
+        for node in range(self.size - 1, 0, -1):
+            self.max_upper[node] = max(self.max_upper[2 * node], self.max_upper[2 * node + 1])
+
+    def covering(self, port_lo, port_hi):
+        """Rule ids of the ranges with lower bound <= port_lo and upper bound >= port_hi"""
+        # Only ranges starting at or below port_lo can cover it
+        end = bisect_right(self.lower_bounds, port_lo)
+        rule_ids = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, first, last = stack.pop()
+            if first >= end or self.max_upper[node] < port_hi:
+                continue
+            if node >= self.size:
+                rule_ids.append(self.entries[node - self.size][2])
+                continue
+            middle = (first + last) // 2
+            stack.append((2 * node + 1, middle, last))
+            stack.append((2 * node, first, middle))
+        return rule_ids
+
+
+class CoverIndex:
+    """Boxes of one system type, bucketed for covering lookups"""
+
+    def __init__(self):
+        # source prefix -> destination prefix -> protocol -> [(port_lo, port_hi, rule_id)]
+        self.buckets = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.source_lengths = set()
+        self.destination_lengths = defaultdict(set)
+        self.port_trees = {}
+
+    def add(self, rule_id, boxes):
+        for source, destination, (protocol, port_lo, port_hi) in boxes:
+            self.buckets[source][destination][protocol].append((port_lo, port_hi, rule_id))
+            self.source_lengths.add(source[1])
+            self.destination_lengths[source].add(destination[1])
+
+    def freeze(self):
+        """Sort every port list into its PortRangeTree"""
+        self.source_lengths = sorted(self.source_lengths)
+        for source, destinations in self.buckets.items():
+            self.destination_lengths[source] = sorted(self.destination_lengths[source])
+            for destination, protocols in destinations.items():
+                for protocol, entries in protocols.items():
+                    entries.sort()
+                    self.port_trees[(source, destination, protocol)] = PortRangeTree(entries)
+
+    def covering(self, box):
+        """Ids of rules with a box covering this one"""
+        source, destination, (protocol, port_lo, port_hi) = box
+        protocols = ('any',) if protocol == 'any' else (protocol, 'any')
+        rule_ids = set()
+
+        for source_length in self.source_lengths:
+            if source_length > source[1]:
+                break
+            source_key = (source[0] & PREFIX_MASKS[source_length], source_length)
+            destinations = self.buckets.get(source_key)
+            if not destinations:
+                continue
+            for destination_length in self.destination_lengths[source_key]:
+                if destination_length > destination[1]:
+                    break
+                destination_key = (destination[0] & PREFIX_MASKS[destination_length],
+                                   destination_length)
+                by_protocol = destinations.get(destination_key)
+                if not by_protocol:
+                    continue
+                for candidate_protocol in protocols:
+                    if not by_protocol.get(candidate_protocol):
+                        continue
+                    tree = self.port_trees[(source_key, destination_key, candidate_protocol)]
+                    rule_ids.update(tree.covering(port_lo, port_hi))
+        return rule_ids
+
+
+def analyze_redundancy(rules):
+    """Classify duplicate, shadowed and contained rules; rules are taken in id order"""
+    rules = sorted(rules, key=lambda rule: rule.id)
+    by_id = {rule.id: rule for rule in rules}
+
+    boxes_by_rule = {}
+    skipped = 0
+    indexes = defaultdict(CoverIndex)
+    for rule in rules:
+        boxes = rule_boxes(rule)
+        if boxes is None:
+            skipped += 1
+            continue
+        boxes_by_rule[rule.id] = boxes
+        indexes[rule.system_type or ''].add(rule.id, boxes)
+    for index in indexes.values():
+        index.freeze()
+
+    # Identical boxes within a system type are duplicates of the first such rule
+    groups = defaultdict(list)
+    for rule_id, boxes in boxes_by_rule.items():
+        groups[(by_id[rule_id].system_type or '', boxes)].append(rule_id)
+    identical = {}
+    for rule_ids in groups.values():
+        for rule_id in rule_ids:
+            identical[rule_id] = rule_ids
+
+    findings = []
+    for rule_id, boxes in boxes_by_rule.items():
+        rule = by_id[rule_id]
+        finding = {
+            "rule_id": rule_id,
+            "system_type": rule.system_type,
+            "category": rule.category,
+            "source_ip": rule.source_ip,
+            "destination_ip": rule.destination_ip,
+            "service": rule.service,
+        }
+
+        twins = identical[rule_id]
+        if twins[0] != rule_id:
+            findings.append({**finding, "kind": "duplicate", "related_rule_id": twins[0],
+                             "related_rule_ids": twins[:RELATED_RULE_LIMIT]})
+            continue
+
+        # A covering rule has to cover every box of this one
+        index = indexes[rule.system_type or '']
+        covering = None
+        for box in boxes:
+            box_covering = index.covering(box)
+            covering = box_covering if covering is None else covering & box_covering
+            if not covering:
+                break
+        covering = sorted(covering.difference(twins)) if covering else []
+        if not covering:
+            continue
+
+        kind = "shadowed" if covering[0] < rule_id else "contained"
+        findings.append({**finding, "kind": kind, "related_rule_id": covering[0],
+                         "related_rule_ids": covering[:RELATED_RULE_LIMIT]})
+
+    findings.sort(key=lambda finding: finding["rule_id"])
+    summary = {"duplicate": 0, "shadowed": 0, "contained": 0}
+    for finding in findings:
+        summary[finding["kind"]] += 1
+
+    return {
+        "rules_analysed": len(boxes_by_rule),
+        "rules_skipped": skipped,
+        "summary": summary,
+        "findings": findings,
+        "limitations": list(REPORT_LIMITATIONS),
+    }
+
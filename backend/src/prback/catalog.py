@@ -0,0 +1,295 @@
+'''This module holds the in-process views of the firewall rule catalog: the form options
+payloads served by /form-options and /api/mysql-options, and the lookup index behind
+/api/auto-populate. All of them are derived from firewall_rules, which only the Google Sheets
+sync writes, so each is built once per catalog version and swapped in whole when the version
+changes. The catalog version comes from the sync state row, so every worker notices a new sync
+on its next request.
+'''
+import hashlib
+import json
+import logging
+import threading
+
+from .models import FirewallRule, SyncState
+from .main import looks_like_ip, SYNC_STATE_NAME
+from .addressing import PrefixTrie, parse_ipv4_prefixes, format_prefix
+
+logger = logging.getLogger(__name__)
+
+# Everything built for the current catalog version, keyed by entry name, and one build lock
+# per entry; snapshot_lock only guards swapping these dicts, never a build
+snapshot_lock = threading.Lock()
+snapshot = {"version": None, "entries": {}, "build_locks": {}}
+
+# Rule columns kept in each RuleLookup entry
+LOOKUP_FIELDS = ('id', 'source_ip', 'source_host', 'destination_ip', 'destination_host',
+                 'service', 'description')
+
+
+def catalog_version():
+    """Return the current catalog version and the time of the last successful sync"""
+    state = SyncState.query.filter_by(name=SYNC_STATE_NAME).first()
+    if not state:
+        return "0:", None
+    last_synced_at = state.last_synced_at
+    version = f"{state.generation or 0}:{last_synced_at.isoformat() if last_synced_at else ''}"
+    return version, last_synced_at
+
+
+def get_snapshot_entry(name, build):
+    """Return the named entry for the current catalog version, building it on first use.
+
+    ``build(last_synced_at)`` is called at most once per version and entry; the
+    previous version's entries are dropped as a whole when the version changes.
+    """
+    version, last_synced_at = catalog_version()
+
+    with snapshot_lock:
+        if snapshot["version"] != version:
+            snapshot["version"] = version
+            snapshot["entries"] = {}
+            snapshot["build_locks"] = {}
+
+        entries = snapshot["entries"]
+        entry = entries.get(name)
+        if entry is not None:
+            return entry
+        build_lock = snapshot["build_locks"].setdefault(name, threading.Lock())
+
+    # Only callers of this entry wait for its build; a build that finishes after the
+    # version moved on lands in the old, already replaced entries dict
+    with build_lock:
+        entry = entries.get(name)
+        if entry is None:
+            entry = build(last_synced_at)
+            entries[name] = entry
+            logger.info(f"📦 Built {name} for catalog version {version}")
+
+    return entry
+
+
+def get_options_payload(name):
+    """Return (body, etag) for the named options payload"""
+    def build(last_synced_at):
+        payload = PAYLOAD_BUILDERS[name](load_rules())
+        payload["last_sync"] = last_synced_at.isoformat() if last_synced_at else None
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return body, hashlib.sha256(body).hexdigest()
+
+    return get_snapshot_entry(name, build)
+
+
+def get_rule_lookup():
+    """Return the RuleLookup for the current catalog version"""
+    return get_snapshot_entry("rule_lookup", lambda last_synced_at: RuleLookup(load_rules()))
+
+
+def load_rules():
+    """Load every firewall rule in a stable order"""
+    return FirewallRule.query.order_by(FirewallRule.id).all()
+
+
+def unique_categories(all_rules):
+    """Unique (category, system_type) entries in first-seen order"""
+    categories = []
+    seen = set()
+    for rule in all_rules:
+        if rule.category and rule.system_type:
+            key = (rule.category, rule.system_type)
+            if key not in seen:
+                seen.add(key)
+                categories.append({
+                    'value': rule.category,
+                    'system_type': rule.system_type,
+                    'display': rule.category
+                })
+    return categories
+
+
+def build_form_options(all_rules):
+    """Payload for /form-options"""
+    source_ips = []
+    destination_ips = []
+
+    for rule in all_rules:
+        if rule.source_ip and rule.source_ip.strip():
+            source_ips.append({
+                "value": rule.source_ip,
+                "host": rule.source_host or "",
+                "system_type": rule.system_type or "",
+                "category": rule.category or "",
+                "service": rule.service or "",
+                "description": rule.description or "",
+                "is_valid_ip": looks_like_ip(rule.source_ip)
+            })
+
+        if rule.destination_ip and rule.destination_ip.strip():
+            destination_ips.append({
+                "value": rule.destination_ip,
+                "host": rule.destination_host or "",
+                "system_type": rule.system_type or "",
+                "category": rule.category or "",
+                "service": rule.service or "",
+                "description": rule.description or "",
+                "is_valid_ip": looks_like_ip(rule.destination_ip)
+            })
+
+    return {
+        "system_types": sorted(set(rule.system_type for rule in all_rules if rule.system_type)),
+        "categories": unique_categories(all_rules),
+        "source_ips": source_ips,
+        "destination_ips": destination_ips,
+    }
+
+
+def build_mysql_options(all_rules):
+    """Payload for /api/mysql-options"""
+    system_types = sorted(set(rule.system_type for rule in all_rules if rule.system_type))
+
+    # Ensure Template and Others are present
+    if "Template" not in system_types:
+        system_types.append("Template")
+    if "Others" not in system_types:
+        system_types.append("Others")
+
+    source_ips = []
+    destination_ips = []
+
+    for rule in all_rules:
+        # Only include rules that have valid source IPs
+        if rule.source_ip and rule.source_ip.strip():
+            source_ips.append({
+                "id": rule.id,
+                "value": rule.source_ip,
+                "host": rule.source_host or "",
+                "system_type": rule.system_type or "",
+                "category": rule.category or "",
+                "service": rule.service or "",
+                "description": rule.description or "",
+                "is_valid_ip": looks_like_ip(rule.source_ip),
+                "corresponding_destination_ip": rule.destination_ip or "",
+                "corresponding_destination_host": rule.destination_host or "",
+                "corresponding_service": rule.service or "",
+                "corresponding_description": rule.description or ""
+            })
+
+        # Only include rules that have valid destination IPs
+        if rule.destination_ip and rule.destination_ip.strip():
+            destination_ips.append({
+                "id": rule.id,
+                "value": rule.destination_ip,
+                "host": rule.destination_host or "",
+                "system_type": rule.system_type or "",
+                "category": rule.category or "",
+                "service": rule.service or "",
+                "description": rule.description or "",
+                "is_valid_ip": looks_like_ip(rule.destination_ip),
+                "corresponding_source_ip": rule.source_ip or "",
+                "corresponding_source_host": rule.source_host or "",
+                "corresponding_service": rule.service or "",
+                "corresponding_description": rule.description or ""
+            })
+
+    return {
+        "system_types": system_types,
+        "categories": unique_categories(all_rules),
+        "source_ips": source_ips,
+        "destination_ips": destination_ips,
+        "services": sorted(set(rule.service for rule in all_rules if rule.service)),
+    }
+
+
+PAYLOAD_BUILDERS = {
+    "form_options": build_form_options,
+    "mysql_options": build_mysql_options,
+}
+
+
+class RuleLookup:
+    """Index of rules for auto-population, per side of the rule.
+
+    Exact matches are keyed by (system_type, category, ip); the first rule by
+    id wins, as the query it replaces returned. Every IPv4 address or prefix in
+    a rule's address list also goes into a prefix trie per (system_type,
+    category), for longest-prefix matches; a queried address list matches the
+    rules covering all of its addresses. Entries are tuples of LOOKUP_FIELDS.
+    """
+
+    def __init__(self, rules):
+        self.by_source_ip = {}
+        self.by_destination_ip = {}
+        self.source_prefixes = {}
+        self.destination_prefixes = {}
+        for rule in rules:
+            entry = tuple(getattr(rule, field) for field in LOOKUP_FIELDS)
+            scope = (rule.system_type, rule.category)
+            if rule.source_ip:
+                self.by_source_ip.setdefault(
+                    (rule.system_type, rule.category, rule.source_ip), entry)
+                self.add_prefixes(self.source_prefixes, scope, rule.source_ip, entry)
+            if rule.destination_ip:
+                self.by_destination_ip.setdefault(
+                    (rule.system_type, rule.category, rule.destination_ip), entry)
+                self.add_prefixes(self.destination_prefixes, scope, rule.destination_ip, entry)
+
+    @staticmethod
+    def add_prefixes(tries, scope, value, entry):
+        prefixes = set(parse_ipv4_prefixes(value))
+        if not prefixes:
+            return
+        trie = tries.get(scope)
+        if trie is None:
+            trie = tries[scope] = PrefixTrie()
+        for network, prefix_len in prefixes:
+            trie.insert(network, prefix_len, entry)
+
+    @staticmethod
+    def longest_prefix_match(tries, system_type, category, ip):
+        """Rules whose prefixes cover every address in ip, most specific first.
+
+        ip may be a comma-separated list; a rule qualifies when it covers each
+        address, and its specificity is that of its loosest cover. Returns
+        (matched prefixes, [rule, ...]) or None when no rule covers them all.
+        """
+        trie = tries.get((system_type, category))
+        queries = parse_ipv4_prefixes(ip)
+        if trie is None or not queries:
+            return None
+
+        # entry -> the length of its most specific prefix covering each query
+        candidates = None
+        for network, prefix_len in queries:
+            covering = {}
+            for matched_len, entries in trie.covering_matches(network, prefix_len):
+                for entry in entries:
+                    covering[entry] = matched_len
+            if candidates is None:
+                candidates = {entry: [matched_len] for entry, matched_len in covering.items()}
+            else:
+                candidates = {entry: lengths + [covering[entry]]
+                              for entry, lengths in candidates.items() if entry in covering}
+            if not candidates:
+                return None
+
+        best = max(min(lengths) for lengths in candidates.values())
+        entries = sorted((entry for entry, lengths in candidates.items() if min(lengths) == best),
+                         key=lambda entry: entry[0])
+        matched = ', '.join(
+            format_prefix(network & ((0xFFFFFFFF << (32 - matched_len)) & 0xFFFFFFFF), matched_len)
+            for (network, _), matched_len in zip(queries, candidates[entries[0]]))
+        return matched, [dict(zip(LOOKUP_FIELDS, entry)) for entry in entries]
+
+    def match_source_prefix(self, system_type, category, source_ip):
+        return self.longest_prefix_match(self.source_prefixes, system_type, category, source_ip)
+
+    def match_destination_prefix(self, system_type, category, destination_ip):
+        return self.longest_prefix_match(
+            self.destination_prefixes, system_type, category, destination_ip)
+
+    def match_source(self, system_type, category, source_ip):
+        entry = self.by_source_ip.get((system_type, category, source_ip))
+        return dict(zip(LOOKUP_FIELDS, entry)) if entry else None
+
+    def match_destination(self, system_type, category, destination_ip):
+        entry = self.by_destination_ip.get((system_type, category, destination_ip))
+        return dict(zip(LOOKUP_FIELDS, entry)) if entry else None
@@ -0,0 +1,137 @@
+'''This module compacts approved ACL requests into the smallest equivalent set of rules before
+they are pushed downstream. A request stands for every (source, destination, service) it lists,
+so two rules that agree on two of those dimensions can be merged by taking the union of the
+third. Sources are collapsed into covering CIDRs, then destinations, then port ranges are
+merged per protocol, and the passes repeat until no more rules merge. Every compacted rule
+keeps the ids of the requests it came from.
+'''
+import ipaddress
+from collections import defaultdict
+
+from .addressing import parse_ipv4_prefixes, parse_service_ranges, format_prefix, FULL_PORT_RANGE
+
+
+def collapse_prefixes(prefixes):
+    """Collapse (network, prefix_len) pairs into the fewest covering prefixes"""
+    networks = [ipaddress.IPv4Network((network, prefix_len)) for network, prefix_len in prefixes]
+    return tuple(sorted((int(network.network_address), network.prefixlen)
+                        for network in ipaddress.collapse_addresses(networks)))
+
+
+def merge_port_ranges(ranges):
+    """Merge overlapping or adjacent (protocol, port_lo, port_hi) ranges per protocol"""
+    merged = []
+    for protocol, port_lo, port_hi in sorted(ranges):
+        if merged and merged[-1][0] == protocol and port_lo <= merged[-1][2] + 1:
+            if port_hi > merged[-1][2]:
+                merged[-1] = (protocol, merged[-1][1], port_hi)
+            continue
+        merged.append((protocol, port_lo, port_hi))
+    return tuple(merged)
+
+
+def render_addresses(prefixes):
+    """Render prefixes as a comma list, single hosts without /32"""
+    if prefixes == ((0, 0),):
+        return 'any'
+    rendered = []
+    for network, prefix_len in prefixes:
+        text = format_prefix(network, prefix_len)
+        rendered.append(text[:-3] if prefix_len == 32 else text)
+    return ', '.join(rendered)
+
+
+def render_services(ranges):
+    """Render port ranges in the forms parse_service_ranges accepts.
+
+    A tcp or udp range renders as protocol/lo-hi, which validate_service does
+    not accept; it is the only form that keeps the range to one protocol.
+    """
+    rendered = []
+    for protocol, port_lo, port_hi in ranges:
+        ports = str(port_lo) if port_lo == port_hi else f"{port_lo}-{port_hi}"
+        if protocol == 'any':
+            rendered.append('any' if (port_lo, port_hi) == FULL_PORT_RANGE else ports)
+        elif protocol == 'icmp' and (port_lo, port_hi) == (0, 255):
+            rendered.append('icmp')
+        elif protocol in ('gre', 'esp', 'ah'):
+            rendered.append(protocol)
+        else:
+            rendered.append(f"{protocol}/{ports}")
+    return ', '.join(rendered)
+
+
+def merge_dimension(rules, dimension, combine):
+    """Merge rules that agree on everything but one dimension, combining that dimension"""
+    groups = defaultdict(list)
+    for rule in rules:
+        key = tuple(value for name, value in rule.items()
+                    if name not in (dimension, 'request_ids'))
+        groups[key].append(rule)
+
+    merged = []
+    for group in groups.values():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+        values = [value for rule in group for value in rule[dimension]]
+        merged.append({
+            **group[0],
+            dimension: combine(values),
+            'request_ids': sorted(request_id for rule in group for request_id in rule['request_ids']),
+        })
+    return merged
+
+
+def compact_requests(acl_requests):
+    """Compact ACL requests into rules with the ids of the requests behind each.
+
+    Requests whose addresses or service do not parse are passed through
+    unchanged, one rule each.
+    """
+    rules = []
+    passthrough = []
+    for acl_request in acl_requests:
+        sources = parse_ipv4_prefixes(acl_request.source_ip, skip_wildcards=False)
+        destinations = parse_ipv4_prefixes(acl_request.destination_ip, skip_wildcards=False)
+        services = parse_service_ranges(acl_request.service)
+        if not (sources and destinations and services):
+            passthrough.append({
+                'system_type': acl_request.system_type,
+                'category': acl_request.category,
+                'source_ip': acl_request.source_ip,
+                'destination_ip': acl_request.destination_ip,
+                'service': acl_request.service,
+                'request_ids': [acl_request.id],
+            })
+            continue
+        rules.append({
+            'system_type': acl_request.system_type,
+            'category': acl_request.category,
+            'sources': collapse_prefixes(sources),
+            'destinations': collapse_prefixes(destinations),
+            'services': merge_port_ranges(services),
+            'request_ids': [acl_request.id],
+        })
+
+    # Grouping by (system_type, category, service, destination) collapses the
+    # sources; each merge can make other rules identical, so repeat until stable
+    while True:
+        count = len(rules)
+        rules = merge_dimension(rules, 'sources', collapse_prefixes)
+        rules = merge_dimension(rules, 'destinations', collapse_prefixes)
+        rules = merge_dimension(rules, 'services', merge_port_ranges)
+        if len(rules) == count:
+            break
+
+    compacted = [{
+        'system_type': rule['system_type'],
+        'category': rule['category'],
+        'source_ip': render_addresses(rule['sources']),
+        'destination_ip': render_addresses(rule['destinations']),
+        'service': render_services(rule['services']),
+        'request_ids': rule['request_ids'],
+    } for rule in rules] + passthrough
+    compacted.sort(key=lambda rule: (rule['system_type'] or '', rule['category'] or '',
+                                     rule['request_ids'][0]))
+    return compacted
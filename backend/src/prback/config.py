@@ -5,11 +5,13 @@ initialize the Flask app and register blueprints for different routes.
 The configuration values are loaded from environment variables, allowing for flexibility across 
 different deployment environments (development, staging, production).
 '''
+import hmac
 import os
+import time
 import click
 import logging
 from werkzeug.security import generate_password_hash
-from flask import Flask, request
+from flask import Flask, Response, g, request
 from .extensions import db, migrate, cors, limiter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,7 +19,28 @@ logger = logging.getLogger(__name__)
 # Google Sheets Configuration
 GOOGLE_SHEETS = {
     'MAIN_SHEET': os.getenv('GOOGLE_SHEETS_URL', ''),
-    'SYNC_INTERVAL': 300
+    'SYNC_INTERVAL': 300,
+    # Rows per multi-row INSERT ... ON DUPLICATE KEY UPDATE statement
+    'UPSERT_CHUNK_SIZE': int(os.getenv('SYNC_UPSERT_CHUNK_SIZE', 1000)),
+    # Worker processes for sheet parsing; 0 or 1 parses sheets serially
+    'PARSE_WORKERS': int(os.getenv('SYNC_PARSE_WORKERS', 0)),
+    # Seconds a worker may hold the cluster-wide sync lease before it expires
+    'LEASE_TTL': int(os.getenv('SYNC_LEASE_TTL', 3600))
+}
+
+# ACL request submission
+ACL_REQUESTS = {
+    # Rows per Core INSERT statement on the bulk submission paths
+    'BULK_INSERT_CHUNK_SIZE': int(os.getenv('BULK_INSERT_CHUNK_SIZE', 1000)),
+    # Lines validated and committed together when streaming NDJSON submissions
+    'STREAM_BATCH_SIZE': int(os.getenv('BULK_STREAM_BATCH_SIZE', 500)),
+    # Memoized verdicts per distinct address token, service token and description
+    'VALIDATION_CACHE_SIZE': int(os.getenv('VALIDATION_CACHE_SIZE', 8192)),
+}
+
+# Prometheus metrics; /metrics is disabled until a scrape token is set
+METRICS = {
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
 }
 
 # MySQL Configuration
@@ -90,11 +113,13 @@ def create_app():
     from .routes.exls import exls_bp
     from .routes.myforms import myforms_bp
     from .routes.genacc import genacc_bp
+    from .routes.flows import flows_bp
 
     app.register_blueprint(actempad_bp)
     app.register_blueprint(exls_bp)
     app.register_blueprint(myforms_bp)
     app.register_blueprint(genacc_bp)
+    app.register_blueprint(flows_bp)
     
     # CLI
     @app.cli.command("create-admin")
@@ -114,15 +139,73 @@ def create_app():
             db.session.add(new_user)
             db.session.commit()
             logger.info(f"Admin user '{username}' created successfully")
+
+    @app.cli.command("index-addresses")
+    def index_addresses():
+        """Build address and service ranges for rows that have none yet"""
+        from .indexing import index_missing_addresses, index_missing_services
+        with app.app_context():
+            added = index_missing_addresses('rule') + index_missing_addresses('request')
+            added_services = sum(index_missing_services(owner_type)
+                                 for owner_type in ('rule', 'request', 'template'))
+            db.session.commit()
+            logger.info(f"Indexed {added} address ranges and {added_services} service ranges")
+
+    @app.cli.command("index-search")
+    def index_search():
+        """Fill the full-text search column of requests that have none yet"""
+        from .search import backfill_search_text
+        with app.app_context():
+            filled = backfill_search_text()
+            db.session.commit()
+            logger.info(f"Indexed search text for {filled} ACL requests")
             
     
+    @app.before_request
+    def start_request_timer():
+        """Note when the request started, for the latency histogram"""
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        """Observe request latency per blueprint route"""
+        from .metrics import REQUEST_DURATION
+        started = g.pop('request_started', None)
+        if started is not None:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                blueprint=request.blueprint or 'app',
+                # The URL rule, not the path, keeps ids out of the label values
+                endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                method=request.method,
+                status=response.status_code)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Expose sync and request metrics in the Prometheus text format.
+
+        Needs the METRICS_TOKEN as a bearer token, since the labels name
+        sheets and routes; without a configured token the endpoint is off.
+        """
+        from .metrics import render_metrics
+        token = METRICS['TOKEN']
+        if not token:
+            return Response('Not Found', status=404, mimetype='text/plain')
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return Response('Unauthorized', status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer'})
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
     @app.after_request
     def set_security_headers(response):
         """Apply baseline security headers to every response"""
         response.headers['X-Content-Type-Options'] = 'nosniff'
         response.headers['X-Frame-Options'] = 'DENY'
         response.headers['Referrer-Policy'] = 'no-referrer'
-        response.headers['Cache-Control'] = 'no-store'
+        # Nothing is stored unless the view opted into revalidation through g.cache_control
+        response.headers['Cache-Control'] = g.get('cache_control', 'no-store')
         # Only advertise HSTS when served over HTTPS
         if request.is_secure:
             response.headers['Strict-Transport-Security'] = \
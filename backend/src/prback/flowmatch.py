@@ -0,0 +1,180 @@
+'''This module answers "which rules already permit this flow?" for (source, destination, service)
+flows. The catalog is flattened once per catalog version into NumPy arrays of integer ranges, one
+array set per dimension with the ranges of each rule stored contiguously, and a batch of flows is
+matched with broadcast comparisons followed by a per-rule reduction. A rule permits a flow when
+one of its source ranges covers the flow's source, one of its destination ranges covers the
+flow's destination, and its services cover every port range of the flow's service.
+'''
+import numpy as np
+
+from .addressing import (parse_ipv4_prefix, parse_ipv4_prefixes, prefix_range, parse_service_ranges,
+                         PORT_PROTOCOLS, FULL_PORT_RANGE)
+from .catalog import get_snapshot_entry, load_rules
+
+# Protocol numbers for the service ranges; 0 stands for any protocol
+PROTOCOL_CODES = {'any': 0, 'icmp': 1, 'tcp': 6, 'udp': 17, 'gre': 47, 'esp': 50, 'ah': 51}
+
+# Codes of the protocols whose ranges are ports, bare ports (0) included
+PORT_PROTOCOL_CODES = [PROTOCOL_CODES['any']] + [PROTOCOL_CODES[name] for name in sorted(PORT_PROTOCOLS)]
+
+# Flows compared against the whole catalog per broadcast step, bounding temporary memory
+FLOW_CHUNK_SIZE = 128
+
+
+def get_flow_matcher():
+    """Return the FlowMatcher for the current catalog version"""
+    return get_snapshot_entry("flow_matcher", lambda last_synced_at: FlowMatcher(load_rules()))
+
+
+class FlowMatcher:
+    """Range arrays of the rule catalog, grouped by rule.
+
+    Rules without at least one parsable source, destination and service can
+    never permit a flow and are left out.
+    """
+
+    def __init__(self, rules):
+        self.rule_ids = []
+        self.system_types = []
+        columns = {name: [] for name in (
+            'src_lo', 'src_hi', 'src_start', 'dst_lo', 'dst_hi', 'dst_start',
+            'svc_proto', 'svc_lo', 'svc_hi', 'svc_start')}
+
+        for rule in rules:
+            sources = sorted(set(parse_ipv4_prefixes(rule.source_ip, skip_wildcards=False)))
+            destinations = sorted(set(parse_ipv4_prefixes(rule.destination_ip, skip_wildcards=False)))
+            services = parse_service_ranges(rule.service)
+            if not (sources and destinations and services):
+                continue
+
+            self.rule_ids.append(rule.id)
+            self.system_types.append(rule.system_type or '')
+            for side, prefixes in (('src', sources), ('dst', destinations)):
+                columns[f'{side}_start'].append(len(columns[f'{side}_lo']))
+                for prefix in prefixes:
+                    low, high = prefix_range(*prefix)
+                    columns[f'{side}_lo'].append(low)
+                    columns[f'{side}_hi'].append(high)
+            columns['svc_start'].append(len(columns['svc_lo']))
+            for protocol, port_lo, port_hi in services:
+                columns['svc_proto'].append(PROTOCOL_CODES.get(protocol, -1))
+                columns['svc_lo'].append(port_lo)
+                columns['svc_hi'].append(port_hi)
+
+        for name, values in columns.items():
+            setattr(self, name, np.array(values, dtype=np.int64))
+        self.rule_ids = np.array(self.rule_ids, dtype=np.int64)
+        self.svc_has_ports = np.isin(self.svc_proto, PORT_PROTOCOL_CODES)
+        self.svc_protocol_wide = (self.svc_proto == 0) & (self.svc_lo == FULL_PORT_RANGE[0]) & \
+            (self.svc_hi == FULL_PORT_RANGE[1])
+        self.system_types = np.array(self.system_types, dtype=object)
+
+    def __len__(self):
+        return len(self.rule_ids)
+
+    @staticmethod
+    def covering_rules(lo, hi, starts, query_lo, query_hi, extra=None):
+        """(flows x rules) mask of rules with a range covering each query range"""
+        covered = (lo[None, :] <= query_lo[:, None]) & (hi[None, :] >= query_hi[:, None])
+        if extra is not None:
+            covered &= extra
+        # Most rules have a single range per dimension, which needs no reduction
+        if len(starts) == len(lo):
+            return covered
+        return np.logical_or.reduceat(covered, starts, axis=1)
+
+    def match(self, queries, rule_mask=None):
+        """Match parsed queries; returns one array of matching rule ids per query.
+
+        Each query is (src_lo, src_hi, dst_lo, dst_hi, [(protocol, port_lo, port_hi), ...]).
+        ``rule_mask`` optionally restricts the rules considered.
+        """
+        if not len(self) or not queries:
+            return [np.empty(0, dtype=np.int64) for _ in queries]
+
+        results = []
+        for start in range(0, len(queries), FLOW_CHUNK_SIZE):
+            chunk = queries[start:start + FLOW_CHUNK_SIZE]
+
+            # A flow with several service ranges (dns is tcp and udp) becomes one
+            # row per range; the flow matches the rules that match all its rows
+            rows = [(index, query[:4], service)
+                    for index, query in enumerate(chunk) for service in query[4]]
+            owners = np.array([row[0] for row in rows])
+            addresses = np.array([row[1] for row in rows], dtype=np.int64)
+            services = np.array([(PROTOCOL_CODES.get(row[2][0], -1),) + row[2][1:] for row in rows],
+                                dtype=np.int64)
+
+            matched = self.covering_rules(
+                self.src_lo, self.src_hi, self.src_start, addresses[:, 0], addresses[:, 1])
+            matched &= self.covering_rules(
+                self.dst_lo, self.dst_hi, self.dst_start, addresses[:, 2], addresses[:, 3])
+            protocols = services[:, 0][:, None]
+            flow_has_ports = np.isin(protocols, PORT_PROTOCOL_CODES)
+            # Same protocol; a bare-port rule covers tcp, udp and bare-port flows; a
+            # protocol-wide rule covers everything; a bare-port flow is covered by port rules
+            same_protocol = (self.svc_proto[None, :] == protocols) | \
+                ((self.svc_proto[None, :] == 0) & (flow_has_ports | self.svc_protocol_wide[None, :])) | \
+                ((protocols == 0) & self.svc_has_ports[None, :])
+            matched &= self.covering_rules(
+                self.svc_lo, self.svc_hi, self.svc_start, services[:, 1], services[:, 2],
+                extra=same_protocol)
+
+            permitted = np.ones((len(chunk), len(self)), dtype=bool)
+            if rule_mask is not None:
+                permitted &= rule_mask[None, :]
+            np.logical_and.at(permitted, owners, matched)
+            results.extend(self.rule_ids[row] for row in permitted)
+
+        return results
+
+
+def parse_flow(flow):
+    """Parse a flow dict into a match query; returns (query, None) or (None, error)"""
+    if not isinstance(flow, dict):
+        return None, 'Each flow must be an object'
+
+    endpoints = []
+    for field in ('source_ip', 'destination_ip'):
+        value = str(flow.get(field) or '').strip()
+        prefix = parse_ipv4_prefix(value) if value else None
+        if prefix is None:
+            return None, f"{field} must be a single IPv4 address or prefix"
+        endpoints.extend(prefix_range(*prefix))
+
+    service = str(flow.get('service') or '').strip()
+    if not service and flow.get('port'):
+        service = f"{flow.get('protocol', 'tcp')}/{flow['port']}"
+    services = parse_service_ranges(service)
+    if not services:
+        return None, "service must be a port (443), protocol/port (tcp/443) or service name (https)"
+
+    return tuple(endpoints) + (services,), None
+
+
+def match_flows(flows, system_type=None):
+    """Match a batch of flow dicts against the current catalog.
+
+    Returns one dict per flow with the ids of the rules that permit it, or
+    the reason the flow could not be parsed.
+    """
+    matcher = get_flow_matcher()
+
+    queries = []
+    results = []
+    for index, flow in enumerate(flows):
+        query, error = parse_flow(flow)
+        if error:
+            results.append({'index': index, 'error': error})
+            continue
+        queries.append(query)
+        results.append({'index': index})
+
+    rule_mask = matcher.system_types == system_type if system_type else None
+    matches = iter(matcher.match(queries, rule_mask=rule_mask))
+    for result in results:
+        if 'error' not in result:
+            rule_ids = next(matches)
+            result['matched'] = bool(len(rule_ids))
+            result['rule_ids'] = rule_ids.tolist()
+    return results
@@ -0,0 +1,178 @@
+'''This module maintains the normalized range tables derived from the free-text address and
+service columns. Each address or prefix in a rule's or request's comma-separated list becomes one
+address_ranges row of integer bounds, and each service of a rule, request or template becomes one
+service_ranges row of (protocol, port_lo, port_hi), so overlap questions run as indexed range
+scans in SQL. Address wildcards (any/all/subnet/0.0.0.0) are stored as the full IPv4 range.
+'''
+from sqlalchemy import select, insert, delete, and_, or_, exists
+
+from .extensions import db
+from .models import AddressRange, ServiceRange, FirewallRule, ACLRequest, Templates
+from .addressing import (parse_ipv4_prefixes, prefix_range, parse_service_ranges, PORT_PROTOCOLS,
+                         FULL_PORT_RANGE)
+
+# Owners with address_ranges rows
+OWNER_MODELS = {
+    'rule': FirewallRule,
+    'request': ACLRequest,
+}
+
+# Owners with service_ranges rows
+SERVICE_OWNER_MODELS = {
+    **OWNER_MODELS,
+    'template': Templates,
+}
+
+
+def address_range_rows(owner_type, owner_id, source_ip, destination_ip):
+    """address_ranges rows for one owner's source and destination lists"""
+    rows = []
+    for side, value in (('source', source_ip), ('destination', destination_ip)):
+        for network, prefix_len in set(parse_ipv4_prefixes(value, skip_wildcards=False)):
+            start_int, end_int = prefix_range(network, prefix_len)
+            rows.append({
+                "owner_type": owner_type,
+                "owner_id": owner_id,
+                "side": side,
+                "start_int": start_int,
+                "end_int": end_int,
+            })
+    return rows
+
+
+def index_request_addresses(acl_requests):
+    """Add address ranges for newly flushed ACL requests; the caller commits"""
+    rows = []
+    for acl_request in acl_requests:
+        rows.extend(address_range_rows(
+            'request', acl_request.id, acl_request.source_ip, acl_request.destination_ip))
+    if rows:
+        db.session.execute(insert(AddressRange), rows)
+    return len(rows)
+
+
+def index_missing_addresses(owner_type, chunk_size=1000):
+    """Add address ranges for every owner of the given type that has none yet; the caller commits.
+
+    This covers rows inserted by the sync as well as rows that predate the table.
+    """
+    model = OWNER_MODELS[owner_type]
+    missing = db.session.execute(
+        select(model.id, model.source_ip, model.destination_ip).where(
+            ~exists().where(and_(AddressRange.owner_type == owner_type,
+                                 AddressRange.owner_id == model.id)))
+    ).all()
+
+    rows = []
+    for owner_id, source_ip, destination_ip in missing:
+        rows.extend(address_range_rows(owner_type, owner_id, source_ip, destination_ip))
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(AddressRange), rows[start:start + chunk_size])
+    return len(rows)
+
+
+def remove_address_ranges(owner_type, owner_ids, chunk_size=1000):
+    """Delete the address ranges of removed owners; the caller commits"""
+    for start in range(0, len(owner_ids), chunk_size):
+        db.session.execute(
+            delete(AddressRange).where(
+                AddressRange.owner_type == owner_type,
+                AddressRange.owner_id.in_(owner_ids[start:start + chunk_size])))
+
+
+def find_overlapping_owners(owner_type, start_int, end_int, side=None, limit=None):
+    """Ids of owners with an address range intersecting [start_int, end_int], lowest id first"""
+    query = select(AddressRange.owner_id).where(
+        AddressRange.owner_type == owner_type,
+        AddressRange.start_int <= end_int,
+        AddressRange.end_int >= start_int,
+    )
+    if side:
+        query = query.where(AddressRange.side == side)
+    query = query.distinct().order_by(AddressRange.owner_id)
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).scalars().all()
+
+
+def service_range_rows(owner_type, owner_id, service):
+    """service_ranges rows for one owner's service list"""
+    return [{
+        "owner_type": owner_type,
+        "owner_id": owner_id,
+        "protocol": protocol,
+        "port_lo": port_lo,
+        "port_hi": port_hi,
+    } for protocol, port_lo, port_hi in parse_service_ranges(service)]
+
+
+def index_services(owner_type, owners):
+    """Add service ranges for newly flushed requests or templates; the caller commits"""
+    rows = []
+    for owner in owners:
+        rows.extend(service_range_rows(owner_type, owner.id, owner.service))
+    if rows:
+        db.session.execute(insert(ServiceRange), rows)
+    return len(rows)
+
+
+def reindex_services(owner_type, owners):
+    """Replace the service ranges of owners whose service changed; the caller commits"""
+    remove_service_ranges(owner_type, [owner.id for owner in owners])
+    return index_services(owner_type, owners)
+
+
+def index_missing_services(owner_type, chunk_size=1000):
+    """Add service ranges for every owner of the given type that has none yet; the caller commits"""
+    model = SERVICE_OWNER_MODELS[owner_type]
+    missing = db.session.execute(
+        select(model.id, model.service).where(
+            ~exists().where(and_(ServiceRange.owner_type == owner_type,
+                                 ServiceRange.owner_id == model.id)))
+    ).all()
+
+    rows = []
+    for owner_id, service in missing:
+        rows.extend(service_range_rows(owner_type, owner_id, service))
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(ServiceRange), rows[start:start + chunk_size])
+    return len(rows)
+
+
+def remove_service_ranges(owner_type, owner_ids, chunk_size=1000):
+    """Delete the service ranges of removed owners; the caller commits"""
+    for start in range(0, len(owner_ids), chunk_size):
+        db.session.execute(
+            delete(ServiceRange).where(
+                ServiceRange.owner_type == owner_type,
+                ServiceRange.owner_id.in_(owner_ids[start:start + chunk_size])))
+
+
+def find_service_owners(owner_type, port_lo, port_hi, protocol=None, limit=None):
+    """Ids of owners with a service range intersecting [port_lo, port_hi], lowest id first.
+
+    Without a protocol (or with 'any') the query is a bare port range and only
+    matches port-bearing ranges (tcp, udp, any), unless it spans every port, which
+    stands for all traffic. With tcp or udp, ranges of protocol 'any' match as
+    well; with icmp, gre, esp or ah only a protocol-wide 'any' does, since the
+    port columns hold ICMP types or nothing for those protocols.
+    """
+    query = select(ServiceRange.owner_id).where(
+        ServiceRange.owner_type == owner_type,
+        ServiceRange.port_lo <= port_hi,
+        ServiceRange.port_hi >= port_lo,
+    )
+    protocol_wide = and_(ServiceRange.protocol == 'any',
+                         ServiceRange.port_lo == FULL_PORT_RANGE[0],
+                         ServiceRange.port_hi == FULL_PORT_RANGE[1])
+    if not protocol or protocol == 'any':
+        if (port_lo, port_hi) != FULL_PORT_RANGE:
+            query = query.where(ServiceRange.protocol.in_(sorted(PORT_PROTOCOLS | {'any'})))
+    elif protocol in PORT_PROTOCOLS:
+        query = query.where(ServiceRange.protocol.in_((protocol, 'any')))
+    else:
+        query = query.where(or_(ServiceRange.protocol == protocol, protocol_wide))
+    query = query.distinct().order_by(ServiceRange.owner_id)
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).scalars().all()
@@ -0,0 +1,248 @@
+'''This module writes validated ACL request submissions in bulk. Rows go to acl_requests through
+Core executemany INSERTs in chunks, skipping the ORM unit of work, and the new ids come back in
+bulk: through INSERT ... RETURNING where the database supports it, otherwise by selecting the rows
+back by a token written with each multi-row INSERT.
+The address and service ranges of the new requests are written in the same transaction, and the
+search generation is moved on since the flush listener in search.py never sees these rows.
+
+NDJSON submissions are consumed line by line and validated, inserted and committed in fixed-size
+batches, so memory use does not grow with the size of the upload. Spreadsheet imports read the
+uploaded file in place, in read-only mode, with the same header detection and column mapping as
+the sync.
+'''
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from .extensions import db
+from .models import ACLRequest, AddressRange, ServiceRange
+from .config import ACL_REQUESTS
+from .indexing import address_range_rows, service_range_rows
+from .search import request_search_text, bump_search_generation
+from .validation import validate_request_payload
+from .main import (read_workbook_sheets, sheet_matrix, scan_sheet, find_header_row,
+                   detect_column_mapping, has_valid_rule_data, get_cell_value,
+                   looks_like_category_row)
+
+# Submission fields request_row needs that validate_request_payload does not check
+ROW_FIELDS = ('system_type', 'category', 'sourceHost', 'destinationHost')
+
+
+def request_row(req_data, requester):
+    """acl_requests row for one validated submission in the bulk payload format"""
+    return {
+        "requester": requester,
+        "system_type": req_data['system_type'].strip(),
+        "category": req_data['category'].strip(),
+        "source_ip": req_data['sourceIP'].strip(),
+        "source_host": req_data['sourceHost'].strip(),
+        "destination_ip": req_data['destinationIP'].strip(),
+        "destination_host": req_data['destinationHost'].strip(),
+        "service": req_data['service'].strip(),
+        "reason": req_data['description'].strip(),
+    }
+
+
+def insert_chunk(table, chunk):
+    """Insert one chunk of rows; returns their ids in row order"""
+    dialect = db.session.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), chunk)
+        return list(result.scalars())
+
+    # Without RETURNING, read the ids back through a token unique to this statement.
+    # lastrowid ranges are not safe: with auto_increment_increment above 1 or
+    # interleaved autoinc locking the ids of one INSERT need not be consecutive.
+    # They still ascend in row order, so ordering by id restores the row order.
+    batch = uuid.uuid4().hex
+    db.session.execute(insert(table).values([{**row, "insert_batch": batch} for row in chunk]))
+    ids = db.session.execute(
+        select(table.c.id).where(table.c.insert_batch == batch).order_by(table.c.id)
+    ).scalars().all()
+    if len(ids) != len(chunk):
+        raise RuntimeError(f"Inserted {len(ids)} of {len(chunk)} ACL requests")
+    return list(ids)
+
+
+def insert_acl_requests(rows, chunk_size=None):
+    """Insert acl_requests rows and their address and service ranges; the caller commits.
+
+    Rows are filled in with status, created_at and search_text. Returns the
+    new ids in row order.
+    """
+    chunk_size = chunk_size or ACL_REQUESTS['BULK_INSERT_CHUNK_SIZE']
+    table = ACLRequest.__table__
+    now = datetime.utcnow()
+    for row in rows:
+        row.setdefault("status", "Pending")
+        row.setdefault("created_at", now)
+        row["search_text"] = request_search_text(row)
+
+    ids = []
+    for start in range(0, len(rows), chunk_size):
+        ids.extend(insert_chunk(table, rows[start:start + chunk_size]))
+
+    address_rows = []
+    service_rows = []
+    for request_id, row in zip(ids, rows):
+        address_rows.extend(address_range_rows(
+            'request', request_id, row["source_ip"], row["destination_ip"]))
+        service_rows.extend(service_range_rows('request', request_id, row["service"]))
+    for model, range_rows in ((AddressRange, address_rows), (ServiceRange, service_rows)):
+        for start in range(0, len(range_rows), chunk_size):
+            db.session.execute(insert(model), range_rows[start:start + chunk_size])
+
+    if ids:
+        bump_search_generation(db.session)
+    return ids
+
+
+def validate_submission(req_data):
+    """Errors for one submission, including the fields request_row needs"""
+    if not isinstance(req_data, dict):
+        return ["each line must be a JSON object"]
+    errors = [f"missing required field {field}" for field in ROW_FIELDS
+              if not isinstance(req_data.get(field), str)]
+    return errors + validate_request_payload(req_data)
+
+
+def create_batch(entries, requester):
+    """Validate and insert a batch of (position, submission, error) entries; the caller commits.
+
+    ``position`` is a dict locating the entry in its upload and ``error`` an
+    error found while decoding it, if any. Returns one result per entry: the
+    position with a created status and id, or an error status and errors.
+    """
+    results = []
+    rows = []
+    for position, req_data, error in entries:
+        errors = [error] if error else validate_submission(req_data)
+        if errors:
+            results.append({**position, "status": "error", "errors": errors})
+        else:
+            rows.append(request_row(req_data, requester))
+            results.append({**position, "status": "created"})
+
+    ids = iter(insert_acl_requests(rows))
+    for result in results:
+        if result["status"] == "created":
+            result["id"] = next(ids)
+    return results
+
+
+def ingest_ndjson(lines, requester, batch_size=None):
+    """Create requests from NDJSON lines, yielding one result dict per non-blank line.
+
+    Each batch is validated, inserted and committed before the next one is
+    read; invalid lines are reported and skipped without failing the batch.
+    A final {"summary": ...} dict gives the totals.
+    """
+    batch_size = batch_size or ACL_REQUESTS['STREAM_BATCH_SIZE']
+    totals = {"lines": 0, "created": 0, "failed": 0}
+    batch = []
+
+    def flush_batch():
+        results = create_batch(batch, requester)
+        db.session.commit()
+        batch.clear()
+        for result in results:
+            totals["created" if result["status"] == "created" else "failed"] += 1
+        return results
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        totals["lines"] += 1
+        try:
+            batch.append(({"line": line_number}, json.loads(line), None))
+        except ValueError:
+            batch.append(({"line": line_number}, None, "line is not valid JSON"))
+        if len(batch) >= batch_size:
+            yield from flush_batch()
+    if batch:
+        yield from flush_batch()
+
+    yield {"summary": totals}
+
+
+def workbook_submissions(source, system_type, category=None):
+    """Yield ({sheet, row}, submission) for every rule row of an uploaded workbook.
+
+    Without a category the closest category row above each rule row is used,
+    falling back to the sheet name. Yields ({sheet, row}, None) for non-empty
+    rows below the header that hold no rule, and ({sheet}, None) for sheets
+    without a header row.
+    """
+    for sheet_name, rows in read_workbook_sheets(source):
+        # Empty rows are kept so positions stay spreadsheet row numbers
+        sheet_rows = sheet_matrix(rows, drop_empty_rows=False)
+        scan = scan_sheet(sheet_rows)
+        header_row_idx, headers = find_header_row(sheet_rows, scan)
+        if header_row_idx is None:
+            if any(any(values) for values in sheet_rows):
+                yield {"sheet": sheet_name}, None
+            continue
+
+        column_mapping = detect_column_mapping(headers, sheet_name)
+        current_category = category or sheet_name
+        for row_idx in range(header_row_idx + 1, len(sheet_rows)):
+            row_data = sheet_rows[row_idx]
+            position = {"sheet": sheet_name, "row": row_idx + 1}
+            if not any(value.strip() for value in row_data):
+                continue
+            if has_valid_rule_data(row_data, column_mapping):
+                yield position, {
+                    "system_type": system_type,
+                    "category": current_category,
+                    "sourceIP": get_cell_value(row_data, column_mapping.get('source_ip')),
+                    "sourceHost": get_cell_value(row_data, column_mapping.get('source_host')),
+                    "destinationIP": get_cell_value(row_data, column_mapping.get('destination_ip')),
+                    "destinationHost": get_cell_value(row_data, column_mapping.get('destination_host')),
+                    "service": get_cell_value(row_data, column_mapping.get('service')),
+                    "description": get_cell_value(row_data, column_mapping.get('description')),
+                }
+            elif looks_like_category_row(row_data):
+                if not category:
+                    current_category = row_data[0].strip()
+            else:
+                yield position, None
+
+
+def import_workbook(source, requester, system_type, category=None, batch_size=None):
+    """Create requests from the rule rows of an uploaded workbook; the caller commits.
+
+    ``source`` is the workbook bytes or a seekable binary file.
+
+    Rows are validated and inserted in batches. Returns the totals, the new ids
+    and one error entry per rejected row or sheet.
+    """
+    batch_size = batch_size or ACL_REQUESTS['STREAM_BATCH_SIZE']
+    report = {"rows": 0, "created": 0, "failed": 0, "ids": [], "errors": []}
+    batch = []
+
+    def flush_batch():
+        for result in create_batch(batch, requester):
+            if result.pop("status") == "created":
+                report["created"] += 1
+                report["ids"].append(result["id"])
+            else:
+                report["failed"] += 1
+                report["errors"].append(result)
+        batch.clear()
+
+    for position, submission in workbook_submissions(source, system_type, category):
+        if "row" not in position:
+            report["errors"].append({**position, "errors": ["no header row found"]})
+            continue
+        report["rows"] += 1
+        error = None if submission else "row does not contain a source or destination, service and description"
+        batch.append((position, submission, error))
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
+
+    return report
@@ -0,0 +1,138 @@
+'''This module runs manual Google Sheets syncs as background jobs. A job row in sync_jobs is
+created per request and updated as the sync moves through its fetch, parse and upsert stages,
+so any worker can report progress; row counts written during the upsert go through a
+connection of their own, since the sync commits only at the end. Requests made while a job is
+still active are coalesced onto that job, and a unique active_key on sync_jobs makes sure two
+concurrent requests cannot both create one.
+'''
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import SyncJob
+from .config import GOOGLE_SHEETS
+from .main import leased_sync
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+# SyncJob.active_key of the queued or running job
+ACTIVE_JOB_KEY = 'sync'
+
+# How sync_from_source outcomes map onto job statuses
+JOB_STATUS_BY_OUTCOME = {
+    'synced': 'succeeded',
+    'synced_partial': 'succeeded',
+    'skipped_not_modified': 'succeeded',
+    'skipped_unchanged': 'succeeded',
+    'already_running': 'skipped',
+}
+
+
+def find_active_job():
+    """Return the queued or running job, ignoring ones orphaned by a dead worker"""
+    cutoff = datetime.utcnow() - timedelta(seconds=GOOGLE_SHEETS['LEASE_TTL'])
+    return SyncJob.query.filter(
+        SyncJob.status.in_(ACTIVE_JOB_STATUSES),
+        SyncJob.created_at >= cutoff
+    ).order_by(SyncJob.id.desc()).first()
+
+
+def expire_orphaned_jobs():
+    """Fail active jobs older than the lease TTL, whose worker died, freeing the active key"""
+    cutoff = datetime.utcnow() - timedelta(seconds=GOOGLE_SHEETS['LEASE_TTL'])
+    db.session.execute(
+        update(SyncJob)
+        .where(SyncJob.active_key.is_not(None), SyncJob.created_at < cutoff)
+        .values(active_key=None, status='failed', error='Worker stopped before the job finished',
+                finished_at=datetime.utcnow()))
+
+
+def enqueue_sync_job(app, requested_by):
+    """Queue a forced sync, or return the active job. Returns (job, created)"""
+    expire_orphaned_jobs()
+    active = find_active_job()
+    if active:
+        db.session.commit()
+        return active, False
+
+    job = SyncJob(requested_by=requested_by, status='queued', active_key=ACTIVE_JOB_KEY)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request created the active job between the check and the insert
+        db.session.rollback()
+        active = find_active_job()
+        if active is None:
+            raise
+        return active, False
+
+    worker = threading.Thread(target=run_sync_job, args=(app, job.id), daemon=True)
+    worker.start()
+    return job, True
+
+
+def run_sync_job(app, job_id):
+    """Run a queued job to completion, recording stage and row progress on the job row"""
+    with app.app_context():
+        job = db.session.get(SyncJob, job_id)
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        # Row count reported inside the sync's transaction, stored with the outcome
+        latest_rows = []
+
+        def progress(stage, rows_processed=None, in_transaction=False):
+            if in_transaction:
+                # The job row is left alone in the session so the sync's
+                # transaction never holds a lock on it
+                latest_rows[:] = [rows_processed]
+                record_rows_processed(job_id, rows_processed)
+                return
+            job.stage = stage
+            if rows_processed is not None:
+                job.rows_processed = rows_processed
+            db.session.commit()
+
+        try:
+            # A manual sync bypasses the not-modified and unchanged-content checks
+            outcome = leased_sync(force=True, progress=progress)
+            if latest_rows:
+                job.rows_processed = latest_rows[0]
+            job.outcome = outcome
+            job.status = JOB_STATUS_BY_OUTCOME.get(outcome, 'failed')
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Sync job {job_id} failed", exc_info=True)
+            job.status = 'failed'
+            job.error = str(e)
+
+        job.finished_at = datetime.utcnow()
+        job.active_key = None
+        db.session.commit()
+        logger.info(f"Sync job {job_id} finished: {job.status} ({job.outcome})")
+
+
+def record_rows_processed(job_id, rows_processed):
+    """Write a job's row count in a transaction of its own, visible before the sync commits.
+
+    SQLite allows one writer at a time and the sync already is it, so there
+    the count only moves at stage boundaries.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(SyncJob.__table__)
+                .where(SyncJob.__table__.c.id == job_id)
+                .values(rows_processed=rows_processed))
+    except Exception:
+        logger.warning(f"Failed to record progress of sync job {job_id}", exc_info=True)
@@ -1,16 +1,32 @@
-import pandas as pd
 import requests
-from datetime import datetime
-from typing import List, Dict, Tuple
+import openpyxl
+import numpy as np
+from io import BytesIO
+from datetime import datetime, timedelta
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import time
 import re
 import logging
 import sys
-
-from .models import FirewallRule
+import hashlib
+import os
+import socket
+import uuid
+from sqlalchemy import select, insert, update, delete, bindparam, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models import FirewallRule, SyncState, SyncLease
 from .extensions import db
 from .config import GOOGLE_SHEETS
+from .indexing import (index_missing_addresses, remove_address_ranges,
+                       index_missing_services, remove_service_ranges)
+from .metrics import (SYNC_RUNS, SYNC_DURATION, SYNC_STAGE_DURATION, SYNC_SHEET_PARSE_DURATION,
+                      SYNC_BYTES_DOWNLOADED, SYNC_ROWS, SYNC_LAST_ROWS,
+                      SYNC_LAST_ROWS_PER_SECOND, SYNC_LAST_SUCCESS)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -29,62 +45,301 @@ logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
 EXCEL_URL = GOOGLE_SHEETS['MAIN_SHEET']
+SYNC_STATE_NAME = 'google_sheets'
+SYNC_LEASE_NAME = 'google_sheets_sync'
+PERIODIC_SYNC_SECONDS = 86400
+
+# Keywords that mark a header cell
+HEADER_KEYWORDS = ['source', 'destination', 'ip', 'host', 'service', 'description']
+
+# Columns refreshed when an incoming row matches an existing natural key
+UPSERT_COLUMNS = ('source_host', 'destination_host', 'description', 'fingerprint',
+                  'sync_generation')
+# Columns hashed into FirewallRule.fingerprint
+FINGERPRINT_COLUMNS = ('system_type', 'category', 'source_ip', 'source_host',
+                       'destination_ip', 'destination_host', 'service', 'description')
 
 # Track last sync time
 last_sync_time = None
-sync_in_progress = False
 
+# Workbook opened once by a sheet parse worker, see init_parse_worker
+worker_workbook = None
 
-def automated_sync(app):
-    """Perform automated sync from Google Sheets to MySQL"""
-    global last_sync_time, sync_in_progress
 
-    if sync_in_progress:
-        logger.info("🔄 Sync already in progress, skipping...")
-        return
-
-    sync_in_progress = True
+def automated_sync(app, force=False):
+    """Perform automated sync from Google Sheets to MySQL"""
     try:
         with app.app_context():
             logger.info("🔄 Starting automated sync from Google Sheets to MySQL...")
-
-            # Load data from Google Sheets
-            sheet_structures = load_excel_data()
-
-            if sheet_structures:
-                # Sync to MySQL
-                sync_to_mysql(sheet_structures)
-                last_sync_time = datetime.now()
+            status = leased_sync(force=force)
+            if status in ('synced', 'synced_partial'):
                 logger.info(f"✅ Automated sync completed at {last_sync_time}")
-            else:
-                logger.warning("❌ No data loaded from Google Sheets")
+            return status
 
     except Exception as e:
         logger.error(f"❌ Automated sync failed", exc_info=True)
-    finally:
-        sync_in_progress = False
+        return None
 
 
-def incremental_sync(app):
-    """Sync without deleting existing data"""
+def incremental_sync(app, skip_if_checked_within=None):
+    """Conditional sync for the periodic loop.
+
+    Like every full sync it sweeps the rules that were removed from the sheet.
+    """
     try:
         with app.app_context():
+            # Another worker may have just run this sync
+            if skip_if_checked_within:
+                state = get_sync_state()
+                db.session.commit()
+                if state.last_checked_at and \
+                        datetime.utcnow() - state.last_checked_at < timedelta(seconds=skip_if_checked_within):
+                    logger.info(
+                        f"⏭️ Source checked at {state.last_checked_at} by another worker "
+                        f"({state.last_status}), skipping")
+                    return state.last_status
+
             logger.info("🔄 Performing incremental sync from Google Sheets...")
-            sheet_structures = load_excel_data()
-            if sheet_structures:
-                sync_to_mysql(sheet_structures)
+            status = leased_sync()
+            if status in ('synced', 'synced_partial'):
                 logger.info("✅ Incremental sync completed")
+            return status
     except Exception:
         logger.error("❌ Incremental sync failed", exc_info=True)
+        return None
+
+
+class SyncLeaseLost(Exception):
+    """The sync lease expired and another worker took it over mid-sync"""
+
+
+def leased_sync(force=False, progress=None):
+    """Run sync_from_source while holding the cluster-wide sync lease.
+
+    The lease is renewed from the sync's progress callbacks, at most every
+    third of LEASE_TTL, so a sync that outlives the TTL keeps it. If it was
+    lost anyway the sync stops before committing and returns 'lease_lost'.
+    """
+    trigger = 'forced' if force else 'conditional'
+    holder = acquire_sync_lease()
+    if not holder:
+        SYNC_RUNS.inc(trigger=trigger, status='already_running')
+        lease = SyncLease.query.filter_by(name=SYNC_LEASE_NAME).first()
+        state = get_sync_state()
+        db.session.commit()
+        logger.info(
+            f"🔄 Sync already running on {lease.holder if lease else 'another worker'}, "
+            f"last status: {state.last_status}")
+        return 'already_running'
+
+    renewed_at = [time.monotonic()]
+
+    def renewing_progress(stage, rows_processed=None, in_transaction=False):
+        if time.monotonic() - renewed_at[0] >= GOOGLE_SHEETS['LEASE_TTL'] / 3:
+            if not renew_sync_lease(holder, in_transaction=in_transaction):
+                raise SyncLeaseLost(f"Sync lease of {holder} was taken over")
+            renewed_at[0] = time.monotonic()
+        if progress:
+            progress(stage, rows_processed, in_transaction=in_transaction)
+
+    try:
+        try:
+            with SYNC_DURATION.time(trigger=trigger):
+                status = sync_from_source(force=force, progress=renewing_progress)
+        except SyncLeaseLost:
+            db.session.rollback()
+            logger.warning(f"⚠️ Sync lease of {holder} was taken over, stopping the sync")
+            status = 'lease_lost'
+        SYNC_RUNS.inc(trigger=trigger, status=status)
+        return status
+    finally:
+        release_sync_lease(holder)
+
+
+def acquire_sync_lease(name=SYNC_LEASE_NAME):
+    """Take the named lease if it is free or expired; returns the holder token or None.
+
+    The lease is a row in sync_leases claimed with a conditional UPDATE, so it
+    holds across every worker and host sharing the database, MySQL or SQLite.
+    """
+    now = datetime.utcnow()
+    holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    expires_at = now + timedelta(seconds=GOOGLE_SHEETS['LEASE_TTL'])
+
+    try:
+        claimed = db.session.execute(
+            update(SyncLease)
+            .where(SyncLease.name == name, SyncLease.expires_at < now)
+            .values(holder=holder, acquired_at=now, expires_at=expires_at)
+        ).rowcount
+        if not claimed:
+            if SyncLease.query.filter_by(name=name).first():
+                db.session.rollback()
+                return None
+            db.session.add(SyncLease(name=name, holder=holder,
+                                     acquired_at=now, expires_at=expires_at))
+        db.session.commit()
+        return holder
+    except IntegrityError:
+        # Another worker created the lease row first
+        db.session.rollback()
+        return None
+
+
+def renew_sync_lease(holder, name=SYNC_LEASE_NAME, in_transaction=False):
+    """Push the lease's expiry another LEASE_TTL out; returns False once it is no longer ours.
+
+    With ``in_transaction`` set the sync's transaction is open, so the renewal
+    goes through a connection of its own and other workers see it at once.
+    SQLite allows one writer at a time and the sync already is it, so there
+    nobody can take the lease before the sync commits and the renewal waits
+    for the next stage.
+    """
+    table = SyncLease.__table__
+    statement = (
+        update(table)
+        .where(table.c.name == name, table.c.holder == holder)
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=GOOGLE_SHEETS['LEASE_TTL']))
+    )
+    if not in_transaction:
+        renewed = db.session.execute(statement).rowcount
+        db.session.commit()
+        return bool(renewed)
+    if db.engine.dialect.name == 'sqlite':
+        return True
+    with db.engine.begin() as connection:
+        return bool(connection.execute(statement).rowcount)
+
+
+def release_sync_lease(holder, name=SYNC_LEASE_NAME):
+    """Expire the lease if it is still ours; returns whether it was"""
+    try:
+        released = db.session.execute(
+            update(SyncLease)
+            .where(SyncLease.name == name, SyncLease.holder == holder)
+            .values(expires_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.error("Failed to release sync lease", exc_info=True)
+        return False
+    if not released:
+        logger.warning(f"⚠️ Sync lease was no longer held by {holder} at release")
+    return bool(released)
+
+
+def get_sync_state():
+    """Return the persisted state row for the Google Sheets sync, creating it if needed"""
+    state = SyncState.query.filter_by(name=SYNC_STATE_NAME).first()
+    if not state:
+        state = SyncState(name=SYNC_STATE_NAME)
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+
+def record_sync_status(state, status):
+    """Persist the outcome of a sync attempt"""
+    state.last_status = status
+    state.last_checked_at = datetime.utcnow()
+    db.session.commit()
+    return status
+
+
+def sync_from_source(force=False, progress=None):
+    """Fetch, parse and upsert the workbook unless it is unchanged since the last sync.
+
+    ``progress(stage, rows_processed=None, in_transaction=False)`` is called as
+    the sync enters the fetch, parse and upsert stages, where it may commit the
+    session, and with in_transaction set as the upsert writes its rows, where
+    it must leave the session alone.
+    """
+    global last_sync_time
+
+    if progress is None:
+        progress = lambda stage, rows_processed=None, in_transaction=False: None
+
+    sync_started = time.perf_counter()
+    progress('fetch')
+    state = get_sync_state()
+
+    # Conditional request: Google answers 304 when the validators still match
+    headers = {}
+    if not force:
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+    with SYNC_STAGE_DURATION.time(stage='fetch'):
+        response = requests.get(EXCEL_URL, headers=headers)
+    SYNC_BYTES_DOWNLOADED.inc(len(response.content))
+    if response.status_code == 304:
+        logger.info("⏭️ Workbook not modified since last sync, skipping")
+        return record_sync_status(state, 'skipped_not_modified')
+
+    if response.status_code != 200:
+        logger.error(f"❌ Failed to fetch Excel file: Status {response.status_code}")
+        return record_sync_status(state, 'fetch_failed')
+
+    # Not every export honours conditional headers, so compare the bytes too
+    content_sha256 = hashlib.sha256(response.content).hexdigest()
+    if not force and content_sha256 == state.content_sha256:
+        logger.info("⏭️ Workbook content unchanged since last sync, skipping")
+        state.etag = response.headers.get('ETag')
+        state.last_modified = response.headers.get('Last-Modified')
+        return record_sync_status(state, 'skipped_unchanged')
+
+    progress('parse')
+    with SYNC_STAGE_DURATION.time(stage='parse'):
+        sheet_structures, failed_sheets = load_excel_data(response.content)
+    if not sheet_structures:
+        logger.warning("❌ No data loaded from Google Sheets")
+        return record_sync_status(state, 'parse_failed')
+
+    # Rules are only swept when every sheet parsed, so a partial failure
+    # never removes the rules of the sheet that failed
+    if failed_sheets:
+        logger.warning(f"⚠️ Sheets failed to parse, skipping sweep: {failed_sheets}")
+
+    rows_parsed = sum(len(data.get("data_rows", []))
+                      for categories_data in sheet_structures.values()
+                      for data in categories_data.values())
+    progress('upsert', 0)
+
+    def upsert_progress(rows_processed):
+        progress('upsert', rows_processed, in_transaction=True)
+
+    if sync_to_mysql(sheet_structures, sweep=not failed_sheets, progress=upsert_progress) is None:
+        return record_sync_status(get_sync_state(), 'upsert_failed')
+
+    # Validators are only stored once the data behind them is committed and
+    # every sheet parsed, so a failed or partial run is retried in full next time
+    state = get_sync_state()
+    if not failed_sheets:
+        state.etag = response.headers.get('ETag')
+        state.last_modified = response.headers.get('Last-Modified')
+        state.content_sha256 = content_sha256
+    state.last_synced_at = datetime.utcnow()
+    last_sync_time = datetime.now()
+
+    elapsed = time.perf_counter() - sync_started
+    SYNC_LAST_ROWS.set(rows_parsed)
+    SYNC_LAST_ROWS_PER_SECOND.set(rows_parsed / elapsed if elapsed > 0 else 0)
+    SYNC_LAST_SUCCESS.set(time.time())
+    return record_sync_status(state, 'synced_partial' if failed_sheets else 'synced')
 
 
 def periodic_sync(app):
     """Run periodic sync every 24 hours"""
     while True:
         try:
-            incremental_sync(app)
+            # Every worker runs this loop; whichever wakes first syncs and the
+            # rest see its recent check instead of repeating it
+            incremental_sync(app, skip_if_checked_within=PERIODIC_SYNC_SECONDS // 2)
             # Wait for 24 hours (86400 seconds)
-            time.sleep(86400)
+            time.sleep(PERIODIC_SYNC_SECONDS)
         except Exception as e:
             logger.error(f"❌ Periodic sync error", exc_info=True)
             time.sleep(60)  # Wait 1 minute before retrying
@@ -108,112 +363,268 @@ def start_background_sync(app):
         logger.error("Failed to start background sync", exc_info=True)
 
 
-def load_excel_data():
-    """Load and parse all sheets from Excel with proper merged cell handling"""
+def load_excel_data(content):
+    """Parse all sheets from the downloaded workbook with proper merged cell handling.
+
+    Returns the per-sheet structures and the names of sheets that failed to parse.
+    With GOOGLE_SHEETS['PARSE_WORKERS'] above 1 the sheets are processed in a
+    process pool. Each worker then opens the workbook once, when it starts,
+    and this process opens it only to list the sheet names.
+    """
+    workers = GOOGLE_SHEETS['PARSE_WORKERS']
+    failed_sheets = []
     try:
-        response = requests.get(EXCEL_URL)
-        if response.status_code != 200:
-            logger.error(f"❌ Failed to fetch Excel file: Status {response.status_code}")
-            return {}
+        if workers > 1:
+            return load_excel_data_parallel(content, workers)
 
-        excel_file = pd.ExcelFile(response.content)
         sheet_structures = {}
 
-        for sheet_name in excel_file.sheet_names:
+        # The workbook is parsed once; each sheet's rows are streamed from it
+        for sheet_name, rows in read_workbook_sheets(content):
             try:
-                # Read the sheet WITHOUT headers first to see raw structure
-                df_raw = pd.read_excel(
-                    response.content, sheet_name=sheet_name, header=None)
+                with SYNC_SHEET_PARSE_DURATION.time(sheet=sheet_name):
+                    # Stringify cells and remove completely empty rows and columns
+                    sheet_rows = sheet_matrix(rows)
 
-                # Remove completely empty rows and columns
-                df_raw = df_raw.dropna(how='all').dropna(axis=1, how='all')
-
-                # Process the sheet and get structured data
-                sheet_data = process_sheet_data_structured(df_raw, sheet_name)
+                    # Process the sheet and get structured data
+                    sheet_data = process_sheet_data_structured(sheet_rows, sheet_name)
                 sheet_structures[sheet_name] = sheet_data
 
             except Exception:
                 logger.warning(f"Failed to process sheet {sheet_name}", exc_info=True)
                 sheet_structures[sheet_name] = {}
+                failed_sheets.append(sheet_name)
                 continue
 
-        return sheet_structures
+        return sheet_structures, failed_sheets
 
     except Exception:
         logger.error("❌ Critical Error loading Excel data", exc_info=True)
-        return {}
+        return {}, failed_sheets
 
 
-def detect_merged_cells(df_raw):
-    merged_cells_info = {}
+def load_excel_data_parallel(content, workers):
+    """Fan sheets out to a process pool and merge the results in sheet order"""
+    workbook = openpyxl.load_workbook(
+        BytesIO(content), read_only=True, data_only=True)
+    sheet_names = workbook.sheetnames
+    workbook.close()
 
-    # Find header row first
-    header_row_idx, headers = find_header_row(df_raw)
+    sheet_structures = {}
+    failed_sheets = []
 
-    if header_row_idx is None:
-        header_row_idx = 0
+    # spawn keeps the workers clear of locks held by the sync and request threads;
+    # the workbook bytes are shipped and opened once per worker rather than once per sheet
+    with ProcessPoolExecutor(max_workers=min(workers, len(sheet_names) or 1),
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_parse_worker,
+                             initargs=(content,)) as executor:
+        futures = [executor.submit(parse_workbook_sheet, sheet_name)
+                   for sheet_name in sheet_names]
+
+        for sheet_name, future in zip(sheet_names, futures):
+            try:
+                sheet_structures[sheet_name], parse_seconds = future.result()
+                SYNC_SHEET_PARSE_DURATION.observe(parse_seconds, sheet=sheet_name)
+            except Exception:
+                logger.warning(f"Failed to process sheet {sheet_name}", exc_info=True)
+                sheet_structures[sheet_name] = {}
+                failed_sheets.append(sheet_name)
 
-    # Analyze each row for merged cell patterns
-    for row_idx in range(header_row_idx, len(df_raw)):
-        row_data = df_raw.iloc[row_idx]
+    return sheet_structures, failed_sheets
 
-        # Skip header row
-        if row_idx == header_row_idx:
-            continue
 
-        # Convert to list of strings
-        row_values = []
-        for cell in row_data:
-            if pd.isna(cell):
-                row_values.append('')
-            else:
-                cell_value = str(cell).strip()
-                row_values.append(cell_value)
-
-        # Skip completely empty rows
-        if not any(row_values):
+def init_parse_worker(content):
+    """Open the workbook in a parse worker for the lifetime of the pool"""
+    global worker_workbook
+    worker_workbook = openpyxl.load_workbook(
+        BytesIO(content), read_only=True, data_only=True)
+
+
+def parse_workbook_sheet(sheet_name):
+    """Read and process a single sheet inside a parse worker.
+
+    read_only workbooks parse worksheet XML lazily, so the worker's open
+    workbook only parses the sheets it is given. Returns the sheet structure
+    and the seconds spent, since metrics recorded in a worker never reach
+    the parent.
+    """
+    started = time.perf_counter()
+    rows = worker_workbook[sheet_name].iter_rows(values_only=True)
+    sheet_data = process_sheet_data_structured(sheet_matrix(rows), sheet_name)
+    return sheet_data, time.perf_counter() - started
+
+
+def read_workbook_sheets(content):
+    """Parse the workbook once and stream each sheet's rows as tuples.
+
+    ``content`` is the workbook bytes or a seekable binary file.
+    """
+    if isinstance(content, bytes):
+        content = BytesIO(content)
+    workbook = openpyxl.load_workbook(content, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            yield worksheet.title, worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def sheet_matrix(rows, drop_empty_rows=True):
+    """Stringify streamed rows and drop completely empty columns (and rows)"""
+    matrix = []
+    width = 0
+
+    for row in rows:
+        values = ['' if cell is None else str(cell) for cell in row]
+        if drop_empty_rows and not any(values):
             continue
+        matrix.append(values)
+        width = max(width, len(values))
+
+    used_columns = [False] * width
+    for values in matrix:
+        for col_idx, value in enumerate(values):
+            if value:
+                used_columns[col_idx] = True
+
+    keep = [col_idx for col_idx, used in enumerate(used_columns) if used]
+    return [[values[col_idx] if col_idx < len(values) else '' for col_idx in keep]
+            for values in matrix]
+
+
+def scan_sheet(sheet_rows):
+    """Normalize a sheet once into stripped cell columns and per-row counts.
+
+    Every structure detection step below works off these arrays instead of
+    re-walking and re-stringifying the rows. Cells stay Python strings in one
+    object array per column and the masks are built a column at a time, so
+    memory follows the amount of text rather than rows x columns x the
+    longest cell.
+    """
+    width = max((len(row) for row in sheet_rows), default=0)
+    row_count = len(sheet_rows)
+
+    columns = []
+    non_empty_count = np.zeros(row_count, dtype=np.int64)
+    header_hits = np.zeros(row_count, dtype=np.int64)
+    first_cell_has_keyword = np.zeros(row_count, dtype=bool)
+    for col_idx in range(width):
+        column = np.empty(row_count, dtype=object)
+        column[:] = [row[col_idx].strip() if col_idx < len(row) else '' for row in sheet_rows]
+        keyword_hits = keyword_cell_mask(column)
+        non_empty_count += column != ''
+        header_hits += keyword_hits
+        if col_idx == 0:
+            first_cell_has_keyword = keyword_hits
+        columns.append(column)
+
+    first_cell = columns[0] if width else np.full(row_count, '', dtype=object)
 
-        # Look at first column for category names
-        first_cell = row_values[0] if row_values else ''
+    return {
+        "width": width,
+        "columns": columns,
+        "first_cell": first_cell,
+        "non_empty_count": non_empty_count,
+        "first_cell_non_empty": first_cell != '',
+        "first_cell_has_keyword": first_cell_has_keyword,
+        "first_cell_is_label": label_cell_mask(first_cell),
+        "header_hits": header_hits,
+    }
 
-        if first_cell and first_cell not in merged_cells_info:
-            # Count non-empty cells
-            non_empty_count = sum(1 for v in row_values if v)
-            non_empty_other = sum(1 for v in row_values[1:] if v)
 
-            logger.debug(
-                f"Row {row_idx}: '{first_cell}' | Non-empty: {non_empty_count} | Other: {non_empty_other}")
+def distinct_value_mask(values, check):
+    """Boolean mask of ``check(value)`` over an array, evaluated once per distinct value"""
+    if not len(values):
+        return np.zeros(0, dtype=bool)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    verdicts = np.array([check(value) for value in distinct], dtype=bool)
+    return verdicts[inverse]
 
-            # SIMPLE RULE: If first cell has content and most other cells are empty
-            # Remove the restrictive filtering that might be blocking valid categories
-            is_regular_data = (looks_like_ip(first_cell) or
-                               looks_like_service(first_cell))
 
-            if (not is_regular_data and
-                non_empty_count <= 3 and
-                    non_empty_other <= 2):
+def keyword_cell_mask(values):
+    """Mask of cells that contain a header keyword"""
+    return distinct_value_mask(
+        values, lambda value: any(keyword in value.lower() for keyword in HEADER_KEYWORDS))
 
-                merged_cells_info[first_cell] = {
-                    'row': row_idx,
-                    'non_empty_count': non_empty_count,
-                    'other_cells_empty': non_empty_other
-                }
-                logger.debug(f"   ✅ CATEGORY FOUND: '{first_cell}'")
-            else:
-                logger.debug(
-                    f"   ❌ SKIPPED: '{first_cell}' - regular_data: {is_regular_data}, non_empty: {non_empty_count}, other: {non_empty_other}")
+
+def label_cell_mask(values):
+    """Mask of first cells that don't look like an IP or a service, evaluated once per distinct value"""
+    return distinct_value_mask(
+        values, lambda value: bool(value) and not looks_like_ip(value) and not looks_like_service(value))
+
+
+def column_present(scan, index, ignored):
+    """Mask of rows whose mapped cell has a value, mirroring get_cell_value.
+
+    get_cell_value blanks an exact 'nan'; ``ignored`` are further lowercase
+    values that has_valid_rule_data treats as missing.
+    """
+    if index is None or index >= scan["width"]:
+        return np.zeros(len(scan["first_cell"]), dtype=bool)
+    column = scan["columns"][index]
+    present = (column != '') & (column != 'nan')
+    if ignored:
+        present &= ~distinct_value_mask(column, lambda value: value.lower() in ignored)
+    return present
+
+
+def valid_rule_mask(scan, column_mapping):
+    """Vectorized has_valid_rule_data over every row of a scanned sheet"""
+    has_source = column_present(scan, column_mapping.get('source_ip'), ['subnet'])
+    has_dest = column_present(scan, column_mapping.get('destination_ip'), ['subnet'])
+    has_service = column_present(scan, column_mapping.get('service'), ['nan'])
+    has_desc = column_present(scan, column_mapping.get('description'), ['nan'])
+
+    return has_service & (has_source | has_dest | has_desc)
+
+
+def detect_merged_cells(sheet_rows, scan=None):
+    if scan is None:
+        scan = scan_sheet(sheet_rows)
+    merged_cells_info = {}
+
+    # Find header row first
+    header_row_idx, headers = find_header_row(sheet_rows, scan)
+
+    if header_row_idx is None:
+        header_row_idx = 0
+
+    # Category rows: first cell has content that isn't regular data and most
+    # other cells are empty
+    non_empty_count = scan["non_empty_count"]
+    non_empty_other = non_empty_count - scan["first_cell_non_empty"]
+    candidates = (
+        (np.arange(len(sheet_rows)) > header_row_idx)
+        & scan["first_cell_non_empty"]
+        & (non_empty_count <= 3)
+        & (non_empty_other <= 2)
+        & scan["first_cell_is_label"]
+    )
+
+    # Only the first row carrying a given label becomes its category
+    for row_idx in np.flatnonzero(candidates):
+        first_cell = str(scan["first_cell"][row_idx])
+        if first_cell in merged_cells_info:
+            continue
+        merged_cells_info[first_cell] = {
+            'row': int(row_idx),
+            'non_empty_count': int(non_empty_count[row_idx]),
+            'other_cells_empty': int(non_empty_other[row_idx])
+        }
+        logger.debug(f"   ✅ CATEGORY FOUND: '{first_cell}'")
 
     logger.debug(f"🎯 FINAL CATEGORIES: {list(merged_cells_info.keys())}")
     return merged_cells_info
 
 
-def process_sheet_data_structured(df_raw, sheet_name):
+def process_sheet_data_structured(sheet_rows, sheet_name):
     """Process sheet with merged cell detection and category grouping"""
     category_data = {}
+    scan = scan_sheet(sheet_rows)
 
     # Step 1: Find the header row
-    header_row_idx, headers = find_header_row(df_raw)
+    header_row_idx, headers = find_header_row(sheet_rows, scan)
 
     if header_row_idx is None:
         headers = ["Source IP", "Source Host", "Destination IP",
@@ -224,102 +635,80 @@ def process_sheet_data_structured(df_raw, sheet_name):
     column_mapping = detect_column_mapping(headers, sheet_name)
 
     # Step 3: Detect merged cell categories
-    merged_categories = detect_merged_cells(df_raw)
+    merged_categories = detect_merged_cells(sheet_rows, scan)
 
     # Use ALL detected merged categories
     valid_categories = merged_categories
     logger.debug(f"🎯 Categories to use: {list(valid_categories.keys())}")
 
-    current_category = None
-    category_rows = set([info['row'] for info in valid_categories.values()])
-
-    # Process all rows after the header row
-    for idx, row in df_raw.iterrows():
-        # Skip rows before and including the header row
-        if header_row_idx is not None and idx <= header_row_idx:
-            continue
-
-        row_data = [str(cell) if pd.notna(cell) else '' for cell in row]
-
-        # Skip empty rows
-        if not any(cell.strip() for cell in row_data if cell):
-            continue
-
-        # Check if this row is itself a category row (merged cell)
-        if idx in category_rows:
-            # This row is a category - find which category it is
-            for category_name, category_info in valid_categories.items():
-                if category_info['row'] == idx:
-                    current_category = category_name
-                    logger.debug(f"   📍 Row {idx} is category: '{current_category}'")
-
-                    # Initialize this category
-                    if current_category not in category_data:
-                        category_data[current_category] = {
-                            "headers": headers,
-                            "column_mapping": column_mapping,
-                            "data_rows": []
-                        }
-                    break
-            continue  # Skip processing category rows as data
-
-        # Process data rows under current category
-        if current_category and len(row_data) >= len(column_mapping):
-            has_data = any(cell.strip() for cell in row_data if cell)
-
-            if has_data and not looks_like_header_row(row_data):
-                # Additional validation to ensure this is actual rule data
-                source_ip = get_cell_value(
-                    row_data, column_mapping.get('source_ip'))
-                destination_ip = get_cell_value(
-                    row_data, column_mapping.get('destination_ip'))
-                service = get_cell_value(
-                    row_data, column_mapping.get('service'))
-
-                # Check if this row contains actual firewall rule data
-                if has_valid_rule_data(row_data, column_mapping):
-                    category_data[current_category]["data_rows"].append(
-                        row_data)
-                    logger.debug(
-                        f"   ✅ Added data to '{current_category}': {source_ip} → {destination_ip} ({service})")
-                else:
-                    logger.debug(
-                        f"   ⚠️ Skipping row {idx} - doesn't contain valid rule data")
+    category_names = list(valid_categories.keys())
+    row_positions = np.arange(len(sheet_rows))
+    category_of_row = np.full(len(sheet_rows), -1)
+    for position, category_info in enumerate(valid_categories.values()):
+        category_of_row[category_info['row']] = position
+        category_data[category_names[position]] = {
+            "headers": headers,
+            "column_mapping": column_mapping,
+            "data_rows": []
+        }
+
+    # Each row belongs to the closest category row above it
+    is_category_row = category_of_row >= 0
+    last_category_row = np.maximum.accumulate(
+        np.where(is_category_row, row_positions, -1)) if len(sheet_rows) else row_positions
+
+    data_rows = (
+        (row_positions > header_row_idx)
+        & (scan["non_empty_count"] > 0)
+        & ~is_category_row
+        & (last_category_row >= 0)
+        & (scan["header_hits"] < 2)
+        & valid_rule_mask(scan, column_mapping)
+    )
+    if scan["width"] < len(column_mapping):
+        data_rows[:] = False
+
+    for row_idx in np.flatnonzero(data_rows):
+        current_category = category_names[category_of_row[last_category_row[row_idx]]]
+        category_data[current_category]["data_rows"].append(list(sheet_rows[row_idx]))
 
     # Handle case where no categories were detected but there is data
     if not category_data:
         logger.info(
             f"⚠️ No categories detected in sheet '{sheet_name}', checking for uncategorized data...")
         uncategorized_data = process_uncategorized_data(
-            df_raw, header_row_idx, headers, column_mapping)
+            sheet_rows, header_row_idx, headers, column_mapping, scan)
         if uncategorized_data:
             category_data["Uncategorized"] = uncategorized_data
 
     return category_data
 
 
-def process_uncategorized_data(df_raw, header_row_idx, headers, column_mapping):
+def process_uncategorized_data(sheet_rows, header_row_idx, headers, column_mapping, scan=None):
     """Process data rows that weren't categorized by merged cell detection"""
-    data_rows = []
-
-    for idx, row in df_raw.iterrows():
-        # Skip rows before and including the header row
-        if header_row_idx is not None and idx <= header_row_idx:
-            continue
-
-        row_data = [str(cell) if pd.notna(cell) else '' for cell in row]
-
-        # Skip empty rows
-        if not any(cell.strip() for cell in row_data if cell):
-            continue
-
-        # Skip rows that look like headers or categories
-        if looks_like_header_row(row_data) or looks_like_category_row(row_data):
-            continue
-
-        # Check if this is valid rule data
-        if len(row_data) >= len(column_mapping) and has_valid_rule_data(row_data, column_mapping):
-            data_rows.append(row_data)
+    if scan is None:
+        scan = scan_sheet(sheet_rows)
+
+    # Same test as looks_like_category_row, over the whole sheet
+    category_like = (
+        (scan["non_empty_count"] <= 3)
+        & scan["first_cell_is_label"]
+        & ~scan["first_cell_has_keyword"]
+    )
+
+    rows = (
+        (scan["non_empty_count"] > 0)
+        & (scan["header_hits"] < 2)
+        & ~category_like
+        & valid_rule_mask(scan, column_mapping)
+    )
+    # Skip rows before and including the header row
+    if header_row_idx is not None:
+        rows &= np.arange(len(sheet_rows)) > header_row_idx
+    if scan["width"] < len(column_mapping):
+        rows[:] = False
+
+    data_rows = [list(sheet_rows[row_idx]) for row_idx in np.flatnonzero(rows)]
 
     return {
         "headers": headers,
@@ -346,41 +735,24 @@ def looks_like_category_row(row_data):
         # Check if first cell doesn't look like regular data
         if first_cell and not looks_like_ip(first_cell) and not looks_like_service(first_cell):
             # Check if it doesn't contain header keywords
-            header_keywords = ['source', 'destination',
-                               'ip', 'host', 'service', 'description']
-            if not any(keyword in first_cell.lower() for keyword in header_keywords):
+            if not any(keyword in first_cell.lower() for keyword in HEADER_KEYWORDS):
                 return True
 
     return False
 
 
-def find_header_row(df_raw):
+def find_header_row(sheet_rows, scan=None):
     """Intelligently find the header row by scanning for column headers"""
-    header_keywords = ['source', 'destination',
-                       'ip', 'host', 'service', 'description']
+    if scan is None:
+        scan = scan_sheet(sheet_rows)
 
-    for idx, row in df_raw.iterrows():
-        row_num = idx + 1
-        row_data = [str(cell).strip().lower()
-                    for cell in row if pd.notna(cell)]
-
-        # Skip empty rows
-        if not any(row_data):
-            continue
-
-        # Check if this row contains header-like content
-        header_like_count = 0
-        for cell in row_data:
-            # Check if cell contains header keywords
-            if any(keyword in cell for keyword in header_keywords):
-                header_like_count += 1
-
-        # If we found multiple header-like cells, this is likely the header row
-        if header_like_count >= 2:  # Reduced threshold to be more flexible
-            original_headers = [str(cell).strip()
-                                for cell in row if pd.notna(cell)]
-            logger.debug(f"✅ Found header row at row {row_num}: {original_headers}")
-            return idx, original_headers
+    # The first row with multiple header-like cells is likely the header row
+    candidates = np.flatnonzero(scan["header_hits"] >= 2)
+    if candidates.size:
+        idx = int(candidates[0])
+        original_headers = [cell.strip() for cell in sheet_rows[idx] if cell]
+        logger.debug(f"✅ Found header row at row {idx + 1}: {original_headers}")
+        return idx, original_headers
 
     logger.warning("❌ No header row found, using fallback detection")
     return None, None
@@ -499,7 +871,12 @@ def looks_like_ip(value):
 
 
 def looks_like_service(value):
-    """Check if value looks like a service definition"""
+    """Check if value looks like a service definition.
+
+    Returns a plain bool. It used to return a (verdict, message) tuple, which
+    is always truthy, so no first cell ever counted as a category label and
+    every sheet was synced into 'Uncategorized'.
+    """
     if not value:
         return False
 
@@ -518,331 +895,325 @@ def looks_like_service(value):
 
     for pattern in service_patterns:
         if re.match(pattern, value):
-            return True, ""
-
-    if value in service_names:
-        return True, ""
-
-    return False, ""
-
-
-def validate_ip(value: str) -> Tuple[bool, str]:
-    """ip valiadtion with octet range checking"""
-    if not value:
-        return False, "Ip adress cannot be empty"
-
-    ip_list = [x.strip() for x in str(value).split(',')]
-
-    for single_ip in ip_list:
-        if not single_ip:
-            continue
-
-        single_ip_tolower = single_ip.lower()
-        special_values = ['any', 'all', 'subnet', '0.0.0.0']
-
-        if single_ip_tolower in special_values:
-            continue
+            return True
 
-        cidr_pattern = r'(^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})/(\d{1,2})$'
-        cidr_match = re.match(cidr_pattern, single_ip)
+    return value in service_names
 
-        if cidr_match:
-            ip_part = cidr_match.group(1)
-            cidr_prefix = int(cidr_match.group(2))
 
-            if not (0 <= cidr_prefix <= 32):
-                return False, f"Invalid CIDR prefix: {single_ip}, Must be 0-32"
+def get_cell_value(row, index):
+    """Safely get cell value"""
+    if index is None or index >= len(row):
+        return ""
+    value = str(row[index]).strip()
+    return value if value and value != 'nan' else ""
 
-            is_valid, error = validate_ipv4_octets(ip_part)
-            if not is_valid:
-                return False, error
-            continue
-        ip_pattern = r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$'
-        ip_match = re.match(ip_pattern, single_ip)
 
-        if not ip_match:
-            return False, f"Invalid IP format: '{single_ip}'. Expected format: x.x.x.x"
+def is_real_ip(value):
+    """Check if value is a real IP address"""
+    return looks_like_ip(value)
 
-        is_valid, error = validate_ipv4_octets(single_ip)
-        if not is_valid:
-            return False, error
 
-    return True, ""
+def looks_like_header_row(row_data):
+    """Check if this row looks like a header row"""
+    if not row_data:
+        return False
 
+    header_keywords = ['source', 'destination',
+                       'ip', 'host', 'service', 'description']
+    header_like_count = 0
 
-def validate_ipv4_octets(ip: str) -> Tuple[bool, str]:
-    """Validate IPv4 address octets are in range 0-255"""
-    try:
-        octets = ip.split('.')
+    for cell in row_data:
+        cell_str = str(cell).lower().strip()
+        if any(keyword in cell_str for keyword in header_keywords):
+            header_like_count += 1
 
-        if len(octets) != 4:
-            return False, f'IP must have 4 octets, found {len(octets)}'
+    return header_like_count >= 2
 
-        for i, octet in enumerate(octets):
-            octet_num = int(octet)
 
-            if not (0 <= octet_num <= 255):
-                return False, f"Octet {i+1} is {octet_num}, must be 0-255"
+def rule_natural_key(system_type, category, source_ip, destination_ip, service):
+    """Hash the columns that identify a firewall rule into a fixed-width key"""
+    raw = '\x1f'.join(value or '' for value in
+                       (system_type, category, source_ip, destination_ip, service))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
-            if len(octet) > 1 and octet[0] == '0':
-                return False, f"Octet {i+1} has leading zero: '{octet}'"
 
-        return True, ""
+def rule_fingerprint(row):
+    """Hash every synced column of a rule so content changes can be detected"""
+    raw = '\x1f'.join(row.get(column) or '' for column in FINGERPRINT_COLUMNS)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
-    except ValueError:
-        return False, f"Invalid IP adress: '{ip}'. Octets must be numbers"
 
+def build_upsert_statement(rows):
+    """Build a multi-row upsert on firewall_rules.natural_key for the bound dialect.
 
-def validate_service(value: str) -> Tuple[bool, str]:
-    '''Validate service port specification'''
-    if not value:
-        return False, "Service cannot be empty"
+    Returns None for dialects without a native upsert; upsert_rules then takes
+    the portable path.
+    """
+    table = FirewallRule.__table__
+    dialect = db.session.get_bind().dialect.name
 
-    service_list = [x.strip() for x in str(value).split(',')]
+    if dialect == 'mysql':
+        stmt = mysql_insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in UPSERT_COLUMNS})
 
-    known_services = [
-        'http', 'https', 'ssh', 'ftp', 'ftps', 'sftp',
-        'smtp', 'smtps', 'pop3', 'pop3s', 'imap', 'imaps',
-        'dns', 'dhcp', 'snmp', 'ldap', 'ldaps',
-        'telnet', 'rdp', 'vnc', 'nfs', 'smb',
-        'mysql', 'postgres', 'mongodb', 'redis',
-        'kerberos', 'ntp', 'syslog', 'rsync'
-    ]
+    if dialect == 'sqlite':
+        stmt = sqlite_insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.natural_key],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS})
 
-    for item in service_list:
-        if not item:
-            continue
+    return None
 
-        item_tolower = item.lower()
-        if item_tolower in known_services:
-            continue
 
-        if item_tolower in ['icmp', 'ip', 'gre', 'esp', 'ah']:
-            continue
+def upsert_rules(rows):
+    """Insert firewall_rules rows, updating the ones whose natural_key already exists"""
+    stmt = build_upsert_statement(rows)
+    if stmt is not None:
+        db.session.execute(stmt)
+        return
 
-        proto_port_pattern = r'^(tcp|udp|icmp)/(\d+)$'
-        proto_match = re.match(proto_port_pattern, item_tolower)
-        if proto_match:
-            protocol = proto_match.group(1)
-            port = int(proto_match.group(2))
-            if protocol == 'icmp':
-                if not (0 <= port <= 255):
-                    return False, f"ICMP type {port} out of range. Must be between 0-255"
-            else:
-                if not (1 <= port <= 65535):
-                    return False, f"Port {port} out of range. Must be between 1-65535"
-            continue
-        if item.isdigit():
-            port = int(item)
-            if not (1 <= port <= 65535):
-                return False, f"Port {port} out of range. Must be between 1-65535"
-            continue
+    # Portable fallback: update the keys that exist and insert the rest. Unlike
+    # the native upserts it is not safe against a concurrent insert of the same
+    # key, which the sync lease rules out
+    table = FirewallRule.__table__
+    existing = dict(db.session.execute(
+        select(table.c.natural_key, table.c.id).where(
+            table.c.natural_key.in_([row["natural_key"] for row in rows]))).all())
+    updates = [{"id": existing[row["natural_key"]], **{column: row[column] for column in UPSERT_COLUMNS}}
+               for row in rows if row["natural_key"] in existing]
+    inserts = [row for row in rows if row["natural_key"] not in existing]
+    if updates:
+        db.session.execute(update(FirewallRule), updates)
+    if inserts:
+        db.session.execute(insert(table), inserts)
+
+
+def backfill_natural_keys():
+    """Assign natural keys to rules created before the column existed"""
+    legacy_rules = db.session.execute(
+        select(FirewallRule.id, FirewallRule.system_type, FirewallRule.category,
+               FirewallRule.source_ip, FirewallRule.destination_ip, FirewallRule.service).where(
+            FirewallRule.natural_key.is_(None))).all()
+    if not legacy_rules:
+        return
 
-        range_pattern = r'^(\d+)-(\d+)$'
-        range_match = re.match(range_pattern, item)
-
-        if range_match:
-            start_port = int(range_match.group(1))
-            end_port = int(range_match.group(2))
-            if not (1 <= start_port <= 65535):
-                return False, f"Start port {start_port} out of range. Must be between 1-65535"
-            if not (1 <= end_port <= 65535):
-                return False, f"End port {end_port} out of range. Must be between 1-65535"
-            if start_port > end_port:
-                return False, f"Invalid range: {start_port} - {end_port}. Start must be less than the end port"
-            if start_port == end_port:
-                return False, f"Use single port {start_port} instead of range {start_port}-{end_port}"
+    taken = set(db.session.execute(
+        select(FirewallRule.natural_key).where(
+            FirewallRule.natural_key.is_not(None))
+    ).scalars())
+
+    keyed = []
+    for rule in legacy_rules:
+        key = rule_natural_key(rule.system_type, rule.category,
+                               rule.source_ip, rule.destination_ip, rule.service)
+        # Duplicates of an already keyed rule stay unkeyed rather than
+        # violating the unique index
+        if key in taken:
             continue
+        keyed.append({"rule_id": rule.id, "key": key})
+        taken.add(key)
 
-        return False, f"Invalid service format: '{item}'. Use port (80), range (80-90), procol/port (tcp/80) or service name (http)"
-
-    return True, ""
-
+    backfilled = 0
+    if keyed:
+        table = FirewallRule.__table__
+        result = db.session.execute(
+            update(table).where(table.c.id == bindparam('rule_id')).values(natural_key=bindparam('key')),
+            keyed)
+        backfilled = result.rowcount
+    logger.info(f"🔑 Backfilled natural keys for {backfilled} of {len(legacy_rules)} legacy rules")
 
-def validate_description(value: str) -> Tuple[bool, str]:
-    '''valiadte description field'''
-    if not value:
-        return False, "Description cannot be empty"
-
-    value = str(value).strip()
-
-    # length check
-    if len(value) < 1:
-        return False, f"Description too short ({len(value)} chars). Minimum 1 characters"
-
-    if len(value) > 500:
-        return False, f"Description too long ({len(value)} chars). Maximum 500 chars"
-
-    forbidden_chars = ['<', '>', '|', '\x00', '\r']
-    for char in forbidden_chars:
-        if char in value:
-            return False, f"Description contains invalid character(s): '{char}'"
-    # regex matching for suspicious statements, xss, sql injection and more...not a feature but feel free to expound on in future
-    suspicious_patterns = [
-        r"(drop\s+table)",
-        r"(delete\s+from)",
-        r"insert\s+into",
-        r"(<script)",
-        r"(javascript)"
-    ]
-
-    for pattern in suspicious_patterns:
-        if re.search(pattern, value, re.IGNORECASE):
-            return False, "Description contains suspicious content"
-
-    return True, ""
-
-
-def validate_request_payload(data: dict) -> List[str]:
-    '''validate the entire acl_request payload'''
-    errors = []
-
-    required_fields = ['sourceIP', 'destinationIP', 'service', 'description']
-
-    system_type = data.get('system_type', '')
-
-    for field in required_fields:
-        if field not in data or not data[field]:
-            if system_type == 'Template' and field == 'description':
-                continue
-            errors.append(f"missing required field {field}")
 
-    # if missing required fields return early
-    if errors:
-        return errors
+def collect_rule_rows(sheet_structures):
+    """Flatten parsed sheets into firewall_rules rows keyed by natural key"""
+    rows = {}
+    now = datetime.utcnow()
 
-    # validate sourceIP
-    is_valid, error = validate_ip(data['sourceIP'])
-    if not is_valid:
-        errors.append(f"sourceIP . {error}")
+    for system_type, categories_data in sheet_structures.items():
+        for category, data in categories_data.items():
+            column_mapping = data.get("column_mapping", {})
 
-    # validate destinationIP
-    is_valid, error = validate_ip(data['destinationIP'])
-    if not is_valid:
-        errors.append(f"destinationIP . {error}")
+            for row in data.get("data_rows", []):
+                if not has_valid_rule_data(row, column_mapping):
+                    continue
 
-    # valiadte service
-    is_valid, error = validate_service(data['service'])
-    if not is_valid:
-        errors.append(f"service . {error}")
-
-    # validate description
-    is_valid, error = validate_description(data['description'])
-    if not is_valid:
-        errors.append(f"description . {error}")
-
-    return errors
-
-
-def validate_bulk_requests(requests: List[dict]) -> Dict[int, List[str]]:
-    '''validate multiple acl requests'''
-    all_errors = {}
-
-    for index, request_data in enumerate(requests):
-        errors = validate_request_payload(request_data)
-
-        if errors:
-            all_errors[index] = errors
-
-    return all_errors
-
-
-def get_cell_value(row, index):
-    """Safely get cell value"""
-    if index is None or index >= len(row):
-        return ""
-    value = str(row[index]).strip()
-    return value if value and value != 'nan' else ""
-
-
-def is_real_ip(value):
-    """Check if value is a real IP address"""
-    return looks_like_ip(value)
-
-
-def looks_like_header_row(row_data):
-    """Check if this row looks like a header row"""
-    if not row_data:
-        return False
+                source_ip = get_cell_value(row, column_mapping.get('source_ip'))
+                destination_ip = get_cell_value(
+                    row, column_mapping.get('destination_ip'))
+                service = get_cell_value(row, column_mapping.get('service'))
+                key = rule_natural_key(
+                    system_type, category, source_ip, destination_ip, service)
+
+                # Later rows win, as they did with the per-row update
+                rows[key] = {
+                    "natural_key": key,
+                    "system_type": system_type,
+                    "category": category,
+                    "source_ip": source_ip,
+                    "source_host": get_cell_value(
+                        row, column_mapping.get('source_host')),
+                    "destination_ip": destination_ip,
+                    "destination_host": get_cell_value(
+                        row, column_mapping.get('destination_host')),
+                    "service": service,
+                    "description": get_cell_value(
+                        row, column_mapping.get('description')),
+                    "created_at": now,
+                }
+                rows[key]["fingerprint"] = rule_fingerprint(rows[key])
 
-    header_keywords = ['source', 'destination',
-                       'ip', 'host', 'service', 'description']
-    header_like_count = 0
+    return list(rows.values())
 
-    for cell in row_data:
-        cell_str = str(cell).lower().strip()
-        if any(keyword in cell_str for keyword in header_keywords):
-            header_like_count += 1
 
-    return header_like_count >= 2
+def sync_to_mysql(sheet_structures, sweep=False, progress=None):
+    """Sync parsed data to MySQL, writing only new rules and rules whose content changed.
 
+    Every run gets the next sync generation and stamps it on the rows it writes.
+    With ``sweep`` set, rules that the run did not see are purged by generation:
+    when the swept sheets hold more rules than the run matched, the unchanged
+    rules are stamped too (a bulk UPDATE of sync_generation alone) and every rule
+    of those sheets still on an older generation is deleted. The sweep only
+    covers system types whose sheet produced at least one rule, so a sheet that
+    comes back empty (or is gone) never takes its stored rules with it.
 
-def sync_to_mysql(sheet_structures):
-    """Sync parsed data to MySQL database using UPSERT logic"""
+    ``progress(rows_processed)`` is called as rows are handled, unchanged rows
+    first and then every written chunk, inside the open transaction.
+    """
     try:
-        total_rules_added = 0
-        total_rules_updated = 0
-        for system_type, categories_data in sheet_structures.items():
-
-            # Process categories in this sheet
-            for category, data in categories_data.items():
-                column_mapping = data.get("column_mapping", {})
-                data_rows = data.get("data_rows", [])
-
-                for row in data_rows:
-                    source_ip = get_cell_value(
-                        row, column_mapping.get('source_ip'))
-                    source_host = get_cell_value(
-                        row, column_mapping.get('source_host'))
-                    destination_ip = get_cell_value(
-                        row, column_mapping.get('destination_ip'))
-                    destination_host = get_cell_value(
-                        row, column_mapping.get('destination_host'))
-                    service = get_cell_value(
-                        row, column_mapping.get('service'))
-                    description = get_cell_value(
-                        row, column_mapping.get('description'))
-
-                    if has_valid_rule_data(row, column_mapping):
-                        # Create new record
-                        existing_rule = FirewallRule.query.filter_by(
-                            system_type=system_type,
-                            category=category,
-                            source_ip=source_ip,
-                            destination_ip=destination_ip,
-                            service=service,
-                        ).first()
-
-                        if existing_rule:
-                            # Update existing rule
-                            existing_rule.source_host = source_host
-                            existing_rule.destination_host = destination_host
-                            existing_rule.service = service
-                            existing_rule.description = description
-                            total_rules_updated += 1
-
-                        else:
-                            # Add new rule
-                            rule = FirewallRule(
-                                system_type=system_type,
-                                category=category,
-                                source_ip=source_ip,
-                                source_host=source_host,
-                                destination_ip=destination_ip,
-                                destination_host=destination_host,
-                                service=service,
-                                description=description
-                            )
-                            db.session.add(rule)
-                            total_rules_added += 1
-
-        db.session.commit()
+        chunk_size = GOOGLE_SHEETS['UPSERT_CHUNK_SIZE']
+
+        state = get_sync_state()
+        generation = (state.generation or 0) + 1
+
+        backfill_natural_keys()
+        with SYNC_STAGE_DURATION.time(stage='validate'):
+            rows = collect_rule_rows(sheet_structures)
+        upsert_started = time.perf_counter()
+
+        # Diff incoming fingerprints against the stored ones in memory
+        stored = {
+            key: (rule_id, fingerprint, sync_generation)
+            for key, rule_id, fingerprint, sync_generation in db.session.execute(
+                select(FirewallRule.natural_key, FirewallRule.id,
+                       FirewallRule.fingerprint, FirewallRule.sync_generation).where(
+                    FirewallRule.natural_key.is_not(None)))
+        }
+
+        new_rows = []
+        changed_rows = []
+        unchanged_ids = []
+        for row in rows:
+            row["sync_generation"] = generation
+            match = stored.get(row["natural_key"])
+            if match is None:
+                new_rows.append(row)
+            elif match[1] != row["fingerprint"]:
+                changed_rows.append({
+                    "id": match[0],
+                    **{column: row[column] for column in UPSERT_COLUMNS}
+                })
+            elif match[2] != generation:
+                unchanged_ids.append(match[0])
+
+        # Rules of the swept sheets that this run did not match, counted before
+        # anything is written; legacy rows without a natural key count too
+        swept_types = {row["system_type"] for row in rows} if sweep else set()
+        stale_count = 0
+        if swept_types:
+            stale_count = db.session.execute(
+                select(func.count()).select_from(FirewallRule).where(
+                    FirewallRule.system_type.in_(swept_types))
+            ).scalar() - (len(rows) - len(new_rows))
+
+        # Mark: before a sweep, unchanged rules only get the generation stamped
+        if stale_count:
+            for start in range(0, len(unchanged_ids), chunk_size):
+                db.session.execute(
+                    update(FirewallRule)
+                    .where(FirewallRule.id.in_(unchanged_ids[start:start + chunk_size]))
+                    .values(sync_generation=generation))
+
+        rows_processed = len(rows) - len(new_rows) - len(changed_rows)
+        if progress:
+            progress(rows_processed)
+
+        # New rules still go through the upsert so a concurrent insert of the
+        # same key cannot fail the sync
+        for start in range(0, len(new_rows), chunk_size):
+            chunk = new_rows[start:start + chunk_size]
+            upsert_rules(chunk)
+            rows_processed += len(chunk)
+            if progress:
+                progress(rows_processed)
+
+        # Changed rules become a bulk UPDATE by primary key
+        for start in range(0, len(changed_rows), chunk_size):
+            chunk = changed_rows[start:start + chunk_size]
+            db.session.execute(update(FirewallRule), chunk)
+            rows_processed += len(chunk)
+            if progress:
+                progress(rows_processed)
+
+        # Sweep: anything still on an older generation (including legacy rows
+        # that never got a natural key or a generation) is gone from the sheet,
+        # but only for sheets that produced rules; an empty sheet is more likely
+        # a broken export than a deliberate wipe
+        stale_ids = []
+        if swept_types:
+            kept_sheets = [name for name in sheet_structures if name not in swept_types]
+            if kept_sheets:
+                logger.warning(f"⚠️ Sheets produced no rules, not sweeping them: {kept_sheets}")
+        if stale_count:
+            stale_ids = db.session.execute(
+                select(FirewallRule.id).where(
+                    FirewallRule.system_type.in_(swept_types),
+                    or_(FirewallRule.sync_generation < generation,
+                        FirewallRule.sync_generation.is_(None)))
+            ).scalars().all()
+
+            for start in range(0, len(stale_ids), chunk_size):
+                db.session.execute(
+                    delete(FirewallRule).where(
+                        FirewallRule.id.in_(stale_ids[start:start + chunk_size])))
+
+        # Keep address_ranges and service_ranges in step: removed rules lose
+        # their ranges and new rules (plus any that predate the tables) get theirs
+        remove_address_ranges('rule', stale_ids, chunk_size)
+        index_missing_addresses('rule', chunk_size)
+        remove_service_ranges('rule', stale_ids, chunk_size)
+        index_missing_services('rule', chunk_size)
+
+        # The generation only advances when the catalog actually changed
+        if new_rows or changed_rows or stale_ids:
+            state.generation = generation
+        SYNC_STAGE_DURATION.observe(time.perf_counter() - upsert_started, stage='upsert')
+
+        with SYNC_STAGE_DURATION.time(stage='commit'):
+            db.session.commit()
+
+        total_rules_added = len(new_rows)
+        total_rules_updated = len(changed_rows)
+        total_rules_unchanged = len(rows) - total_rules_added - total_rules_updated
+        total_rules_removed = len(stale_ids)
         logger.info(
-            f"✅ Sync complete: {total_rules_added} added, {total_rules_updated} updated")
+            f"✅ Sync complete: {total_rules_added} added, {total_rules_updated} updated, "
+            f"{total_rules_unchanged} unchanged, {total_rules_removed} removed")
+        SYNC_ROWS.inc(total_rules_added, result='added')
+        SYNC_ROWS.inc(total_rules_updated, result='updated')
+        SYNC_ROWS.inc(total_rules_unchanged, result='unchanged')
+        SYNC_ROWS.inc(total_rules_removed, result='removed')
+        return {
+            "added": total_rules_added,
+            "updated": total_rules_updated,
+            "unchanged": total_rules_unchanged,
+            "removed": total_rules_removed,
+            "generation": state.generation
+        }
 
     except Exception as e:
         db.session.rollback()
         logger.error("❌ Error syncing to MySQL", exc_info=True)
+        return None
 
 
 def build_population_data(rule):
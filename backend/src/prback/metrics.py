@@ -0,0 +1,164 @@
+'''This module holds the in-process metrics for the application: sync stage timings, row and
+byte counts, and request latency per blueprint route. Metrics are kept in memory per worker
+process and rendered in the Prometheus text exposition format by the /metrics endpoint.
+
+Nothing is shared between processes: run the app as a single worker process (the Docker image's
+gunicorn default) when scraping /metrics. With several workers each scrape reaches one of them and
+sees only that worker's share of the counts. Sheet parse workers report their timings back to the
+sync process, which records them.
+'''
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, shared by the latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, 120.0, 300.0)
+
+REGISTRY = []
+
+
+def format_labels(labelnames, values, extra=()):
+    """Render a label set as {name="value",...}"""
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    rendered = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs)
+    return '{' + rendered + '}'
+
+
+def format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named family of samples keyed by label values"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        REGISTRY.append(self)
+
+    def label_values(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for name, labels, value in self.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield f"{self.name}_total", format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent inside the with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, series in self.values.items():
+            for bound, count in zip(self.buckets, series['buckets']):
+                yield (f"{self.name}_bucket",
+                       format_labels(self.labelnames, key, [('le', format_value(bound))]),
+                       count)
+            yield (f"{self.name}_bucket",
+                   format_labels(self.labelnames, key, [('le', '+Inf')]), series['count'])
+            yield f"{self.name}_sum", format_labels(self.labelnames, key), series['sum']
+            yield f"{self.name}_count", format_labels(self.labelnames, key), series['count']
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text format"""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# Google Sheets sync
+SYNC_RUNS = Counter(
+    'prback_sync_runs', 'Sync attempts by trigger and outcome', ('trigger', 'status'))
+SYNC_DURATION = Histogram(
+    'prback_sync_duration_seconds', 'Wall time of a whole sync run', ('trigger',))
+SYNC_STAGE_DURATION = Histogram(
+    'prback_sync_stage_duration_seconds',
+    'Wall time of each sync stage (fetch, parse, validate, upsert, commit)', ('stage',))
+SYNC_SHEET_PARSE_DURATION = Histogram(
+    'prback_sync_sheet_parse_duration_seconds', 'Wall time to parse one sheet', ('sheet',))
+SYNC_BYTES_DOWNLOADED = Counter(
+    'prback_sync_downloaded_bytes', 'Workbook bytes downloaded from Google Sheets')
+SYNC_ROWS = Counter(
+    'prback_sync_rows', 'Rule rows handled by the sync by result', ('result',))
+SYNC_LAST_ROWS = Gauge(
+    'prback_sync_last_rows', 'Rule rows parsed by the last completed sync')
+SYNC_LAST_ROWS_PER_SECOND = Gauge(
+    'prback_sync_last_rows_per_second', 'Rule rows per second over the last completed sync')
+SYNC_LAST_SUCCESS = Gauge(
+    'prback_sync_last_success_timestamp_seconds', 'Unix time of the last successful sync')
+
+# HTTP requests
+REQUEST_DURATION = Histogram(
+    'prback_http_request_duration_seconds', 'Request latency by blueprint route',
+    ('blueprint', 'endpoint', 'method', 'status'))
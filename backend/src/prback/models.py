@@ -7,6 +7,7 @@ as relationships between different entities where necessary.
 '''
 from .extensions import db
 from datetime import datetime, timezone
+from sqlalchemy.ext.mutable import MutableList
 
 # Store user input
 class ACLRequest(db.Model):
@@ -25,6 +26,22 @@ class ACLRequest(db.Model):
     status = db.Column(db.String(50), default="Pending")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     template_id = db.Column(db.Integer, nullable=True)
+    # [{author, comment, timestamp}, ...] added by reviewers
+    comments = db.Column(MutableList.as_mutable(db.JSON), nullable=True)
+    # reason, hosts, category and comment text for full-text search, kept by search.py
+    search_text = db.Column(db.Text, nullable=True)
+    # Token of the Core INSERT that wrote the row, for reading back ids without RETURNING
+    insert_batch = db.Column(db.String(36), nullable=True, index=True)
+
+    # Every listing filter followed by the (created_at, id) keyset sort
+    __table_args__ = (
+        db.Index('ix_acl_requests_created', 'created_at', 'id'),
+        db.Index('ix_acl_requests_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_acl_requests_requester_created', 'requester', 'created_at', 'id'),
+        db.Index('ix_acl_requests_scope_created', 'system_type', 'category', 'created_at', 'id'),
+        db.Index('ix_acl_requests_search_text', 'search_text',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
     
     def to_json(self):
         return {
@@ -40,7 +57,8 @@ class ACLRequest(db.Model):
             "reason": self.reason,
             "status": self.status,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "template_id": self.template_id
+            "template_id": self.template_id,
+            "comments": self.comments or []
         }
 
 
@@ -57,8 +75,23 @@ class FirewallRule(db.Model):
     destination_host = db.Column(db.Text)
     service = db.Column(db.Text)
     description = db.Column(db.Text)
+    # sha256 of (system_type, category, source_ip, destination_ip, service),
+    # the identity used by the bulk upsert in main.sync_to_mysql
+    natural_key = db.Column(db.String(64), unique=True, nullable=True)
+    # sha256 of every synced column, compared in memory to skip unchanged rows
+    fingerprint = db.Column(db.String(64), nullable=True)
+    # Sync generation that last inserted or changed this rule
+    sync_generation = db.Column(db.Integer, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Prefix indexes for the typeahead search; MySQL can only index TEXT by prefix
+    __table_args__ = (
+        db.Index('ix_firewall_rules_source_ip', 'source_ip', mysql_length=64),
+        db.Index('ix_firewall_rules_destination_ip', 'destination_ip', mysql_length=64),
+        db.Index('ix_firewall_rules_source_host', 'source_host', mysql_length=64),
+        db.Index('ix_firewall_rules_destination_host', 'destination_host', mysql_length=64),
+    )
+
     def to_dropdown_format(self):
         """Convert to frontend format"""
         return {
@@ -137,4 +170,124 @@ class Templates(db.Model):
             "is_active": self.is_active,
             "rule_index": self.rule_index
         }
-    
+
+
+# Bookkeeping for the Google Sheets sync
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(100), nullable=True)
+    content_sha256 = db.Column(db.String(64), nullable=True)
+    last_status = db.Column(db.String(50), nullable=True)
+    last_checked_at = db.Column(db.DateTime, nullable=True)
+    last_synced_at = db.Column(db.DateTime, nullable=True)
+    # Bumped by every sync that inserts, updates or removes rules
+    generation = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "content_sha256": self.content_sha256,
+            "last_status": self.last_status,
+            "last_checked_at": self.last_checked_at.isoformat() if self.last_checked_at else None,
+            "last_synced_at": self.last_synced_at.isoformat() if self.last_synced_at else None,
+            "generation": self.generation
+        }
+
+
+# Generation of the searchable request text, read by the in-process search index
+class SearchState(db.Model):
+    __tablename__ = 'search_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, default=0, nullable=False)
+
+
+# Cluster-wide lease so only one worker runs a given sync at a time
+class SyncLease(db.Model):
+    __tablename__ = 'sync_leases'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    holder = db.Column(db.String(255), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+# Manual sync requests, run in the background and polled by the client
+class SyncJob(db.Model):
+    __tablename__ = 'sync_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    requested_by = db.Column(db.String(120), nullable=True)
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    # Set while the job is queued or running; the unique index allows one active job
+    active_key = db.Column(db.String(20), unique=True, nullable=True)
+    stage = db.Column(db.String(20), nullable=True)
+    rows_processed = db.Column(db.Integer, default=0)
+    outcome = db.Column(db.String(50), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_json(self):
+        duration = None
+        if self.started_at:
+            duration = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "id": self.id,
+            "requested_by": self.requested_by,
+            "status": self.status,
+            "stage": self.stage,
+            "rows_processed": self.rows_processed,
+            "outcome": self.outcome,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": duration
+        }
+
+
+# IPv4 ranges of each rule or request address list, one row per address or prefix
+class AddressRange(db.Model):
+    __tablename__ = 'address_ranges'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 'rule' (firewall_rules) or 'request' (acl_requests)
+    owner_type = db.Column(db.String(20), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    # 'source' or 'destination'
+    side = db.Column(db.String(12), nullable=False)
+    start_int = db.Column(db.BigInteger, nullable=False)
+    end_int = db.Column(db.BigInteger, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_address_ranges_owner', 'owner_type', 'owner_id'),
+        db.Index('ix_address_ranges_range', 'owner_type', 'side', 'start_int', 'end_int'),
+    )
+
+
+# Protocol and port ranges of each rule, request or template service list
+class ServiceRange(db.Model):
+    __tablename__ = 'service_ranges'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 'rule' (firewall_rules), 'request' (acl_requests) or 'template' (templates)
+    owner_type = db.Column(db.String(20), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    # tcp, udp, icmp, gre, esp, ah, or 'any' for bare ports and ip/any
+    protocol = db.Column(db.String(10), nullable=False)
+    port_lo = db.Column(db.Integer, nullable=False)
+    port_hi = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_service_ranges_owner', 'owner_type', 'owner_id'),
+        db.Index('ix_service_ranges_range', 'owner_type', 'protocol', 'port_lo', 'port_hi'),
+    )
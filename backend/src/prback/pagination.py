@@ -0,0 +1,46 @@
+'''This module contains the helpers for keyset (cursor) pagination. A cursor is the sort key of
+the last row on a page, encoded as url-safe base64 JSON, so the next page starts with a
+WHERE (key, id) > (last key, last id) seek on an index instead of an OFFSET scan.
+'''
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor into its sort key values; raises ValueError when malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a limit query parameter, clamped to [1, maximum]; raises ValueError when not a number"""
+    if value is None or value == '':
+        return default
+    return max(1, min(int(value), maximum))
+
+
+def seek_after(columns, values, descending=False):
+    """WHERE clause selecting rows after the cursor in (columns...) order"""
+    clauses = []
+    for index, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(index)]
+        beyond = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
@@ -1,11 +1,19 @@
 '''API routes for acl requests, templates and admin actions'''
+import gzip
+import json
 import logging
-from flask import jsonify, request, Blueprint
-from datetime import datetime
-from ..main import validate_request_payload, validate_bulk_requests, validate_ip, validate_service, validate_description
+from flask import jsonify, request, Blueprint, Response, stream_with_context
+from datetime import datetime, timezone
+from sqlalchemy import func, or_
+from ..validation import validate_request_payload, validate_bulk_requests, validate_ip, validate_service, validate_description
 from ..guards.roleguard import token_required
 from ..extensions import db
 from ..models import ACLRequest, FirewallRule, Templates
+from ..indexing import index_request_addresses, index_services, reindex_services, remove_service_ranges
+from ..compaction import compact_requests
+from ..search import search_requests
+from ..ingest import request_row, insert_acl_requests, ingest_ndjson
+from ..pagination import encode_cursor, decode_cursor, parse_page_size, seek_after
 
 logger = logging.getLogger(__name__)
 actempad_bp = Blueprint('actempad', __name__)
@@ -14,18 +22,174 @@ actempad_bp = Blueprint('actempad', __name__)
 @actempad_bp.route('/acl_requests', methods=['GET'])
 @token_required('admin')
 def get_acl_requests(current_user):
-    """Get all ACL requests"""
+    """Get one page of ACL requests, newest first.
+
+    Optional filters: status, requester, system_type, category and a
+    created_from/created_to date range. Pages hold limit requests (20 by
+    default, at most 100); pass the returned next_cursor for the next page.
+    Requests without a created_at come last.
+    """
     try:
-        requests = ACLRequest.query.order_by(
-            ACLRequest.created_at.desc()).all()
+        query = ACLRequest.query
+        for field in ('status', 'requester', 'system_type', 'category'):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(ACLRequest, field) == value)
+
+        try:
+            created_from = parse_date_param(request.args.get('created_from'))
+            created_to = parse_date_param(request.args.get('created_to'), end_of_day=True)
+        except ValueError:
+            return jsonify({"error": "created_from and created_to must be ISO dates"}), 400
+        if created_from:
+            query = query.filter(ACLRequest.created_at >= created_from)
+        if created_to:
+            query = query.filter(ACLRequest.created_at <= created_to)
+
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        # MySQL and SQLite both sort NULLs last in descending order
+        order = (ACLRequest.created_at.desc(), ACLRequest.id.desc())
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                last_created_at, last_id = decode_cursor(cursor, 2)
+                if last_created_at is not None:
+                    last_created_at = datetime.fromisoformat(last_created_at)
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid cursor"}), 400
+            if last_created_at is None:
+                query = query.filter(ACLRequest.created_at.is_(None), ACLRequest.id < last_id)
+            else:
+                query = query.filter(or_(
+                    seek_after((ACLRequest.created_at, ACLRequest.id),
+                               (last_created_at, last_id), descending=True),
+                    ACLRequest.created_at.is_(None)))
+
+        # One extra row tells us whether there is a next page
+        requests = query.order_by(*order).limit(limit + 1).all()
+        has_more = len(requests) > limit
+        requests = requests[:limit]
+
+        next_cursor = None
+        if has_more and requests:
+            last = requests[-1]
+            next_cursor = encode_cursor(
+                last.created_at.isoformat() if last.created_at else None, last.id)
+
         return jsonify({
-            "acl_requests": [request.to_json() for request in requests]
+            "acl_requests": [request.to_json() for request in requests],
+            "count": len(requests),
+            "next_cursor": next_cursor
         })
     except Exception as e:
         logger.error("❌ Error fetching ACL requests", exc_info=True)
         return jsonify({"error": "Failed to fetch ACL requests"}), 500
 
 
+@actempad_bp.route('/api/v1/acl_requests/search', methods=['GET'])
+@token_required('admin')
+def search_acl_requests(current_user):
+    """Full-text search over request reasons, hosts, categories and comments, best match first"""
+    try:
+        query_text = (request.args.get('q') or '').strip()
+        status = request.args.get('status')
+        cursor = request.args.get('cursor')
+        if not query_text:
+            return jsonify({"error": "q is required"}), 400
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, 2)
+                after = (float(after[0]), int(after[1]))
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        hits, has_more = search_requests(query_text, limit, status=status, after=after)
+
+        next_cursor = None
+        if has_more and hits:
+            next_cursor = encode_cursor(hits[-1][0], hits[-1][1].id)
+
+        return jsonify({
+            "results": [{**acl_request.to_json(), "score": score} for score, acl_request in hits],
+            "count": len(hits),
+            "next_cursor": next_cursor
+        }), 200
+    except Exception as e:
+        logger.error("❌ Error searching ACL requests", exc_info=True)
+        return jsonify({"error": "Failed to search ACL requests"}), 500
+
+
+@actempad_bp.route('/api/v1/acl_requests/stats', methods=['GET'])
+@token_required('admin')
+def get_acl_request_stats(current_user):
+    """Request counts by status over the whole table, plus the categories and system types in use"""
+    try:
+        by_status = dict(
+            db.session.query(ACLRequest.status, func.count(ACLRequest.id))
+            .group_by(ACLRequest.status).all())
+        scopes = db.session.query(ACLRequest.system_type, ACLRequest.category).distinct().all()
+        return jsonify({
+            "total": sum(by_status.values()),
+            "by_status": {status or "": count for status, count in by_status.items()},
+            "system_types": sorted({system_type for system_type, _ in scopes if system_type}),
+            "categories": sorted({category for _, category in scopes if category})
+        }), 200
+    except Exception as e:
+        logger.error("❌ Error counting ACL requests", exc_info=True)
+        return jsonify({"error": "Failed to count ACL requests"}), 500
+
+
+def parse_date_param(value, end_of_day=False):
+    """Parse an ISO date or datetime query parameter; a bare date ending a range covers the whole day"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # created_at is stored as naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed
+
+
+@actempad_bp.route('/api/v1/admin/acl_requests/compacted', methods=['GET'])
+@token_required('admin')
+def get_compacted_acl_requests(current_user):
+    """Approved ACL requests compacted into the fewest equivalent rules"""
+    try:
+        status = request.args.get('status', 'Approved')
+        system_type = request.args.get('system_type')
+        category = request.args.get('category')
+
+        query = ACLRequest.query.filter(ACLRequest.status == status)
+        if system_type:
+            query = query.filter(ACLRequest.system_type == system_type)
+        if category:
+            query = query.filter(ACLRequest.category == category)
+        acl_requests = query.order_by(ACLRequest.id).all()
+
+        rules = compact_requests(acl_requests)
+        return jsonify({
+            "status": status,
+            "request_count": len(acl_requests),
+            "rule_count": len(rules),
+            "rules": rules
+        }), 200
+    except Exception as e:
+        logger.error("❌ Error compacting ACL requests", exc_info=True)
+        return jsonify({"error": "Failed to compact ACL requests"}), 500
+
+
 @actempad_bp.route('/create_acl_request', methods=['POST'])
 @token_required()
 def create_acl_request(current_user):
@@ -65,6 +229,9 @@ def create_acl_request(current_user):
         )
 
         db.session.add(new_request)
+        db.session.flush()
+        index_request_addresses([new_request])
+        index_services('request', [new_request])
         db.session.commit()
 
         return jsonify({
@@ -82,6 +249,8 @@ def create_acl_request(current_user):
 @token_required()
 def create_bulk_acl_requests(current_user):
     '''creation of bulk acl_requests route'''
+    if request.mimetype == 'application/x-ndjson':
+        return stream_bulk_acl_requests(current_user)
     try:
         data = request.get_json()
 
@@ -100,35 +269,28 @@ def create_bulk_acl_requests(current_user):
                 'total_count': len(requests_data)
             }), 400
 
-        created_requests = []
-
-        for req_data in requests_data:
-            new_request = ACLRequest(
-                requester=current_user.username,
-                system_type=req_data['system_type'].strip(),
-                category=req_data['category'].strip(),
-                source_ip=req_data['sourceIP'].strip(),
-                source_host=req_data['sourceHost'].strip(),
-                destination_ip=req_data['destinationIP'].strip(),
-                destination_host=req_data['destinationHost'].strip(),
-                service=req_data['service'].strip(),
-                reason=req_data['description'].strip()
-            )
-            db.session.add(new_request)
-            created_requests.append(new_request)
-
+        rows = [request_row(req_data, current_user.username) for req_data in requests_data]
+        ids = insert_acl_requests(rows)
         db.session.commit()
 
+        # Compact responses skip echoing every row back for large submissions
+        if data.get('compact'):
+            return jsonify({
+                'message': f'{len(ids)} ACL Requests submitted successfully',
+                'count': len(ids),
+                'ids': ids
+            }), 201
+
         return jsonify({
-            'message': f'{len(created_requests)} ACL Requests submitted successfully',
-            'count': len(created_requests),
+            'message': f'{len(ids)} ACL Requests submitted successfully',
+            'count': len(ids),
             'requests': [{
-                'id': req.id,
-                'sourceIP': req.source_ip,
-                'destinationIP': req.destination_ip,
-                'service': req.service,
-                'reason': req.reason,
-            }for req in created_requests]
+                'id': request_id,
+                'sourceIP': row['source_ip'],
+                'destinationIP': row['destination_ip'],
+                'service': row['service'],
+                'reason': row['reason'],
+            } for request_id, row in zip(ids, rows)]
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -136,6 +298,33 @@ def create_bulk_acl_requests(current_user):
         return jsonify({'error': 'Failed to create your ACL requests. Contact Support'}), 500
 
 
+def stream_bulk_acl_requests(current_user):
+    """Create requests from an NDJSON body, optionally gzip-encoded, streaming one result per line"""
+    encoding = (request.content_encoding or 'identity').lower()
+    if encoding not in ('identity', 'gzip'):
+        return jsonify({'error': 'Content-Encoding must be gzip or identity'}), 415
+
+    # Read the body as it arrives instead of buffering it
+    lines = request.stream
+    if encoding == 'gzip':
+        lines = gzip.GzipFile(fileobj=request.stream, mode='rb')
+
+    def generate():
+        try:
+            for result in ingest_ndjson(lines, current_user.username):
+                yield json.dumps(result) + '\n'
+        except (OSError, EOFError):
+            db.session.rollback()
+            logger.error("❌ Error decoding NDJSON ACL request stream", exc_info=True)
+            yield json.dumps({'error': 'Request body is not valid gzip'}) + '\n'
+        except Exception:
+            db.session.rollback()
+            logger.error("❌ Error streaming bulk ACL requests", exc_info=True)
+            yield json.dumps({'error': 'Failed to create your ACL requests. Contact Support'}) + '\n'
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
+
+
 @actempad_bp.route('/api/v1/validate-requests', methods=['POST'])
 @token_required()
 def validate_requests(current_user):
@@ -356,6 +545,9 @@ def create_request_from_template(current_user, template_id):
             template_id=template_id  # track which template was used
         )
         db.session.add(new_request)
+        db.session.flush()
+        index_request_addresses([new_request])
+        index_services('request', [new_request])
         db.session.commit()
 
         return jsonify({
@@ -592,6 +784,8 @@ def bulk_create_templates(current_user):
                     'error': str(e)
                 })
         if created_templates:
+            db.session.flush()
+            index_services('template', created_templates)
             db.session.commit()
 
         return jsonify({
@@ -663,6 +857,8 @@ def create_template(current_user):
         )
 
         db.session.add(new_template)
+        db.session.flush()
+        index_services('template', [new_template])
         db.session.commit()
 
         return jsonify({
@@ -748,6 +944,8 @@ def create_multi_rule_template(current_user):
             db.session.add(new_template)
             created_templates.append(new_template)
 
+        db.session.flush()
+        index_services('template', created_templates)
         db.session.commit()
 
         return jsonify({
@@ -827,6 +1025,8 @@ def update_template(current_user, id):
         if 'action' in data:
             template.action = data['action']
 
+        if 'service' in data:
+            reindex_services('template', [template])
         db.session.commit()
 
         return jsonify({
@@ -880,6 +1080,7 @@ def delete_template_permanently(current_user, id):
             return jsonify({'error': 'Template not found'}), 404
 
         db.session.delete(template)
+        remove_service_ranges('template', [template.id])
         db.session.commit()
 
         return jsonify({
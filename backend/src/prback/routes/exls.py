@@ -11,7 +11,12 @@ from datetime import datetime
 import openpyxl
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from flask import jsonify, request, send_file
+from zipfile import BadZipFile
+from openpyxl.utils.exceptions import InvalidFileException
+from ..extensions import db
 from ..models import ACLRequest
+from ..analysis import get_redundancy_report
+from ..ingest import import_workbook
 from ..guards.roleguard import token_required
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -410,4 +415,116 @@ def generate_xlsx_enhanced(current_user):
         )
     except Exception as e:
         logger.error("Error generating Excel", exc_info=True)
-        return jsonify({'error': 'Failed to generate Excel report'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to generate Excel report'}), 500
+
+
+@exls_bp.route('/api/v1/admin/rules/redundancy/export', methods=['GET'])
+@token_required('admin')
+def export_rule_redundancy(current_user):
+    '''Export the rule redundancy findings as a color-coded Excel file'''
+    try:
+        system_type = request.args.get('system_type')
+        report = get_redundancy_report()
+        findings = [finding for finding in report['findings']
+                    if not system_type or finding['system_type'] == system_type]
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Rule Redundancy"
+
+        kind_colors = {
+            'duplicate': 'F8D7DA',    # Red
+            'shadowed': 'FFF3CD',     # Yellow
+            'contained': 'D1ECF1'     # Blue
+        }
+        header_fill = PatternFill(
+            start_color='4472C4', end_color='4472C4', fill_type='solid')
+        header_font = Font(bold=True, color='FFFFFF', size=11)
+        header_alignment = Alignment(
+            horizontal='center', vertical='center', wrap_text=True)
+
+        headers = [
+            'Rule ID', 'System Type', 'Category', 'Source IP', 'Destination IP',
+            'Service', 'Finding', 'Covered By Rule', 'Related Rules'
+        ]
+        ws.append(headers)
+        for cell in ws[1]:
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = header_alignment
+
+        for row_idx, finding in enumerate(findings, start=2):
+            ws.append([
+                finding['rule_id'],
+                finding['system_type'],
+                finding['category'],
+                finding['source_ip'],
+                finding['destination_ip'],
+                finding['service'],
+                finding['kind'].capitalize(),
+                finding['related_rule_id'],
+                ', '.join(str(rule_id) for rule_id in finding['related_rule_ids'])
+            ])
+            color = kind_colors[finding['kind']]
+            ws.cell(row=row_idx, column=7).fill = PatternFill(
+                start_color=color, end_color=color, fill_type='solid')
+
+        column_widths = [10, 20, 20, 30, 30, 20, 12, 16, 30]
+        for idx, width in enumerate(column_widths, start=1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].width = width
+        ws.freeze_panes = 'A2'
+
+        notes = wb.create_sheet("Limitations")
+        notes.column_dimensions['A'].width = 120
+        for limitation in report['limitations']:
+            notes.append([limitation])
+            notes.cell(row=notes.max_row, column=1).alignment = Alignment(wrap_text=True)
+
+        file_stream = BytesIO()
+        wb.save(file_stream)
+        file_stream.seek(0)
+
+        filename = f'rule_redundancy_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+        return send_file(
+            file_stream,
+            as_attachment=True,
+            download_name=filename,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    except Exception as e:
+        logger.error("Error exporting rule redundancy", exc_info=True)
+        return jsonify({'error': 'Failed to export rule redundancy'}), 500
+
+
+@exls_bp.route('/api/v1/acl_requests/import', methods=['POST'])
+@token_required()
+def import_acl_requests(current_user):
+    '''Create ACL requests from the rule rows of an uploaded xlsx, with a per-row error report'''
+    try:
+        upload = request.files.get('file')
+        system_type = (request.form.get('system_type') or '').strip()
+        category = (request.form.get('category') or '').strip() or None
+
+        if not upload or not upload.filename:
+            return jsonify({'error': 'An .xlsx file is required'}), 400
+        if not upload.filename.lower().endswith('.xlsx'):
+            return jsonify({'error': 'Only .xlsx files can be imported'}), 400
+        if not system_type:
+            return jsonify({'error': 'system_type is required'}), 400
+
+        try:
+            # The upload is read in place; werkzeug keeps large ones in a temporary file
+            report = import_workbook(upload.stream, current_user.username, system_type, category)
+        except (InvalidFileException, BadZipFile):
+            db.session.rollback()
+            return jsonify({'error': 'File is not a valid .xlsx workbook'}), 400
+        db.session.commit()
+
+        return jsonify({
+            'message': f"{report['created']} of {report['rows']} rows imported",
+            **report
+        }), 201 if report['created'] else 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error importing ACL requests", exc_info=True)
+        return jsonify({'error': 'Failed to import ACL requests'}), 500
@@ -0,0 +1,203 @@
+'''API routes for address, service and flow questions over rules and requests'''
+import logging
+from flask import jsonify, request, Blueprint
+from ..addressing import parse_ipv4_prefix, prefix_range, format_prefix, parse_service_ranges
+from ..indexing import OWNER_MODELS, SERVICE_OWNER_MODELS, find_overlapping_owners, find_service_owners
+from ..flowmatch import match_flows
+from ..analysis import get_redundancy_report
+from ..pagination import parse_page_size
+from ..models import FirewallRule
+from ..guards.roleguard import token_required
+
+logger = logging.getLogger(__name__)
+flows_bp = Blueprint('flows', __name__)
+
+# Owners returned by one overlap query at most
+OVERLAP_RESULT_LIMIT = 1000
+
+# Flows accepted by one /api/v1/flows/match call
+FLOW_MATCH_LIMIT = 10000
+
+
+def owner_to_json(owner_type, owner):
+    """Serialize a rule, request or template for the overlap results"""
+    if owner_type in ('request', 'template'):
+        return owner.to_json()
+    return {
+        "id": owner.id,
+        "system_type": owner.system_type,
+        "category": owner.category,
+        "source_ip": owner.source_ip,
+        "source_host": owner.source_host,
+        "destination_ip": owner.destination_ip,
+        "destination_host": owner.destination_host,
+        "service": owner.service,
+        "description": owner.description,
+    }
+
+
+def load_owners(model, owner_ids):
+    """Load the given rows in id order"""
+    if not owner_ids:
+        return []
+    return model.query.filter(model.id.in_(owner_ids)).order_by(model.id).all()
+
+
+@flows_bp.route('/api/v1/addresses/overlaps', methods=['GET'])
+@token_required()
+def get_address_overlaps(current_user):
+    '''Rules or requests whose source/destination addresses overlap a CIDR'''
+    try:
+        cidr = (request.args.get('cidr') or '').strip()
+        side = request.args.get('side')
+        owner_type = request.args.get('owner_type', 'rule')
+
+        prefix = parse_ipv4_prefix(cidr)
+        if prefix is None:
+            return jsonify({'error': 'cidr must be an IPv4 address or prefix, e.g. 10.0.0.0/8'}), 400
+        if side not in (None, 'source', 'destination'):
+            return jsonify({'error': 'side must be source or destination'}), 400
+        if owner_type not in OWNER_MODELS:
+            return jsonify({'error': 'owner_type must be rule or request'}), 400
+        if owner_type == 'request' and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        start_int, end_int = prefix_range(*prefix)
+        owner_ids = find_overlapping_owners(
+            owner_type, start_int, end_int, side=side, limit=OVERLAP_RESULT_LIMIT + 1)
+        truncated = len(owner_ids) > OVERLAP_RESULT_LIMIT
+        owner_ids = owner_ids[:OVERLAP_RESULT_LIMIT]
+
+        owners = load_owners(OWNER_MODELS[owner_type], owner_ids)
+
+        return jsonify({
+            'cidr': format_prefix(*prefix),
+            'owner_type': owner_type,
+            'side': side,
+            'count': len(owners),
+            'truncated': truncated,
+            'results': [owner_to_json(owner_type, owner) for owner in owners]
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error finding address overlaps", exc_info=True)
+        return jsonify({'error': 'Failed to find overlapping addresses'}), 500
+
+
+@flows_bp.route('/api/v1/services/overlaps', methods=['GET'])
+@token_required()
+def get_service_overlaps(current_user):
+    '''Rules, requests or templates whose services overlap a port, range or named service'''
+    try:
+        service = (request.args.get('service') or '').strip()
+        owner_type = request.args.get('owner_type', 'rule')
+
+        ranges = parse_service_ranges(service)
+        if not ranges:
+            return jsonify({
+                'error': 'service must be a port (80), range (80-90), protocol/port (tcp/80) or service name (http)'
+            }), 400
+        if owner_type not in SERVICE_OWNER_MODELS:
+            return jsonify({'error': 'owner_type must be rule, request or template'}), 400
+        if owner_type == 'request' and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        owner_ids = set()
+        for protocol, port_lo, port_hi in ranges:
+            owner_ids.update(find_service_owners(
+                owner_type, port_lo, port_hi, protocol=protocol,
+                limit=OVERLAP_RESULT_LIMIT + 1))
+        owner_ids = sorted(owner_ids)
+        truncated = len(owner_ids) > OVERLAP_RESULT_LIMIT
+        owner_ids = owner_ids[:OVERLAP_RESULT_LIMIT]
+
+        owners = load_owners(SERVICE_OWNER_MODELS[owner_type], owner_ids)
+
+        return jsonify({
+            'service': service,
+            'ranges': [{'protocol': protocol, 'port_lo': port_lo, 'port_hi': port_hi}
+                       for protocol, port_lo, port_hi in ranges],
+            'owner_type': owner_type,
+            'count': len(owners),
+            'truncated': truncated,
+            'results': [owner_to_json(owner_type, owner) for owner in owners]
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error finding service overlaps", exc_info=True)
+        return jsonify({'error': 'Failed to find overlapping services'}), 500
+
+
+@flows_bp.route('/api/v1/flows/match', methods=['POST'])
+@token_required()
+def match_flow_requests(current_user):
+    '''Find the catalog rules that already permit each (source, destination, service) flow'''
+    try:
+        data = request.get_json(silent=True) or {}
+        flows = data.get('flows')
+        system_type = data.get('system_type')
+
+        # A single flow may be posted as the body itself
+        if flows is None and data.get('source_ip'):
+            flows = [data]
+        if not isinstance(flows, list) or not flows:
+            return jsonify({'error': 'Expected a non-empty list under "flows"'}), 400
+        if len(flows) > FLOW_MATCH_LIMIT:
+            return jsonify({'error': f'At most {FLOW_MATCH_LIMIT} flows can be matched per call'}), 400
+
+        results = match_flows(flows, system_type=system_type)
+
+        matched_ids = sorted({rule_id for result in results for rule_id in result.get('rule_ids', [])})
+        rules = load_owners(FirewallRule, matched_ids)
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'matched': sum(1 for result in results if result.get('matched')),
+            'rules': {rule.id: owner_to_json('rule', rule) for rule in rules}
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error matching flows", exc_info=True)
+        return jsonify({'error': 'Failed to match flows'}), 500
+
+
+@flows_bp.route('/api/v1/admin/rules/redundancy', methods=['GET'])
+@token_required('admin')
+def get_rule_redundancy(current_user):
+    '''Duplicate, shadowed and contained rules in the catalog, paged by rule id'''
+    try:
+        system_type = request.args.get('system_type')
+        kind = request.args.get('kind')
+        after = request.args.get('after')
+
+        if kind not in (None, 'duplicate', 'shadowed', 'contained'):
+            return jsonify({'error': 'kind must be duplicate, shadowed or contained'}), 400
+        try:
+            limit = parse_page_size(request.args.get('limit'), default=100, maximum=1000)
+            after = int(after) if after else None
+        except ValueError:
+            return jsonify({'error': 'limit and after must be integers'}), 400
+
+        report = get_redundancy_report()
+        findings = [
+            finding for finding in report['findings']
+            if (not system_type or finding['system_type'] == system_type)
+            and (not kind or finding['kind'] == kind)
+            and (after is None or finding['rule_id'] > after)
+        ]
+        page = findings[:limit]
+
+        return jsonify({
+            'rules_analysed': report['rules_analysed'],
+            'rules_skipped': report['rules_skipped'],
+            'summary': report['summary'],
+            'limitations': report['limitations'],
+            'count': len(page),
+            'findings': page,
+            'next_after': page[-1]['rule_id'] if len(findings) > limit else None
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error analysing rule redundancy", exc_info=True)
+        return jsonify({'error': 'Failed to analyse rule redundancy'}), 500
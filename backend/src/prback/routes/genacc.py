@@ -9,15 +9,19 @@ from flask import Blueprint, jsonify, request
 from flask import current_app as app
 from werkzeug.security import generate_password_hash, check_password_hash
 from ..guards.jwtguard import generate_token
-from ..main import automated_sync
+from ..jobs import enqueue_sync_job
+from ..catalog import get_rule_lookup
 from ..guards.roleguard import token_required
 from ..extensions import db, limiter
-from ..models import FirewallRule, User
+from ..models import User, SyncJob
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Rows accepted by one /api/auto-populate/batch call
+AUTO_POPULATE_BATCH_LIMIT = 1000
+
 genacc_bp = Blueprint('genacc', __name__)
 
 
@@ -167,77 +171,151 @@ def get_role(current_user):
 @genacc_bp.route('/api/force-sync', methods=['POST'])
 @token_required()
 def force_sync(current_user):
-    """Force a manual sync from Google Sheets"""
+    """Queue a manual sync from Google Sheets"""
     try:
         logger.info(f"🔄 Manual sync requested...by {current_user.username}")
-        automated_sync(app)
-        return jsonify({"message": "Sync completed successfully"})
+        job, created = enqueue_sync_job(app._get_current_object(), current_user.username)
+        return jsonify({
+            "message": "Sync queued" if created else "Sync already in progress",
+            "job_id": job.id,
+            "status": job.status,
+            "coalesced": not created,
+            "status_url": f"/api/sync/jobs/{job.id}"
+        }), 202
     except Exception as e:
+        db.session.rollback()
         logger.error("Error during manual sync", exc_info=True)
         return jsonify({"error": "Sync failed"}), 500
 
 
+@genacc_bp.route('/api/sync/jobs/<int:job_id>', methods=['GET'])
+@token_required()
+def get_sync_job(current_user, job_id):
+    """Report the stage, progress and outcome of a sync job"""
+    try:
+        job = db.session.get(SyncJob, job_id)
+        if not job:
+            return jsonify({'error': 'Sync job not found'}), 404
+        return jsonify({'job': job.to_json()}), 200
+    except Exception as e:
+        logger.error("Error fetching sync job", exc_info=True)
+        return jsonify({'error': 'Failed to fetch sync job'}), 500
+
+
+def prefix_match_response(side, match):
+    """Response body for a longest-prefix match; the lowest rule id fills the form"""
+    matched_prefix, rules = match
+    rule = rules[0]
+    return {
+        "source_ip": rule["source_ip"] or "",
+        "source_host": rule["source_host"] or "",
+        "destination_ip": rule["destination_ip"] or "",
+        "destination_host": rule["destination_host"] or "",
+        "service": rule["service"] or "",
+        "description": rule["description"] or "",
+        "matched_by": f"{side}_prefix",
+        "matched_prefix": matched_prefix,
+        "rule_id": rule["id"],
+        "candidate_rule_ids": [candidate["id"] for candidate in rules]
+    }
+
+
+def resolve_auto_populate(lookup, data):
+    """Resolve one auto-populate request against the rule lookup; returns the response body.
+
+    An exact match on the address string wins; otherwise the most specific
+    catalog prefix covering the address, or every address of a list, is used.
+    """
+    system_type = data.get('system_type', '')
+    category = data.get('category', '')
+    source_ip = (data.get('sourceIP') or '').strip()
+    destination_ip = (data.get('destinationIP') or '').strip()
+
+    # If we have a source IP, find the exact rule
+    if source_ip:
+        rule = lookup.match_source(system_type, category, source_ip)
+        if rule:
+            return {
+                "source_ip": rule["source_ip"],
+                "source_host": rule["source_host"] or "",
+                "destination_ip": rule["destination_ip"] or "",
+                "destination_host": rule["destination_host"] or "",
+                "service": rule["service"] or "",
+                "description": rule["description"] or "",
+                "matched_by": "source_ip",
+                "rule_id": rule["id"]
+            }
+        match = lookup.match_source_prefix(system_type, category, source_ip)
+        if match:
+            return prefix_match_response('source_ip', match)
+        return {'error': 'No matching rules Found'}
+
+    # If we have a destination IP, find the exact rule
+    if destination_ip:
+        rule = lookup.match_destination(system_type, category, destination_ip)
+        if rule:
+            return {
+                "source_ip": rule["source_ip"] or "",
+                "source_host": rule["source_host"] or "",
+                "destination_ip": rule["destination_ip"],
+                "destination_host": rule["destination_host"] or "",
+                "service": rule["service"] or "",
+                "description": rule["description"] or "",
+                "matched_by": "destination_ip",
+                "rule_id": rule["id"]  # included for verification
+            }
+        match = lookup.match_destination_prefix(system_type, category, destination_ip)
+        if match:
+            return prefix_match_response('destination_ip', match)
+        return {'error': 'No matching rules Found'}
+    return {"error": "No Source ip or destination ip has been provided"}
+
+
 @genacc_bp.route('/api/auto-populate', methods=['POST'])
 @token_required()
 def auto_populate_fields(current_user):
     """Auto-population"""
     try:
         data = request.get_json(silent=True) or {}
-
-        system_type = data.get('system_type', '')
-        category = data.get('category', '')
-        source_ip = data.get('sourceIP', '').strip()
-        destination_ip = data.get('destinationIP', '').strip()
-
-        with app.app_context():
-            # If we have a source IP, find the exact rule
-            if source_ip:
-                rule = FirewallRule.query.filter_by(
-                    system_type=system_type,
-                    category=category,
-                    source_ip=source_ip
-                ).first()
-
-                if rule:
-                    return jsonify({
-                        "source_ip": rule.source_ip,
-                        "source_host": rule.source_host or "",
-                        "destination_ip": rule.destination_ip or "",
-                        "destination_host": rule.destination_host or "",
-                        "service": rule.service or "",
-                        "description": rule.description or "",
-                        "matched_by": "source_ip",
-                        "rule_id": rule.id
-                    })
-                return jsonify({'error': 'No matching rules Found'}), 200
-
-            # If we have a destination IP, find the exact rule
-            if destination_ip:
-                rule = FirewallRule.query.filter_by(
-                    system_type=system_type,
-                    category=category,
-                    destination_ip=destination_ip
-                ).first()
-
-                if rule:
-                    return jsonify({
-                        "source_ip": rule.source_ip or "",
-                        "source_host": rule.source_host or "",
-                        "destination_ip": rule.destination_ip,
-                        "destination_host": rule.destination_host or "",
-                        "service": rule.service or "",
-                        "description": rule.description or "",
-                        "matched_by": "destination_ip",
-                        "rule_id": rule.id  # included for verification
-                    })
-                return jsonify({'error': 'No matching rules Found'}), 200
-            return jsonify({"error": "No Source ip or destination ip has been provided"}), 200
+        return jsonify(resolve_auto_populate(get_rule_lookup(), data))
 
     except Exception as e:
         logger.error("Error in auto_populate_fields", exc_info=True)
         return jsonify({"error": "An error occurred while auto-populating fields"}), 500
 
 
+@genacc_bp.route('/api/auto-populate/batch', methods=['POST'])
+@token_required()
+def auto_populate_batch(current_user):
+    """Auto-populate many rows in one call, for the bulk request editor"""
+    try:
+        data = request.get_json(silent=True) or {}
+        rows = data.get('rows')
+
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'Expected a non-empty list under "rows"'}), 400
+        if len(rows) > AUTO_POPULATE_BATCH_LIMIT:
+            return jsonify({
+                'error': f'At most {AUTO_POPULATE_BATCH_LIMIT} rows can be resolved per call'
+            }), 400
+
+        lookup = get_rule_lookup()
+        results = [
+            resolve_auto_populate(lookup, row) if isinstance(row, dict)
+            else {'error': 'Each row must be an object'}
+            for row in rows
+        ]
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "matched": sum(1 for result in results if 'error' not in result)
+        }), 200
+
+    except Exception as e:
+        logger.error("Error in auto_populate_batch", exc_info=True)
+        return jsonify({"error": "An error occurred while auto-populating fields"}), 500
+
+
 @genacc_bp.route('/api/v1/help', methods=['GET'])
 @token_required()
 def get_help(current_user):
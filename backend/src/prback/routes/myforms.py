@@ -1,75 +1,43 @@
 '''API routes for mysql-options and form options'''
 import logging
-from flask import jsonify, Blueprint
-from ..main import looks_like_ip, last_sync_time
+from flask import jsonify, Blueprint, Response, request, g
+from ..catalog import get_options_payload
 from ..models import FirewallRule
+from ..pagination import encode_cursor, decode_cursor, parse_page_size, seek_after
 from ..guards.roleguard import token_required
-from flask import current_app as app
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 myforms_bp = Blueprint('myforms', __name__)
 
+# Columns the typeahead can search, with the column holding the other side of the rule
+SEARCH_FIELDS = {
+    'source_ip': ('source_ip', 'source_host', 'destination_ip', 'destination_host'),
+    'source_host': ('source_host', 'source_ip', 'destination_ip', 'destination_host'),
+    'destination_ip': ('destination_ip', 'destination_host', 'source_ip', 'source_host'),
+    'destination_host': ('destination_host', 'destination_ip', 'source_ip', 'source_host'),
+}
+
+
+def options_response(name):
+    """Serve a cached options payload, answering 304 when the client's ETag still matches"""
+    body, etag = get_options_payload(name)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Clients may keep the payload but must revalidate it on every use
+    g.cache_control = 'no-cache, private'
+    return response.make_conditional(request)
+
 
 @myforms_bp.route('/form-options', methods=['GET'])
 @token_required()
 def get_form_options(current_user):
     """Get all form options"""
-
-    # Extract data from MySQL
-    with app.app_context():
-        all_rules = FirewallRule.query.all()
-
-        # Get unique system_types (sheet names)
-        system_types = list(
-            set([rule.system_type for rule in all_rules if rule.system_type]))
-
-        # Get categories with their system_types
-        categories = []
-        for rule in all_rules:
-            if rule.category and rule.system_type:
-                cat_entry = {
-                    'value': rule.category,
-                    'system_type': rule.system_type,
-                    'display': rule.category
-                }
-                if not any(e['value'] == cat_entry['value'] and e['system_type'] == cat_entry['system_type'] for e in categories):
-                    categories.append(cat_entry)
-
-        # Process IPs
-        source_ips = []
-        destination_ips = []
-
-        for rule in all_rules:
-            if rule.source_ip and rule.source_ip.strip():
-                source_ips.append({
-                    "value": rule.source_ip,
-                    "host": rule.source_host or "",
-                    "system_type": rule.system_type or "",
-                    "category": rule.category or "",
-                    "service": rule.service or "",
-                    "description": rule.description or "",
-                    "is_valid_ip": looks_like_ip(rule.source_ip)
-                })
-
-            if rule.destination_ip and rule.destination_ip.strip():
-                destination_ips.append({
-                    "value": rule.destination_ip,
-                    "host": rule.destination_host or "",
-                    "system_type": rule.system_type or "",
-                    "category": rule.category or "",
-                    "service": rule.service or "",
-                    "description": rule.description or "",
-                    "is_valid_ip": looks_like_ip(rule.destination_ip)
-                })
-
-        return jsonify({
-            "system_types": system_types,
-            "categories": categories,
-            "source_ips": source_ips,
-            "destination_ips": destination_ips,
-            "last_sync": last_sync_time.isoformat() if last_sync_time else None
-        })
+    try:
+        return options_response('form_options')
+    except Exception as e:
+        logger.error("❌ Error in get_form_options", exc_info=True)
+        return jsonify({"error": "An error occurred while fetching form options"}), 500
 
 
 @myforms_bp.route('/api/mysql-options', methods=['GET'])
@@ -77,87 +45,75 @@ def get_form_options(current_user):
 def get_mysql_options(current_user):
     """Get options directly from MySQL database"""
     try:
-        with app.app_context():
-            # Get all firewall rules
-            all_rules = FirewallRule.query.all()
-
-            # Get unique system_types (sorted)
-            system_types = sorted(
-                set([rule.system_type for rule in all_rules if rule.system_type])
-            )
-
-            # Ensure Template and Others are present
-            if "Template" not in system_types:
-                system_types.append("Template")
-            if "Others" not in system_types:
-                system_types.append("Others")
-
-            # Get categories with their system_types
-            categories = []
-            for rule in all_rules:
-                if rule.category and rule.system_type:
-                    cat_entry = {
-                        'value': rule.category,
-                        'system_type': rule.system_type,
-                        'display': rule.category
-                    }
-                    if not any(
-                        e['value'] == cat_entry['value'] and e['system_type'] == cat_entry['system_type']
-                        for e in categories
-                    ):
-                        categories.append(cat_entry)
-
-            # Process source and destination IPs
-            source_ips = []
-            destination_ips = []
-
-            for rule in all_rules:
-                # Only include rules that have valid source IPs
-                if rule.source_ip and rule.source_ip.strip():
-                    source_ips.append({
-                        "id": rule.id,
-                        "value": rule.source_ip,
-                        "host": rule.source_host or "",
-                        "system_type": rule.system_type or "",
-                        "category": rule.category or "",
-                        "service": rule.service or "",
-                        "description": rule.description or "",
-                        "is_valid_ip": looks_like_ip(rule.source_ip),
-                        "corresponding_destination_ip": rule.destination_ip or "",
-                        "corresponding_destination_host": rule.destination_host or "",
-                        "corresponding_service": rule.service or "",
-                        "corresponding_description": rule.description or ""
-                    })
-
-                # Only include rules that have valid destination IPs
-                if rule.destination_ip and rule.destination_ip.strip():
-                    destination_ips.append({
-                        "id": rule.id,
-                        "value": rule.destination_ip,
-                        "host": rule.destination_host or "",
-                        "system_type": rule.system_type or "",
-                        "category": rule.category or "",
-                        "service": rule.service or "",
-                        "description": rule.description or "",
-                        "is_valid_ip": looks_like_ip(rule.destination_ip),
-                        "corresponding_source_ip": rule.source_ip or "",
-                        "corresponding_source_host": rule.source_host or "",
-                        "corresponding_service": rule.service or "",
-                        "corresponding_description": rule.description or ""
-                    })
-
-            # Get unique services
-            services = sorted(set([rule.service for rule in all_rules if rule.service]))
-
-            return jsonify({
-                "system_types": system_types,
-                "categories": categories,
-                "source_ips": source_ips,
-                "destination_ips": destination_ips,
-                "services": services,
-                "last_sync": last_sync_time.isoformat() if last_sync_time else None
-            })
-
+        return options_response('mysql_options')
     except Exception as e:
         logger.error("❌ Error in get_mysql_options", exc_info=True)
-        return jsonify({"error": "An error occurred while fetching database options"}), 500
\ No newline at end of file
+        return jsonify({"error": "An error occurred while fetching database options"}), 500
+
+
+@myforms_bp.route('/api/v1/rules/search', methods=['GET'])
+@token_required()
+def search_rules(current_user):
+    """Prefix search over rule IPs or hosts, top-K per page with a keyset cursor"""
+    try:
+        query_text = (request.args.get('q') or '').strip()
+        field = request.args.get('field', 'source_ip')
+        system_type = request.args.get('system_type')
+        category = request.args.get('category')
+        cursor = request.args.get('cursor')
+
+        if field not in SEARCH_FIELDS:
+            return jsonify({'error': f"field must be one of: {', '.join(SEARCH_FIELDS)}"}), 400
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+
+        value_name, host_name, other_ip_name, other_host_name = SEARCH_FIELDS[field]
+        column = getattr(FirewallRule, value_name)
+
+        query = FirewallRule.query.filter(column.is_not(None), column != '')
+        if query_text:
+            # LIKE 'q%' with wildcards in q escaped, so the prefix index is usable
+            query = query.filter(column.startswith(query_text, autoescape=True))
+        if system_type:
+            query = query.filter(FirewallRule.system_type == system_type)
+        if category:
+            query = query.filter(FirewallRule.category == category)
+        if cursor:
+            try:
+                last_value, last_id = decode_cursor(cursor, 2)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(seek_after((column, FirewallRule.id), (last_value, last_id)))
+
+        # One extra row tells us whether there is a next page
+        rules = query.order_by(column, FirewallRule.id).limit(limit + 1).all()
+        has_more = len(rules) > limit
+        rules = rules[:limit]
+
+        results = [{
+            "id": rule.id,
+            "value": getattr(rule, value_name) or "",
+            "host": getattr(rule, host_name) or "",
+            "system_type": rule.system_type or "",
+            "category": rule.category or "",
+            "service": rule.service or "",
+            "description": rule.description or "",
+            "corresponding_ip": getattr(rule, other_ip_name) or "",
+            "corresponding_host": getattr(rule, other_host_name) or "",
+        } for rule in rules]
+
+        next_cursor = None
+        if has_more and rules:
+            next_cursor = encode_cursor(getattr(rules[-1], value_name), rules[-1].id)
+
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "next_cursor": next_cursor
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Error in search_rules", exc_info=True)
+        return jsonify({"error": "An error occurred while searching rules"}), 500
@@ -0,0 +1,194 @@
+'''This module provides full-text search over ACL requests. The searchable text of a request is its
+reason, source and destination hosts, category and comments, kept in acl_requests.search_text by a
+flush listener so every write path stays in sync. On MySQL the column carries a FULLTEXT index and
+searches run as boolean-mode MATCH queries. Elsewhere (SQLite) an in-process inverted index is
+built from the table and ranked with BM25; it is rebuilt when the search generation in the
+search_state table, bumped by the same listener on every indexed change, moves on. MySQL has no
+use for the generation, so writes there leave search_state alone.
+'''
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.mysql import match
+
+from .extensions import db
+from .models import ACLRequest, SearchState
+
+logger = logging.getLogger(__name__)
+
+# Columns whose changes move the search generation; status is kept for filtering
+INDEXED_FIELDS = ('reason', 'source_host', 'destination_host', 'category', 'comments', 'status')
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+index_lock = threading.Lock()
+search_index = {"generation": None, "index": None}
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; payroll-db becomes payroll and db"""
+    return TOKEN_PATTERN.findall(str(text or '').lower())
+
+
+def request_search_text(acl_request):
+    """Searchable text of a request, given as an ACLRequest or a dict of its columns"""
+    if isinstance(acl_request, dict):
+        get = acl_request.get
+    else:
+        def get(name):
+            return getattr(acl_request, name)
+    parts = [get('reason'), get('source_host'), get('destination_host'), get('category')]
+    for comment in get('comments') or []:
+        if isinstance(comment, dict):
+            parts.append(comment.get('comment'))
+        else:
+            parts.append(comment)
+    return ' '.join(str(part) for part in parts if part)
+
+
+@event.listens_for(Session, 'before_flush')
+def refresh_search_text(session, flush_context, instances):
+    """Refresh search_text of changed requests and bump the search generation if it is in use"""
+    changed = False
+    for instance in list(session.new) + list(session.dirty):
+        if not isinstance(instance, ACLRequest):
+            continue
+        state = db.inspect(instance)
+        if instance not in session.new and not any(
+                state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+            continue
+        instance.search_text = request_search_text(instance)
+        changed = True
+    changed = changed or any(isinstance(instance, ACLRequest) for instance in session.deleted)
+    if changed:
+        bump_search_generation(session)
+
+
+def uses_search_index(session):
+    """Whether searches on this session's database go through the in-process index"""
+    return session.get_bind().dialect.name != 'mysql'
+
+
+def bump_search_generation(session):
+    """Move the search generation on; Core inserts of requests call this themselves"""
+    if not uses_search_index(session):
+        return
+    with session.no_autoflush:
+        state = session.get(SearchState, 1)
+        if state is None:
+            session.add(SearchState(id=1, generation=1))
+        else:
+            state.generation = SearchState.generation + 1
+
+
+def search_generation():
+    """Current search generation; 0 before any request was indexed"""
+    state = db.session.get(SearchState, 1)
+    return state.generation if state else 0
+
+
+class RequestSearchIndex:
+    """Inverted index of request tokens: token -> {request_id: term frequency}"""
+
+    def __init__(self, acl_requests):
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self.statuses = {}
+        for acl_request in acl_requests:
+            tokens = tokenize(acl_request.search_text or request_search_text(acl_request))
+            self.lengths[acl_request.id] = len(tokens)
+            self.statuses[acl_request.id] = acl_request.status
+            for token in tokens:
+                postings = self.postings[token]
+                postings[acl_request.id] = postings.get(acl_request.id, 0) + 1
+        self.average_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0
+
+    def search(self, tokens, status=None):
+        """[(score, request_id), ...] of requests containing every token, best first"""
+        postings = [self.postings.get(token) for token in dict.fromkeys(tokens)]
+        if not postings or not all(postings):
+            return []
+
+        # Intersect from the rarest token up
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+        if status:
+            candidates = {request_id for request_id in candidates
+                          if self.statuses.get(request_id) == status}
+
+        count = len(self.lengths)
+        scored = []
+        for request_id in candidates:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[request_id] / self.average_length)
+            score = 0.0
+            for posting in postings:
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                frequency = posting[request_id]
+                score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            scored.append((round(score, 6), request_id))
+        scored.sort(key=lambda hit: (-hit[0], -hit[1]))
+        return scored
+
+
+def get_search_index():
+    """Return the in-process index for the current search generation"""
+    generation = search_generation()
+    with index_lock:
+        if search_index["generation"] != generation:
+            search_index["index"] = RequestSearchIndex(ACLRequest.query.all())
+            search_index["generation"] = generation
+            logger.info(f"📦 Built request search index for generation {generation}")
+        return search_index["index"]
+
+
+def search_requests(text, limit, status=None, after=None):
+    """One page of requests matching every token of text, best first.
+
+    ``after`` is the (score, id) of the last hit on the previous page.
+    Returns ([(score, ACLRequest), ...], has_more).
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return [], False
+
+    if not uses_search_index(db.session):
+        score = match(ACLRequest.search_text,
+                      against=' '.join(f'+{token}' for token in tokens)).in_boolean_mode()
+        query = db.session.query(ACLRequest, score.label('score')).filter(score > 0)
+        if status:
+            query = query.filter(ACLRequest.status == status)
+        if after:
+            query = query.filter(or_(score < after[0], and_(score == after[0], ACLRequest.id < after[1])))
+        rows = query.order_by(score.desc(), ACLRequest.id.desc()).limit(limit + 1).all()
+        hits = [(float(row.score), row.ACLRequest) for row in rows]
+        return hits[:limit], len(hits) > limit
+
+    hits = get_search_index().search(tokens, status=status)
+    if after:
+        hits = [hit for hit in hits
+                if hit[0] < after[0] or (hit[0] == after[0] and hit[1] < after[1])]
+    page = hits[:limit + 1]
+    by_id = {acl_request.id: acl_request for acl_request in
+             ACLRequest.query.filter(ACLRequest.id.in_([request_id for _, request_id in page])).all()}
+    results = [(score, by_id[request_id]) for score, request_id in page if request_id in by_id]
+    return results[:limit], len(results) > limit
+
+
+def backfill_search_text():
+    """Fill search_text for requests written before it existed; returns the number filled"""
+    filled = 0
+    for acl_request in ACLRequest.query.filter(ACLRequest.search_text.is_(None)).all():
+        acl_request.search_text = request_search_text(acl_request)
+        filled += 1
+    return filled
@@ -0,0 +1,253 @@
+'''This module validates ACL request payloads: the IP lists, service lists and descriptions
+submitted through the request forms, the bulk endpoints and /api/v1/validate-requests. Patterns
+are compiled once at import and fixed vocabularies are frozensets. Bulk submissions repeat the
+same addresses and services thousands of times, so the verdicts for each whole field, each of its
+comma-separated tokens and each description are memoized in bounded LRUs shared by every caller
+in the process, and validate_bulk_requests validates each distinct row once.
+'''
+import re
+from functools import lru_cache
+from typing import List, Dict, Tuple
+
+from .addressing import KNOWN_SERVICES
+from .config import ACL_REQUESTS
+
+CIDR_PATTERN = re.compile(r'(^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})/(\d{1,2})$')
+IP_PATTERN = re.compile(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$')
+PROTO_PORT_PATTERN = re.compile(r'^(tcp|udp|icmp)/(\d+)$')
+PORT_RANGE_PATTERN = re.compile(r'^(\d+)-(\d+)$')
+
+# Address wildcards accepted as they are
+SPECIAL_ADDRESSES = frozenset(['any', 'all', 'subnet', '0.0.0.0'])
+
+# Protocols accepted without a port
+PORTLESS_SERVICES = frozenset(['icmp', 'ip', 'gre', 'esp', 'ah'])
+
+FORBIDDEN_DESCRIPTION_CHARS = ('<', '>', '|', '\x00', '\r')
+
+# regex matching for suspicious statements, xss, sql injection and more...not a feature but feel free to expound on in future
+SUSPICIOUS_PATTERN = re.compile(
+    r"(drop\s+table)|(delete\s+from)|insert\s+into|(<script)|(javascript)", re.IGNORECASE)
+
+REQUIRED_FIELDS = ('sourceIP', 'destinationIP', 'service', 'description')
+
+
+@lru_cache(maxsize=ACL_REQUESTS['VALIDATION_CACHE_SIZE'])
+def ip_token_error(single_ip: str) -> str:
+    """Error for one stripped, non-empty address token, or '' when it is valid"""
+    if single_ip.lower() in SPECIAL_ADDRESSES:
+        return ""
+
+    cidr_match = CIDR_PATTERN.match(single_ip)
+    if cidr_match:
+        cidr_prefix = int(cidr_match.group(2))
+        if not (0 <= cidr_prefix <= 32):
+            return f"Invalid CIDR prefix: {single_ip}, Must be 0-32"
+        return validate_ipv4_octets(cidr_match.group(1))[1]
+
+    if not IP_PATTERN.match(single_ip):
+        return f"Invalid IP format: '{single_ip}'. Expected format: x.x.x.x"
+
+    return validate_ipv4_octets(single_ip)[1]
+
+
+def validate_ip(value: str) -> Tuple[bool, str]:
+    """ip valiadtion with octet range checking"""
+    if not value:
+        return False, "Ip adress cannot be empty"
+
+    error = ip_list_error(str(value))
+    return (False, error) if error else (True, "")
+
+
+@lru_cache(maxsize=ACL_REQUESTS['VALIDATION_CACHE_SIZE'])
+def ip_list_error(value: str) -> str:
+    """First error in a comma-separated address list, or '' when every token is valid"""
+    for single_ip in value.split(','):
+        single_ip = single_ip.strip()
+        if not single_ip:
+            continue
+        error = ip_token_error(single_ip)
+        if error:
+            return error
+    return ""
+
+
+def validate_ipv4_octets(ip: str) -> Tuple[bool, str]:
+    """Validate IPv4 address octets are in range 0-255"""
+    try:
+        octets = ip.split('.')
+
+        if len(octets) != 4:
+            return False, f'IP must have 4 octets, found {len(octets)}'
+
+        for i, octet in enumerate(octets):
+            octet_num = int(octet)
+
+            if not (0 <= octet_num <= 255):
+                return False, f"Octet {i+1} is {octet_num}, must be 0-255"
+
+            if len(octet) > 1 and octet[0] == '0':
+                return False, f"Octet {i+1} has leading zero: '{octet}'"
+
+        return True, ""
+
+    except ValueError:
+        return False, f"Invalid IP adress: '{ip}'. Octets must be numbers"
+
+
+@lru_cache(maxsize=ACL_REQUESTS['VALIDATION_CACHE_SIZE'])
+def service_token_error(item: str) -> str:
+    """Error for one stripped, non-empty service token, or '' when it is valid"""
+    item_tolower = item.lower()
+    if item_tolower in KNOWN_SERVICES or item_tolower in PORTLESS_SERVICES:
+        return ""
+
+    proto_match = PROTO_PORT_PATTERN.match(item_tolower)
+    if proto_match:
+        protocol = proto_match.group(1)
+        port = int(proto_match.group(2))
+        if protocol == 'icmp':
+            if not (0 <= port <= 255):
+                return f"ICMP type {port} out of range. Must be between 0-255"
+        elif not (1 <= port <= 65535):
+            return f"Port {port} out of range. Must be between 1-65535"
+        return ""
+
+    if item.isdigit():
+        port = int(item)
+        if not (1 <= port <= 65535):
+            return f"Port {port} out of range. Must be between 1-65535"
+        return ""
+
+    range_match = PORT_RANGE_PATTERN.match(item)
+    if range_match:
+        start_port = int(range_match.group(1))
+        end_port = int(range_match.group(2))
+        if not (1 <= start_port <= 65535):
+            return f"Start port {start_port} out of range. Must be between 1-65535"
+        if not (1 <= end_port <= 65535):
+            return f"End port {end_port} out of range. Must be between 1-65535"
+        if start_port > end_port:
+            return f"Invalid range: {start_port} - {end_port}. Start must be less than the end port"
+        if start_port == end_port:
+            return f"Use single port {start_port} instead of range {start_port}-{end_port}"
+        return ""
+
+    return f"Invalid service format: '{item}'. Use port (80), range (80-90), procol/port (tcp/80) or service name (http)"
+
+
+def validate_service(value: str) -> Tuple[bool, str]:
+    '''Validate service port specification'''
+    if not value:
+        return False, "Service cannot be empty"
+
+    error = service_list_error(str(value))
+    return (False, error) if error else (True, "")
+
+
+@lru_cache(maxsize=ACL_REQUESTS['VALIDATION_CACHE_SIZE'])
+def service_list_error(value: str) -> str:
+    """First error in a comma-separated service list, or '' when every token is valid"""
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        error = service_token_error(item)
+        if error:
+            return error
+    return ""
+
+
+@lru_cache(maxsize=ACL_REQUESTS['VALIDATION_CACHE_SIZE'])
+def description_error(value: str) -> str:
+    """Error for a stripped description, or '' when it is valid"""
+    if len(value) < 1:
+        return f"Description too short ({len(value)} chars). Minimum 1 characters"
+
+    if len(value) > 500:
+        return f"Description too long ({len(value)} chars). Maximum 500 chars"
+
+    for char in FORBIDDEN_DESCRIPTION_CHARS:
+        if char in value:
+            return f"Description contains invalid character(s): '{char}'"
+
+    if SUSPICIOUS_PATTERN.search(value):
+        return "Description contains suspicious content"
+
+    return ""
+
+
+def validate_description(value: str) -> Tuple[bool, str]:
+    '''valiadte description field'''
+    if not value:
+        return False, "Description cannot be empty"
+
+    error = description_error(str(value).strip())
+    return (False, error) if error else (True, "")
+
+
+def validate_request_payload(data: dict) -> List[str]:
+    '''validate the entire acl_request payload'''
+    errors = []
+
+    system_type = data.get('system_type', '')
+
+    for field in REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            if system_type == 'Template' and field == 'description':
+                continue
+            errors.append(f"missing required field {field}")
+
+    # if missing required fields return early
+    if errors:
+        return errors
+
+    # validate sourceIP
+    is_valid, error = validate_ip(data['sourceIP'])
+    if not is_valid:
+        errors.append(f"sourceIP . {error}")
+
+    # validate destinationIP
+    is_valid, error = validate_ip(data['destinationIP'])
+    if not is_valid:
+        errors.append(f"destinationIP . {error}")
+
+    # valiadte service
+    is_valid, error = validate_service(data['service'])
+    if not is_valid:
+        errors.append(f"service . {error}")
+
+    # validate description
+    is_valid, error = validate_description(data['description'])
+    if not is_valid:
+        errors.append(f"description . {error}")
+
+    return errors
+
+
+def validate_bulk_requests(requests: List[dict]) -> Dict[int, List[str]]:
+    '''validate multiple acl requests'''
+    all_errors = {}
+    # Bulk payloads repeat whole rows; each distinct row is validated once
+    seen_rows = {}
+
+    for index, request_data in enumerate(requests):
+        get = request_data.get
+        row_key = (get('system_type'), get('sourceIP'), get('destinationIP'),
+                   get('service'), get('description'))
+        try:
+            errors = seen_rows.get(row_key)
+        except TypeError:
+            # A field value that cannot be hashed
+            errors = validate_request_payload(request_data)
+        else:
+            if errors is None:
+                errors = seen_rows[row_key] = validate_request_payload(request_data)
+            elif errors:
+                errors = list(errors)
+
+        if errors:
+            all_errors[index] = errors
+
+    return all_errors
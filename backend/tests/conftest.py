@@ -0,0 +1,88 @@
+'''Shared fixtures for the backend tests: an app on a throwaway SQLite database with the
+background sync disabled, a fresh schema per test and tokens for an admin and a regular user.
+'''
+import io
+import os
+import sys
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-for-the-backend-suite')
+
+from src.prback.config import create_app  # noqa: E402
+from src.prback.extensions import db  # noqa: E402
+from src.prback.models import User  # noqa: E402
+from src.prback.guards.jwtguard import generate_token  # noqa: E402
+from src.prback import catalog, search  # noqa: E402
+
+RULE_HEADERS = ['Source IP', 'Source Host', 'Destination IP', 'Destination Host', 'Service', 'Description']
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    app = create_app()
+    app.config['TESTING'] = True
+    # Skip the first-request hook that starts the background sync
+    app.has_started = True
+    return app
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # The in-process search index outlives the schema it was built from
+        search.search_index.update(generation=None, index=None)
+        # So is the catalog snapshot, whose version restarts with every fresh schema
+        catalog.snapshot.update(version=None, entries={}, build_locks={})
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, role):
+    user = User(name=username.title(), username=username, email=f'{username}@example.com',
+                password='not-used', role=role)
+    db.session.add(user)
+    db.session.commit()
+    return {'Authorization': f'Bearer {generate_token(user.id, user.username, user.email, user.role)}'}
+
+
+@pytest.fixture
+def admin_headers(database):
+    return make_user('admin', 'admin')
+
+
+@pytest.fixture
+def user_headers(database):
+    return make_user('alice', 'user')
+
+
+def make_workbook(sheets):
+    """xlsx bytes for {sheet name: [row, ...]}, rows as lists of cell values"""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for sheet_name, rows in sheets.items():
+        worksheet = workbook.create_sheet(sheet_name)
+        for row in rows:
+            worksheet.append(row)
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+def rule_sheet(*rules, category=None):
+    """Rows of a rule sheet: a title, the header row, an optional category row and the rules"""
+    rows = [['Firewall rules'], RULE_HEADERS]
+    if category:
+        rows.append([category])
+    rows.extend(list(rule) for rule in rules)
+    return rows
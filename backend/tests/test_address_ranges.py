@@ -0,0 +1,73 @@
+'''Address lists kept as integer ranges in address_ranges and queried for overlaps'''
+from src.prback import main
+from src.prback.addressing import parse_ipv4_prefix
+from src.prback.extensions import db
+from src.prback.indexing import address_range_rows, index_missing_addresses
+from src.prback.models import AddressRange, FirewallRule
+
+
+def add_rules(*rules):
+    for source_ip, destination_ip in rules:
+        db.session.add(FirewallRule(system_type='Core', category='Apps', source_ip=source_ip,
+                                    destination_ip=destination_ip, service='tcp/443'))
+    db.session.commit()
+    index_missing_addresses('rule')
+    db.session.commit()
+
+
+def overlap_ids(client, headers, **params):
+    response = client.get('/api/v1/addresses/overlaps', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def test_prefixes_are_normalised_and_bad_octets_rejected():
+    assert parse_ipv4_prefix('10.1.2.5/24') == ((10 << 24) | (1 << 16) | (2 << 8), 24)
+    assert parse_ipv4_prefix('10.1.2.256') is None
+    assert parse_ipv4_prefix('10.01.2.5') is None
+    assert parse_ipv4_prefix('10.1.2.5/33') is None
+
+
+def test_each_distinct_address_becomes_one_range():
+    rows = address_range_rows('rule', 7, '10.0.0.1, 10.0.0.1, 10.0.1.0/24, web01', 'any')
+
+    assert sorted((row['side'], row['start_int'], row['end_int']) for row in rows) == [
+        ('destination', 0, 0xFFFFFFFF),
+        ('source', 0x0A000001, 0x0A000001),
+        ('source', 0x0A000100, 0x0A0001FF),
+    ]
+
+
+def test_overlap_query_covers_contained_and_containing_ranges(client, user_headers):
+    add_rules(('10.1.2.3', '192.168.0.1'),
+              ('10.0.0.0/8', '192.168.0.1'),
+              ('172.16.0.1', '10.1.2.0/24'),
+              ('172.16.0.2', '192.168.0.2'),
+              ('any', '192.168.0.3'))
+
+    assert overlap_ids(client, user_headers, cidr='10.1.2.0/28') == [1, 2, 3, 5]
+    assert overlap_ids(client, user_headers, cidr='10.1.2.0/28', side='source') == [1, 2, 5]
+    assert overlap_ids(client, user_headers, cidr='10.1.2.0/28', side='destination') == [3]
+    assert overlap_ids(client, user_headers, cidr='192.168.0.2') == [4, 5]
+
+
+def test_swept_rules_lose_their_ranges():
+    add_rules(('10.0.0.1', '10.9.0.1'))
+    rule_id = FirewallRule.query.one().id
+
+    main.sync_to_mysql({'Core': {'Apps': {
+        'column_mapping': {'source_ip': 0, 'destination_ip': 1, 'service': 2, 'description': 3},
+        'data_rows': [['10.0.0.2', '10.9.0.2', 'tcp/443', 'replacement']]}}}, sweep=True)
+
+    owners = {owner_id for owner_id, in db.session.query(AddressRange.owner_id)}
+    assert rule_id not in owners
+    assert owners == {FirewallRule.query.one().id}
+
+
+def test_bad_queries_are_rejected(client, user_headers):
+    assert client.get('/api/v1/addresses/overlaps?cidr=web01', headers=user_headers).status_code == 400
+    assert client.get('/api/v1/addresses/overlaps?cidr=10.0.0.0/8&side=both',
+                      headers=user_headers).status_code == 400
+    # Requests are only open to admins
+    assert client.get('/api/v1/addresses/overlaps?cidr=10.0.0.0/8&owner_type=request',
+                      headers=user_headers).status_code == 403
@@ -0,0 +1,61 @@
+'''Auto-population from the in-memory rule lookup, one row at a time or in batches'''
+from src.prback import catalog
+from src.prback.extensions import db
+from src.prback.models import FirewallRule
+from src.prback.routes.genacc import AUTO_POPULATE_BATCH_LIMIT
+
+
+def add_rule(source_ip, destination_ip, description, system_type='Core'):
+    db.session.add(FirewallRule(system_type=system_type, category='Apps', source_ip=source_ip,
+                                source_host='app', destination_ip=destination_ip,
+                                destination_host='db', service='tcp/443', description=description))
+    db.session.commit()
+
+
+def test_exact_match_takes_the_first_rule_by_id(client, user_headers):
+    add_rule('10.0.0.1', '10.9.0.1', 'first')
+    add_rule('10.0.0.1', '10.9.0.2', 'second')
+
+    body = client.post('/api/auto-populate', headers=user_headers, json={
+        'system_type': 'Core', 'category': 'Apps', 'sourceIP': ' 10.0.0.1 '}).get_json()
+
+    assert (body['matched_by'], body['description'], body['destination_ip']) == \
+        ('source_ip', 'first', '10.9.0.1')
+
+
+def test_batch_resolves_every_row_in_order(client, user_headers):
+    add_rule('10.0.0.1', '10.9.0.1', 'by source')
+    add_rule('10.0.0.2', '10.9.0.2', 'by destination')
+
+    body = client.post('/api/auto-populate/batch', headers=user_headers, json={'rows': [
+        {'system_type': 'Core', 'category': 'Apps', 'sourceIP': '10.0.0.1'},
+        {'system_type': 'Core', 'category': 'Apps', 'destinationIP': '10.9.0.2'},
+        {'system_type': 'Edge', 'category': 'Apps', 'sourceIP': '10.0.0.1'},
+        {'system_type': 'Core', 'category': 'Apps'},
+        'not a row',
+    ]}).get_json()
+
+    assert [result.get('description') or result['error'] for result in body['results']] == [
+        'by source', 'by destination', 'No matching rules Found',
+        'No Source ip or destination ip has been provided', 'Each row must be an object']
+    assert (body['count'], body['matched']) == (5, 2)
+
+
+def test_batch_size_is_bounded(client, user_headers):
+    rows = [{'sourceIP': '10.0.0.1'}] * (AUTO_POPULATE_BATCH_LIMIT + 1)
+
+    assert client.post('/api/auto-populate/batch', headers=user_headers, json={'rows': rows}).status_code == 400
+    assert client.post('/api/auto-populate/batch', headers=user_headers, json={'rows': []}).status_code == 400
+
+
+def test_lookup_is_built_once_per_catalog_version(client, user_headers, monkeypatch):
+    add_rule('10.0.0.1', '10.9.0.1', 'first')
+    builds = []
+    rule_lookup = catalog.RuleLookup
+    monkeypatch.setattr(catalog, 'RuleLookup', lambda rules: builds.append(1) or rule_lookup(rules))
+
+    row = {'system_type': 'Core', 'category': 'Apps', 'sourceIP': '10.0.0.1'}
+    client.post('/api/auto-populate', headers=user_headers, json=row)
+    client.post('/api/auto-populate/batch', headers=user_headers, json={'rows': [row, row]})
+
+    assert len(builds) == 1
@@ -0,0 +1,77 @@
+'''The Core bulk insert path behind /api/v1/create_acl_request/bulk'''
+import pytest
+
+from src.prback import ingest
+from src.prback.extensions import db
+from src.prback.ingest import insert_acl_requests
+from src.prback.models import ACLRequest, AddressRange, ServiceRange
+
+
+def submission(n, **overrides):
+    return {'system_type': 'Core', 'category': 'Apps', 'sourceIP': f'10.0.0.{n}', 'sourceHost': f'app{n}',
+            'destinationIP': '10.9.0.1', 'destinationHost': 'db', 'service': 'tcp/443',
+            'description': f'request {n}', **overrides}
+
+
+@pytest.fixture(params=['returning', 'insert_batch'])
+def id_strategy(request, monkeypatch):
+    if request.param == 'insert_batch':
+        monkeypatch.setattr(db.session.get_bind().dialect,
+                            'insert_executemany_returning_sort_by_parameter_order', False)
+    return request.param
+
+
+def test_ids_come_back_in_row_order(client, user_headers, id_strategy, monkeypatch):
+    monkeypatch.setitem(ingest.ACL_REQUESTS, 'BULK_INSERT_CHUNK_SIZE', 3)
+    # Interleave an earlier row so the new ids are not the table's first ones
+    db.session.add(ACLRequest(requester='bob', system_type='Core', category='Apps', source_ip='10.1.0.1',
+                              source_host='x', destination_ip='10.9.0.1', destination_host='db',
+                              service='tcp/22', reason='earlier'))
+    db.session.commit()
+
+    response = client.post('/api/v1/create_acl_request/bulk', headers=user_headers,
+                           json={'requests': [submission(n) for n in range(1, 8)], 'compact': True})
+
+    assert response.status_code == 201
+    ids = response.get_json()['ids']
+    assert len(ids) == 7
+    by_id = {acl_request.id: acl_request for acl_request in ACLRequest.query.filter(ACLRequest.id.in_(ids))}
+    assert [by_id[request_id].reason for request_id in ids] == [f'request {n}' for n in range(1, 8)]
+    assert {by_id[request_id].requester for request_id in ids} == {'alice'}
+    assert {by_id[request_id].status for request_id in ids} == {'Pending'}
+    # Each chunk of the token path carries its own token
+    batches = {by_id[request_id].insert_batch for request_id in ids}
+    if id_strategy == 'returning':
+        assert batches == {None}
+    else:
+        assert len(batches) == 3 and None not in batches
+
+
+def test_ranges_are_written_for_the_new_ids(id_strategy):
+    ids = insert_acl_requests([{
+        'requester': 'alice', 'system_type': 'Core', 'category': 'Apps', 'source_ip': f'10.0.0.{n}',
+        'source_host': 'app', 'destination_ip': '10.9.0.1, 10.9.0.2', 'destination_host': 'db',
+        'service': 'https, dns', 'reason': 'bulk'} for n in range(1, 4)])
+    db.session.commit()
+
+    addresses = db.session.query(AddressRange.owner_id).filter_by(owner_type='request').all()
+    services = db.session.query(ServiceRange.owner_id).filter_by(owner_type='request').all()
+    assert sorted(owner_id for owner_id, in addresses) == sorted(ids * 3)
+    assert sorted(owner_id for owner_id, in services) == sorted(ids * 3)
+
+
+def test_invalid_rows_reject_the_whole_submission(client, user_headers):
+    response = client.post('/api/v1/create_acl_request/bulk', headers=user_headers, json={'requests': [
+        submission(1), submission(2, sourceIP='10.0.0.300')]})
+
+    assert response.status_code == 400
+    assert response.get_json()['failed count'] == 1
+    assert ACLRequest.query.count() == 0
+
+
+def test_full_response_echoes_the_rows(client, user_headers):
+    response = client.post('/api/v1/create_acl_request/bulk', headers=user_headers,
+                           json={'requests': [submission(1), submission(2)]})
+
+    assert response.status_code == 201
+    assert [row['sourceIP'] for row in response.get_json()['requests']] == ['10.0.0.1', '10.0.0.2']
@@ -0,0 +1,80 @@
+'''Compaction of approved requests into the fewest equivalent rules'''
+from itertools import product
+from types import SimpleNamespace
+
+from src.prback.addressing import parse_service_ranges
+from src.prback.compaction import compact_requests
+from src.prback.extensions import db
+from src.prback.flowmatch import FlowMatcher, parse_flow
+from src.prback.models import ACLRequest
+from src.prback.validation import validate_ip
+
+REQUESTS = [
+    (1, '10.0.0.0/25', '10.9.0.1', 'tcp/80', 'Apps'),
+    (2, '10.0.0.128/25', '10.9.0.1', 'tcp/80', 'Apps'),
+    (3, '10.0.0.0/24', '10.9.0.2', 'tcp/80', 'Apps'),
+    (4, '10.0.0.0/24', '10.9.0.1', 'tcp/81', 'Apps'),
+    (5, '10.0.0.0/24', '10.9.0.2', 'tcp/81', 'Apps'),
+    (6, 'web01', '10.9.0.1', 'tcp/80', 'Apps'),
+    (7, '10.0.0.1', '10.9.0.1', 'tcp/80', 'Other'),
+    (8, 'any', '10.9.9.9', 'icmp, 53, https', 'Apps'),
+]
+
+
+def acl_request(request_id, source_ip, destination_ip, service, category):
+    return SimpleNamespace(id=request_id, system_type='Core', category=category, source_ip=source_ip,
+                           destination_ip=destination_ip, service=service)
+
+
+def test_requests_merge_across_every_dimension():
+    rules = compact_requests([acl_request(*values) for values in REQUESTS])
+
+    assert [(rule['category'], rule['source_ip'], rule['destination_ip'], rule['service'],
+             rule['request_ids']) for rule in rules] == [
+        ('Apps', '10.0.0.0/24', '10.9.0.1, 10.9.0.2', 'tcp/80-81', [1, 2, 3, 4, 5]),
+        ('Apps', 'web01', '10.9.0.1', 'tcp/80', [6]),
+        ('Apps', 'any', '10.9.9.9', '53, icmp, tcp/443', [8]),
+        ('Other', '10.0.0.1', '10.9.0.1', 'tcp/80', [7]),
+    ]
+
+
+def test_compacted_rules_permit_exactly_the_requested_flows():
+    requests = [acl_request(*values) for values in REQUESTS if values[0] != 6]
+    rules = [SimpleNamespace(id=index, system_type='Core', **{
+        name: rule[name] for name in ('source_ip', 'destination_ip', 'service')})
+        for index, rule in enumerate(compact_requests(requests))]
+    flows = [parse_flow({'source_ip': source, 'destination_ip': destination, 'service': service})[0]
+             for source, destination, service in product(
+                 ['10.0.0.1', '10.0.0.200', '10.0.1.1', '172.16.0.1'],
+                 ['10.9.0.1', '10.9.0.2', '10.9.0.3', '10.9.9.9'],
+                 ['tcp/80', 'tcp/81', 'tcp/82', 'udp/53', 'icmp', 'https'])]
+
+    before = [bool(len(ids)) for ids in FlowMatcher(requests).match(flows)]
+    after = [bool(len(ids)) for ids in FlowMatcher(rules).match(flows)]
+
+    assert after == before
+    assert any(before) and not all(before)
+
+
+def test_rendered_rules_parse_back_to_the_merged_ranges():
+    rules = compact_requests([acl_request(*values) for values in REQUESTS if values[0] != 6])
+
+    for rule in rules:
+        assert validate_ip(rule['source_ip'])[0]
+        assert validate_ip(rule['destination_ip'])[0]
+    assert [sorted(parse_service_ranges(rule['service'])) for rule in rules] == [
+        [('tcp', 80, 81)], [('any', 53, 53), ('icmp', 0, 255), ('tcp', 443, 443)], [('tcp', 80, 80)]]
+
+
+def test_endpoint_compacts_only_the_requested_status(client, admin_headers):
+    for request_id, source_ip, destination_ip, service, category in REQUESTS[:3]:
+        db.session.add(ACLRequest(requester='alice', system_type='Core', category=category,
+                                  source_ip=source_ip, source_host='app', destination_ip=destination_ip,
+                                  destination_host='db', service=service, reason='web tier',
+                                  status='Approved' if request_id != 3 else 'Pending'))
+    db.session.commit()
+
+    body = client.get('/api/v1/admin/acl_requests/compacted', headers=admin_headers).get_json()
+
+    assert (body['request_count'], body['rule_count']) == (2, 1)
+    assert body['rules'][0]['source_ip'] == '10.0.0.0/24'
@@ -0,0 +1,50 @@
+'''sync_to_mysql only writes rules that are new or whose fingerprint changed'''
+from conftest import make_workbook, rule_sheet
+from src.prback import main
+from src.prback.models import FirewallRule
+
+PAYROLL = ['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db']
+BILLING = ['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']
+
+
+def sync(*rules):
+    sheet_structures, failed_sheets = main.load_excel_data(make_workbook({'Core': rule_sheet(*rules)}))
+    assert not failed_sheets
+    return main.sync_to_mysql(sheet_structures)
+
+
+def test_unchanged_rules_are_not_written_again():
+    first = sync(PAYROLL, BILLING)
+    assert (first['added'], first['updated'], first['unchanged']) == (2, 0, 0)
+
+    second = sync(PAYROLL, BILLING)
+
+    assert (second['added'], second['updated'], second['unchanged']) == (0, 0, 2)
+    # Nothing changed, so the generation does not move and no rule is restamped
+    assert second['generation'] == first['generation']
+    assert {rule.sync_generation for rule in FirewallRule.query} == {first['generation']}
+
+
+def test_changed_columns_update_the_rule_in_place():
+    first = sync(PAYROLL, BILLING)
+    rule = FirewallRule.query.filter_by(source_ip='10.0.0.1').one()
+    rule_id, old_fingerprint = rule.id, rule.fingerprint
+
+    second = sync(PAYROLL[:5] + ['payroll db, primary'], BILLING)
+
+    assert (second['added'], second['updated'], second['unchanged']) == (0, 1, 1)
+    assert second['generation'] == first['generation'] + 1
+    rule = FirewallRule.query.filter_by(source_ip='10.0.0.1').one()
+    assert rule.id == rule_id
+    assert rule.description == 'payroll db, primary'
+    assert rule.fingerprint != old_fingerprint
+    assert rule.sync_generation == second['generation']
+    billing = FirewallRule.query.filter_by(source_ip='10.0.2.1').one()
+    assert billing.sync_generation == first['generation']
+
+
+def test_fingerprint_covers_every_synced_column():
+    row = dict(zip(main.FINGERPRINT_COLUMNS, ['Core', 'Apps', *PAYROLL]))
+
+    for column in main.FINGERPRINT_COLUMNS:
+        assert main.rule_fingerprint({**row, column: row[column] + 'x'}) != main.rule_fingerprint(row)
@@ -0,0 +1,79 @@
+'''Which catalog rules permit a (source, destination, service) flow'''
+from src.prback import flowmatch
+from src.prback.extensions import db
+from src.prback.models import FirewallRule
+
+RULES = [
+    ('Core', '10.0.0.0/8', '10.9.0.0/16', 'tcp/443'),
+    ('Core', '10.1.0.1, 10.1.0.2', '10.9.0.1', 'dns'),
+    ('Core', 'any', '10.9.0.5', '8000-8100'),
+    ('Core', '172.16.0.0/12', 'any', 'icmp'),
+    ('Edge', '10.0.0.0/8', '10.9.0.0/16', 'ip'),
+    ('Core', 'web01', '10.9.0.1', 'tcp/443'),
+]
+
+FLOWS = [
+    ({'source_ip': '10.1.2.3', 'destination_ip': '10.9.0.1', 'service': 'tcp/443'}, [1, 5]),
+    # dns is tcp/53 and udp/53, so a rule must cover both
+    ({'source_ip': '10.1.0.1', 'destination_ip': '10.9.0.1', 'service': 'dns'}, [2, 5]),
+    ({'source_ip': '10.1.0.1', 'destination_ip': '10.9.0.1', 'protocol': 'udp', 'port': 53}, [2, 5]),
+    # A bare port range permits tcp and udp
+    ({'source_ip': '192.168.1.1', 'destination_ip': '10.9.0.5', 'service': 'tcp/8080'}, [3]),
+    ({'source_ip': '10.1.0.0/16', 'destination_ip': '10.9.0.5', 'service': '8080'}, [3, 5]),
+    ({'source_ip': '172.16.5.5', 'destination_ip': '8.8.8.8', 'service': 'icmp'}, [4]),
+    ({'source_ip': '172.16.5.5', 'destination_ip': '8.8.8.8', 'service': 'tcp/80'}, []),
+    # Only part of the flow's source is covered
+    ({'source_ip': '10.1.0.0/30', 'destination_ip': '10.9.0.1', 'service': 'udp/53'}, [5]),
+]
+
+
+def add_rules():
+    for system_type, source_ip, destination_ip, service in RULES:
+        db.session.add(FirewallRule(system_type=system_type, category='Apps', source_ip=source_ip,
+                                    destination_ip=destination_ip, service=service))
+    db.session.commit()
+
+
+def test_rules_must_cover_source_destination_and_every_service_range():
+    add_rules()
+
+    results = flowmatch.match_flows([flow for flow, _ in FLOWS])
+
+    assert [result['rule_ids'] for result in results] == [expected for _, expected in FLOWS]
+    assert [result['matched'] for result in results] == [bool(expected) for _, expected in FLOWS]
+
+
+def test_system_type_restricts_the_rules():
+    add_rules()
+
+    results = flowmatch.match_flows([flow for flow, _ in FLOWS], system_type='Core')
+
+    assert [result['rule_ids'] for result in results] == [
+        [rule_id for rule_id in expected if rule_id != 5] for _, expected in FLOWS]
+
+
+def test_batches_larger_than_a_chunk_match_like_single_flows(monkeypatch):
+    add_rules()
+    monkeypatch.setattr(flowmatch, 'FLOW_CHUNK_SIZE', 3)
+    flows = [flow for flow, _ in FLOWS] * 2
+
+    results = flowmatch.match_flows(flows)
+
+    assert [result['rule_ids'] for result in results] == [expected for _, expected in FLOWS] * 2
+
+
+def test_endpoint_reports_unparsable_flows_and_the_matched_rules(client, user_headers):
+    add_rules()
+
+    body = client.post('/api/v1/flows/match', headers=user_headers, json={'flows': [
+        FLOWS[0][0],
+        {'source_ip': 'web01', 'destination_ip': '10.9.0.1', 'service': 'tcp/443'},
+        {'source_ip': '10.1.2.3', 'destination_ip': '10.9.0.1', 'service': 'bogus'},
+    ]}).get_json()
+
+    assert body['results'][0] == {'index': 0, 'matched': True, 'rule_ids': [1, 5]}
+    assert body['results'][1] == {'index': 1, 'error': 'source_ip must be a single IPv4 address or prefix'}
+    assert 'error' in body['results'][2]
+    assert (body['count'], body['matched']) == (3, 1)
+    assert sorted(body['rules']) == ['1', '5']
+    assert client.post('/api/v1/flows/match', headers=user_headers, json={'flows': []}).status_code == 400
@@ -0,0 +1,52 @@
+'''Form options are built once per catalog version and revalidated with ETags'''
+from conftest import make_workbook, rule_sheet
+from src.prback import catalog, main
+
+PAYROLL = ['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db']
+BILLING = ['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']
+
+
+def sync(*rules):
+    sheet_structures, _ = main.load_excel_data(make_workbook({'Core': rule_sheet(*rules)}))
+    assert main.sync_to_mysql(sheet_structures)
+
+
+def test_matching_etag_is_answered_with_304(client, user_headers):
+    sync(PAYROLL)
+
+    response = client.get('/form-options', headers=user_headers)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache, private'
+    assert [ip['value'] for ip in response.get_json()['source_ips']] == ['10.0.0.1']
+
+    revalidated = client.get('/form-options', headers={**user_headers, 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+
+def test_sync_that_changes_the_catalog_changes_the_etag(client, user_headers):
+    sync(PAYROLL)
+    etag = client.get('/api/mysql-options', headers=user_headers).headers['ETag']
+
+    sync(PAYROLL, BILLING)
+
+    response = client.get('/api/mysql-options', headers={**user_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [ip['value'] for ip in response.get_json()['source_ips']] == ['10.0.0.1', '10.0.2.1']
+
+
+def test_payload_is_built_once_per_catalog_version(client, user_headers, monkeypatch):
+    sync(PAYROLL)
+    loads = []
+    load_rules = catalog.load_rules
+    monkeypatch.setattr(catalog, 'load_rules', lambda: loads.append(1) or load_rules())
+
+    for _ in range(3):
+        assert client.get('/form-options', headers=user_headers).status_code == 200
+    assert len(loads) == 1
+
+    # An unchanged sync keeps the version, and with it the built payload
+    sync(PAYROLL)
+    client.get('/form-options', headers=user_headers)
+    assert len(loads) == 1
@@ -0,0 +1,54 @@
+'''POST /api/v1/acl_requests/import: spreadsheet rows become requests with a per-row report'''
+import io
+
+from conftest import make_workbook, RULE_HEADERS
+from src.prback.models import ACLRequest
+
+WORKBOOK = make_workbook({
+    'Payroll': [
+        ['Firewall rules'],
+        RULE_HEADERS,
+        ['Web tier'],
+        ['10.0.0.1', 'app1', '10.0.1.5', 'db1', 'tcp/5432', 'payroll db'],
+        [],
+        ['Batch jobs'],
+        ['10.0.0.9', 'batch1', '10.0.1.5', 'db1', '443', 'nightly export'],
+        ['10.0.0.300', 'bad1', '10.0.1.5', 'db1', '443', 'bad address'],
+        ['10.0.0.7', 'only a source'],
+    ],
+    'Notes': [['just some notes']],
+})
+
+
+def upload(client, headers, content, **form):
+    data = {'file': (io.BytesIO(content), 'rules.xlsx'), 'system_type': 'Payroll', **form}
+    return client.post('/api/v1/acl_requests/import', headers=headers, data=data,
+                       content_type='multipart/form-data')
+
+
+def test_rows_are_imported_under_their_category_rows(client, user_headers):
+    response = upload(client, user_headers, WORKBOOK)
+
+    assert response.status_code == 201
+    report = response.get_json()
+    assert (report['rows'], report['created'], report['failed']) == (4, 2, 2)
+    requests = ACLRequest.query.order_by(ACLRequest.id).all()
+    assert [(r.category, r.source_host, r.requester) for r in requests] == [
+        ('Web tier', 'app1', 'alice'), ('Batch jobs', 'batch1', 'alice')]
+    assert {(error['sheet'], error.get('row')) for error in report['errors']} == {
+        ('Payroll', 8), ('Payroll', 9), ('Notes', None)}
+
+
+def test_category_field_overrides_category_rows(client, user_headers):
+    response = upload(client, user_headers, WORKBOOK, category='Imported')
+
+    assert response.status_code == 201
+    assert {r.category for r in ACLRequest.query.all()} == {'Imported'}
+
+
+def test_file_that_is_not_a_workbook_is_rejected(client, user_headers):
+    response = upload(client, user_headers, b'not a zip file')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'File is not a valid .xlsx workbook'
+    assert ACLRequest.query.count() == 0
@@ -0,0 +1,123 @@
+'''Conditional fetches of the Google Sheets workbook, against a local HTTP stand-in'''
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import make_workbook, rule_sheet
+from src.prback import main
+from src.prback.models import FirewallRule, SyncState
+
+WORKBOOK = make_workbook({
+    'Payroll': rule_sheet(['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db']),
+    'Billing': rule_sheet(['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']),
+})
+
+
+class WorkbookServer(ThreadingHTTPServer):
+    """Serves one workbook with an ETag, answering 304 when If-None-Match matches"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), WorkbookHandler)
+        self.content = WORKBOOK
+        self.etag = '"v1"'
+        self.honour_conditional = True
+        self.seen_headers = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/export.xlsx"
+
+
+class WorkbookHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.seen_headers.append(dict(self.headers))
+        if self.server.honour_conditional and self.headers.get('If-None-Match') == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.send_header('Content-Length', str(len(self.server.content)))
+        self.send_header('ETag', self.server.etag)
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def sheet_server(monkeypatch):
+    server = WorkbookServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(main, 'EXCEL_URL', server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def sync_state():
+    return SyncState.query.filter_by(name=main.SYNC_STATE_NAME).first()
+
+
+def test_first_sync_stores_validators(app, sheet_server):
+    assert main.incremental_sync(app) == 'synced'
+
+    assert 'If-None-Match' not in sheet_server.seen_headers[0]
+    state = sync_state()
+    assert state.etag == '"v1"'
+    assert state.content_sha256
+    assert FirewallRule.query.count() == 2
+
+
+def test_matching_etag_is_not_downloaded_again(app, sheet_server):
+    main.incremental_sync(app)
+
+    assert main.incremental_sync(app) == 'skipped_not_modified'
+    assert sheet_server.seen_headers[1]['If-None-Match'] == '"v1"'
+    assert sync_state().last_status == 'skipped_not_modified'
+
+
+def test_unchanged_content_is_skipped_without_conditional_support(app, sheet_server):
+    main.incremental_sync(app)
+    sheet_server.honour_conditional = False
+    sheet_server.etag = '"v2"'
+
+    assert main.incremental_sync(app) == 'skipped_unchanged'
+    assert sync_state().etag == '"v2"'
+
+
+def test_changed_workbook_is_synced(app, sheet_server):
+    main.incremental_sync(app)
+    sheet_server.content = make_workbook({
+        'Payroll': rule_sheet(['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db'],
+                              ['10.0.0.2', 'app3', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll replica']),
+        'Billing': rule_sheet(['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']),
+    })
+    sheet_server.etag = '"v2"'
+
+    assert main.incremental_sync(app) == 'synced'
+    assert sync_state().etag == '"v2"'
+    assert FirewallRule.query.count() == 3
+
+
+def test_partial_parse_keeps_previous_validators(app, sheet_server, monkeypatch):
+    parse = main.load_excel_data
+
+    def parse_without_billing(content):
+        sheet_structures, failed_sheets = parse(content)
+        sheet_structures['Billing'] = {}
+        return sheet_structures, failed_sheets + ['Billing']
+
+    monkeypatch.setattr(main, 'load_excel_data', parse_without_billing)
+    assert main.incremental_sync(app) == 'synced_partial'
+
+    state = sync_state()
+    assert state.etag is None
+    assert state.content_sha256 is None
+    # The next run downloads and parses the workbook again
+    monkeypatch.setattr(main, 'load_excel_data', parse)
+    assert main.incremental_sync(app) == 'synced'
+    assert 'If-None-Match' not in sheet_server.seen_headers[1]
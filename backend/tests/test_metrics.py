@@ -0,0 +1,64 @@
+'''The /metrics endpoint: off without a scrape token, behind it otherwise'''
+import pytest
+
+from src.prback import config, main, metrics
+
+TOKEN = 'scrape-token'
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setitem(config.METRICS, 'TOKEN', TOKEN)
+    return {'Authorization': f'Bearer {TOKEN}'}
+
+
+def test_metrics_are_off_without_a_token(client):
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 404
+
+
+def test_metrics_need_the_scrape_token(client, metrics_token, admin_headers):
+    assert client.get('/metrics').status_code == 401
+    # A valid user token is not the scrape token
+    response = client.get('/metrics', headers=admin_headers)
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+
+def test_request_latency_is_labelled_by_route(client, metrics_token, user_headers):
+    client.get('/api/v1/addresses/overlaps?cidr=10.0.0.0/8', headers=user_headers)
+
+    response = client.get('/metrics', headers=metrics_token)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE prback_sync_stage_duration_seconds histogram' in body
+    assert ('prback_http_request_duration_seconds_count{blueprint="flows",'
+            'endpoint="/api/v1/addresses/overlaps",method="GET",status="200"}') in body
+
+
+def test_sync_stages_are_timed(client, metrics_token):
+    main.sync_to_mysql({})
+
+    body = client.get('/metrics', headers=metrics_token).get_data(as_text=True)
+    for stage in ('validate', 'upsert', 'commit'):
+        assert f'prback_sync_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert 'prback_sync_rows_total{result="unchanged"}' in body
+
+
+def test_histogram_renders_cumulative_buckets(monkeypatch):
+    monkeypatch.setattr(metrics, 'REGISTRY', [])
+    histogram = metrics.Histogram('demo_seconds', 'Demo timings', ('stage',), buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, stage='parse')
+    histogram.observe(0.5, stage='parse')
+    histogram.observe(5, stage='parse')
+
+    assert metrics.render_metrics().splitlines()[2:] == [
+        'demo_seconds_bucket{stage="parse",le="0.1"} 1',
+        'demo_seconds_bucket{stage="parse",le="1"} 2',
+        'demo_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'demo_seconds_sum{stage="parse"} 5.55',
+        'demo_seconds_count{stage="parse"} 3',
+    ]
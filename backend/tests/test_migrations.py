@@ -0,0 +1,63 @@
+'''The Alembic migrations bring a pre-migration database up to the current models'''
+import os
+
+import pytest
+import sqlalchemy as sa
+from flask_migrate import upgrade, downgrade
+
+from src.prback.config import create_app
+from src.prback.extensions import db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+BASELINE = '3f1a9c2e7b10'
+
+# Tables and firewall_rules columns of the baseline schema
+BASELINE_TABLES = {'acl_requests', 'firewall_rules', 'Users', 'templates'}
+BASELINE_RULE_COLUMNS = {'id', 'system_type', 'category', 'source_ip', 'source_host',
+                         'destination_ip', 'destination_host', 'service', 'description',
+                         'created_at'}
+
+
+@pytest.fixture
+def migration_app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'migrated.db'}")
+    app = create_app()
+    app.has_started = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def columns(table):
+    return {column['name'] for column in sa.inspect(db.engine).get_columns(table)}
+
+
+def test_upgrade_matches_the_models_and_keeps_rows(migration_app):
+    upgrade(directory=MIGRATIONS, revision=BASELINE)
+    with db.engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO firewall_rules (system_type, source_ip, service) VALUES ('Core', '10.0.0.1', 'tcp/443')"))
+
+    upgrade(directory=MIGRATIONS)
+
+    inspector = sa.inspect(db.engine)
+    assert set(db.metadata.tables) <= set(inspector.get_table_names())
+    for table in db.metadata.tables.values():
+        assert {column.name for column in table.columns} == columns(table.name)
+        # MySQL-only indexes (FULLTEXT) are not made on SQLite
+        expected = {index.name for index in table.indexes if not index.dialect_kwargs.get('mysql_prefix')}
+        assert expected <= {index['name'] for index in inspector.get_indexes(table.name)}
+    with db.engine.connect() as connection:
+        assert connection.execute(sa.text("SELECT source_ip, service FROM firewall_rules")).all() == \
+            [('10.0.0.1', 'tcp/443')]
+
+
+def test_upgrade_skips_what_create_all_already_made(migration_app):
+    db.create_all()
+
+    upgrade(directory=MIGRATIONS)
+    downgrade(directory=MIGRATIONS, revision=BASELINE)
+
+    assert set(sa.inspect(db.engine).get_table_names()) - {'alembic_version'} == BASELINE_TABLES
+    assert columns('firewall_rules') == BASELINE_RULE_COLUMNS
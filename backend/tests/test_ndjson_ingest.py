@@ -0,0 +1,77 @@
+'''Streaming NDJSON submissions to /api/v1/create_acl_request/bulk'''
+import gzip
+import json
+
+from src.prback import ingest
+from src.prback.extensions import db
+from src.prback.models import ACLRequest
+
+
+def submission(n, **overrides):
+    return {'system_type': 'Core', 'category': 'Apps', 'sourceIP': f'10.0.0.{n}', 'sourceHost': f'app{n}',
+            'destinationIP': '10.9.0.1', 'destinationHost': 'db', 'service': 'tcp/443',
+            'description': f'request {n}', **overrides}
+
+
+def post_ndjson(client, headers, body, **extra_headers):
+    response = client.post('/api/v1/create_acl_request/bulk', data=body,
+                           headers={**headers, 'Content-Type': 'application/x-ndjson', **extra_headers})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_each_line_gets_a_result_and_bad_lines_are_skipped(client, user_headers):
+    body = '\n'.join([
+        json.dumps(submission(1)),
+        '',
+        '{not json',
+        json.dumps(submission(2, sourceIP='10.0.0.300')),
+        json.dumps(['not', 'an', 'object']),
+        json.dumps({'sourceIP': '10.0.0.4'}),
+        json.dumps(submission(5)),
+    ]) + '\n'
+
+    results = post_ndjson(client, user_headers, body)
+
+    assert [(result.get('line'), result.get('status')) for result in results[:-1]] == [
+        (1, 'created'), (3, 'error'), (4, 'error'), (5, 'error'), (6, 'error'), (7, 'created')]
+    assert results[1]['errors'] == ['line is not valid JSON']
+    assert results[3]['errors'] == ['each line must be a JSON object']
+    assert 'missing required field system_type' in results[4]['errors']
+    assert results[-1] == {'summary': {'lines': 6, 'created': 2, 'failed': 4}}
+    assert sorted(acl_request.reason for acl_request in ACLRequest.query) == ['request 1', 'request 5']
+    assert {results[0]['id'], results[-2]['id']} == {acl_request.id for acl_request in ACLRequest.query}
+
+
+def test_gzip_bodies_are_decoded(client, user_headers):
+    body = gzip.compress(''.join(json.dumps(submission(n)) + '\n' for n in range(1, 4)).encode('utf-8'))
+
+    results = post_ndjson(client, user_headers, body, **{'Content-Encoding': 'gzip'})
+
+    assert results[-1] == {'summary': {'lines': 3, 'created': 3, 'failed': 0}}
+    assert ACLRequest.query.count() == 3
+
+
+def test_corrupt_gzip_is_reported_in_the_stream(client, user_headers):
+    results = post_ndjson(client, user_headers, b'not gzip at all', **{'Content-Encoding': 'gzip'})
+
+    assert results == [{'error': 'Request body is not valid gzip'}]
+    assert client.post('/api/v1/create_acl_request/bulk', data=b'', headers={
+        **user_headers, 'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'br'}).status_code == 415
+
+
+def test_each_batch_is_committed_before_the_next_is_read(monkeypatch):
+    events = []
+    monkeypatch.setattr(db.session, 'commit', lambda: events.append(('commit', ACLRequest.query.count())))
+
+    def lines():
+        for n in range(1, 6):
+            events.append(('read', n))
+            yield json.dumps(submission(n))
+
+    results = list(ingest.ingest_ndjson(lines(), 'alice', batch_size=2))
+
+    assert events == [('read', 1), ('read', 2), ('commit', 2), ('read', 3), ('read', 4), ('commit', 4),
+                      ('read', 5), ('commit', 5)]
+    assert results[-1] == {'summary': {'lines': 5, 'created': 5, 'failed': 0}}
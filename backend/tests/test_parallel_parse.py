@@ -0,0 +1,31 @@
+'''Parsing sheets in a process pool gives the same structures as the serial path'''
+from conftest import make_workbook, rule_sheet
+from src.prback import main
+
+WORKBOOK = make_workbook({
+    'Payroll': rule_sheet(['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db'],
+                          ['10.0.0.2', 'app3', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll replica']),
+    'Billing': rule_sheet(['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']),
+    'Notes': [['free text only']],
+})
+
+
+def test_parallel_parse_matches_serial_parse(monkeypatch):
+    serial = main.load_excel_data(WORKBOOK)
+
+    monkeypatch.setitem(main.GOOGLE_SHEETS, 'PARSE_WORKERS', 2)
+    parallel = main.load_excel_data(WORKBOOK)
+
+    assert parallel == serial
+    assert list(parallel[0]) == ['Payroll', 'Billing', 'Notes']
+
+
+def test_worker_parses_sheets_from_its_open_workbook(monkeypatch):
+    monkeypatch.setattr(main, 'worker_workbook', None)
+    main.init_parse_worker(WORKBOOK)
+
+    sheet_data, parse_seconds = main.parse_workbook_sheet('Billing')
+
+    assert sheet_data['Uncategorized']['data_rows'] == [
+        ['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']]
+    assert parse_seconds >= 0
@@ -0,0 +1,72 @@
+'''Redundancy findings over the rule catalog and the limits reported with them'''
+import io
+import random
+from types import SimpleNamespace
+
+import openpyxl
+
+from src.prback.analysis import analyze_redundancy, PortRangeTree, REPORT_LIMITATIONS
+from src.prback.extensions import db
+from src.prback.models import FirewallRule
+
+
+def rule(rule_id, source_ip, destination_ip, service, system_type='Core'):
+    return SimpleNamespace(id=rule_id, system_type=system_type, category='Apps', source_ip=source_ip,
+                           destination_ip=destination_ip, service=service)
+
+
+def kinds(report):
+    return {finding['rule_id']: (finding['kind'], finding['related_rule_id'])
+            for finding in report['findings']}
+
+
+def test_duplicates_shadowed_and_contained_rules():
+    report = analyze_redundancy([
+        rule(1, '10.0.0.0/8', '10.9.0.0/16', 'tcp/1-1024'),
+        rule(2, '10.1.0.0/16', '10.9.1.0/24', 'tcp/443'),
+        rule(3, '10.1.0.0/16', '10.9.1.0/24', 'tcp/443'),
+        rule(4, '172.16.0.1', '10.9.0.1', 'tcp/22'),
+        rule(5, '172.16.0.0/12', '10.9.0.0/16', 'tcp/22'),
+        rule(6, '10.1.0.0/16', '10.9.1.0/24', 'tcp/443', system_type='Edge'),
+    ])
+
+    assert kinds(report) == {2: ('shadowed', 1), 3: ('duplicate', 2), 4: ('contained', 5)}
+    assert report['summary'] == {'duplicate': 1, 'shadowed': 1, 'contained': 1}
+
+
+def test_rules_covered_only_jointly_are_not_reported():
+    report = analyze_redundancy([
+        rule(1, '10.0.0.0/24', '10.9.0.1', 'tcp/443'),
+        rule(2, '10.0.1.0/24', '10.9.0.1', 'tcp/443'),
+        rule(3, '10.0.0.0/23', '10.9.0.1', 'tcp/443'),
+    ])
+
+    assert kinds(report) == {1: ('contained', 3), 2: ('contained', 3)}
+    assert list(report['limitations']) == list(REPORT_LIMITATIONS)
+
+
+def test_endpoint_and_export_carry_the_limitations(client, admin_headers):
+    db.session.add(FirewallRule(system_type='Core', category='Apps', source_ip='10.0.0.0/8',
+                                destination_ip='10.9.0.1', service='tcp/443'))
+    db.session.commit()
+
+    report = client.get('/api/v1/admin/rules/redundancy', headers=admin_headers).get_json()
+    assert report['limitations'] == list(REPORT_LIMITATIONS)
+
+    response = client.get('/api/v1/admin/rules/redundancy/export', headers=admin_headers)
+    workbook = openpyxl.load_workbook(io.BytesIO(response.data))
+    assert [row[0] for row in workbook['Limitations'].iter_rows(values_only=True)] == \
+        list(REPORT_LIMITATIONS)
+
+
+def test_port_range_tree_matches_a_scan():
+    rng = random.Random(7)
+    entries = sorted((lo, lo + rng.randrange(0, 2000), rule_id)
+                     for rule_id, lo in enumerate(rng.randrange(1, 65535) for _ in range(500)))
+    tree = PortRangeTree(entries)
+
+    for _ in range(200):
+        port_lo = rng.randrange(1, 65535)
+        port_hi = port_lo + rng.randrange(0, 50)
+        assert sorted(tree.covering(port_lo, port_hi)) == sorted(
+            rule_id for lo, hi, rule_id in entries if lo <= port_lo and hi >= port_hi)
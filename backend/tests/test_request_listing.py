@@ -0,0 +1,83 @@
+'''Keyset-paginated /acl_requests listing, newest first with undated requests last'''
+from datetime import datetime
+
+from sqlalchemy import update
+
+from src.prback.extensions import db
+from src.prback.models import ACLRequest
+
+SAME_DAY = datetime(2026, 3, 2, 9, 30)
+
+CREATED = [datetime(2026, 3, 1, 8, 0), SAME_DAY, SAME_DAY, None, datetime(2026, 3, 5, 12, 0),
+           None, SAME_DAY]
+
+
+def add_requests():
+    for index, created_at in enumerate(CREATED):
+        db.session.add(ACLRequest(requester='alice' if index % 2 else 'bob', system_type='Core',
+                                  category='Apps', source_ip='10.0.0.1', source_host='app',
+                                  destination_ip='10.9.0.1', destination_host='db', service='tcp/443',
+                                  reason=f'request {index}', status='Approved' if index < 3 else 'Pending',
+                                  created_at=created_at or SAME_DAY))
+    db.session.commit()
+    undated = [index + 1 for index, created_at in enumerate(CREATED) if created_at is None]
+    db.session.execute(update(ACLRequest).where(ACLRequest.id.in_(undated)).values(created_at=None))
+    db.session.commit()
+
+
+def list_all(client, headers, **params):
+    ids = []
+    cursor = None
+    while True:
+        query = {**params, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/acl_requests', headers=headers, query_string=query)
+        assert response.status_code == 200
+        body = response.get_json()
+        ids.extend(acl_request['id'] for acl_request in body['acl_requests'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_pages_walk_every_request_once_in_order(client, admin_headers):
+    add_requests()
+
+    # Newest first, ties by id descending, undated requests last
+    assert list_all(client, admin_headers, limit=2) == [5, 7, 3, 2, 1, 6, 4]
+    assert list_all(client, admin_headers, limit=1) == [5, 7, 3, 2, 1, 6, 4]
+
+
+def test_filters_apply_to_every_page(client, admin_headers):
+    add_requests()
+
+    assert list_all(client, admin_headers, limit=1, status='Approved') == [3, 2, 1]
+    assert list_all(client, admin_headers, limit=2, requester='alice') == [2, 6, 4]
+    assert list_all(client, admin_headers, created_from='2026-03-02', created_to='2026-03-02') == [7, 3, 2]
+
+
+def test_default_page_size_and_bad_parameters(client, admin_headers, user_headers):
+    add_requests()
+
+    body = client.get('/acl_requests?limit=500', headers=admin_headers).get_json()
+    assert body['count'] == 7 and body['next_cursor'] is None
+    assert client.get('/acl_requests?cursor=bogus', headers=admin_headers).status_code == 400
+    assert client.get('/acl_requests?created_from=March', headers=admin_headers).status_code == 400
+    assert client.get('/acl_requests', headers=user_headers).status_code == 403
+
+
+def test_stats_count_every_request_not_just_one_page(client, admin_headers, user_headers):
+    add_requests()
+    db.session.add(ACLRequest(requester='carol', system_type='Edge', category='Web', source_ip='10.0.0.2',
+                              source_host='web', destination_ip='10.9.0.2', destination_host='db',
+                              service='tcp/80', reason='edge request', status='Rejected'))
+    db.session.commit()
+
+    response = client.get('/api/v1/acl_requests/stats', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "total": 8,
+        "by_status": {"Approved": 3, "Pending": 4, "Rejected": 1},
+        "system_types": ["Core", "Edge"],
+        "categories": ["Apps", "Web"]
+    }
+    assert client.get('/api/v1/acl_requests/stats', headers=user_headers).status_code == 403
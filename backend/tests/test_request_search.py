@@ -0,0 +1,80 @@
+'''Full-text search over request reasons, hosts, categories and comments'''
+from src.prback.extensions import db
+from src.prback.ingest import insert_acl_requests
+from src.prback.models import ACLRequest, SearchState
+
+
+def add_request(reason, status='Pending', source_host='app', category='Apps'):
+    acl_request = ACLRequest(requester='alice', system_type='Core', category=category,
+                             source_ip='10.0.0.1', source_host=source_host, destination_ip='10.9.0.1',
+                             destination_host='db', service='tcp/443', reason=reason, status=status)
+    db.session.add(acl_request)
+    db.session.commit()
+    return acl_request.id
+
+
+def search(client, headers, **params):
+    response = client.get('/api/v1/acl_requests/search', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def hit_ids(client, headers, **params):
+    return [result['id'] for result in search(client, headers, **params)['results']]
+
+
+def test_every_token_must_match_and_better_matches_rank_first(client, admin_headers):
+    payroll = add_request('payroll export to the reporting db')
+    payroll_twice = add_request('payroll: nightly payroll export')
+    billing = add_request('billing export', source_host='payroll-batch')
+    add_request('unrelated change')
+
+    hits = search(client, admin_headers, q='payroll export')['results']
+    assert hits[0]['id'] == payroll_twice
+    assert {hit['id'] for hit in hits} == {payroll, payroll_twice, billing}
+    assert [hit['score'] for hit in hits] == sorted((hit['score'] for hit in hits), reverse=True)
+    assert hit_ids(client, admin_headers, q='Payroll, EXPORT') == [hit['id'] for hit in hits]
+    assert hit_ids(client, admin_headers, q='payroll reporting') == [payroll]
+    assert hit_ids(client, admin_headers, q='payroll missing') == []
+
+
+def test_status_filter_and_cursor(client, admin_headers):
+    ids = [add_request(f'firewall change {n}', status='Approved' if n % 2 else 'Pending')
+           for n in range(5)]
+
+    assert sorted(hit_ids(client, admin_headers, q='firewall', status='Approved')) == [ids[1], ids[3]]
+
+    seen = []
+    cursor = None
+    while True:
+        page = search(client, admin_headers, q='firewall change', limit=2,
+                      **({'cursor': cursor} if cursor else {}))
+        seen.extend(result['id'] for result in page['results'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == ids
+
+
+def test_new_comments_and_bulk_inserts_are_searchable(client, admin_headers):
+    request_id = add_request('database access')
+    assert hit_ids(client, admin_headers, q='quarterly') == []
+
+    client.post(f'/acl_requests/{request_id}/comment', headers=admin_headers,
+                json={'comment': 'Needed for the quarterly audit'})
+    assert hit_ids(client, admin_headers, q='quarterly audit') == [request_id]
+
+    generation = db.session.get(SearchState, 1).generation
+    bulk_ids = insert_acl_requests([{
+        'requester': 'bob', 'system_type': 'Core', 'category': 'Apps', 'source_ip': '10.0.0.2',
+        'source_host': 'app', 'destination_ip': '10.9.0.2', 'destination_host': 'db',
+        'service': 'tcp/443', 'reason': 'quarterly reporting feed'}])
+    db.session.commit()
+
+    assert db.session.get(SearchState, 1).generation == generation + 1
+    assert sorted(hit_ids(client, admin_headers, q='quarterly')) == [request_id] + bulk_ids
+
+
+def test_query_is_required(client, admin_headers, user_headers):
+    assert client.get('/api/v1/acl_requests/search', headers=admin_headers).status_code == 400
+    assert client.get('/api/v1/acl_requests/search?q=db', headers=user_headers).status_code == 403
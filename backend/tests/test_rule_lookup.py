@@ -0,0 +1,48 @@
+'''Longest-prefix matching of auto-populate addresses in RuleLookup'''
+from types import SimpleNamespace
+
+from src.prback.catalog import RuleLookup
+
+
+def rule(rule_id, source_ip, destination_ip='10.9.0.1'):
+    return SimpleNamespace(id=rule_id, system_type='Core', category='Apps', source_ip=source_ip,
+                           source_host=f'host{rule_id}', destination_ip=destination_ip,
+                           destination_host='db', service='tcp/443', description=f'rule {rule_id}')
+
+
+LOOKUP = RuleLookup([
+    rule(1, '10.0.0.0/8'),
+    rule(2, '10.1.2.0/24'),
+    rule(3, '10.1.0.0/16, 172.16.0.0/12'),
+    rule(4, '10.1.2.0/24'),
+    rule(5, 'any'),
+])
+
+
+def matched_ids(ip):
+    match = LOOKUP.match_source_prefix('Core', 'Apps', ip)
+    return (match[0], [entry['id'] for entry in match[1]]) if match else None
+
+
+def test_single_address_gets_the_most_specific_rules():
+    assert matched_ids('10.1.2.15') == ('10.1.2.0/24', [2, 4])
+
+
+def test_query_prefix_is_only_covered_by_shorter_prefixes():
+    assert matched_ids('10.1.0.0/16') == ('10.1.0.0/16', [3])
+
+
+def test_address_list_matches_rules_covering_every_address():
+    assert matched_ids('10.1.2.15, 10.1.200.1') == ('10.1.0.0/16, 10.1.0.0/16', [3])
+    assert matched_ids('10.1.2.15,172.20.0.1') == ('10.1.0.0/16, 172.16.0.0/12', [3])
+    assert matched_ids('10.1.2.15, 10.200.0.1') == ('10.0.0.0/8, 10.0.0.0/8', [1])
+
+
+def test_list_without_a_common_rule_has_no_match():
+    assert matched_ids('10.1.2.15, 192.168.0.1') is None
+
+
+def test_wildcards_and_other_scopes_do_not_match():
+    assert matched_ids('any') is None
+    assert matched_ids('192.168.0.1') is None
+    assert LOOKUP.match_source_prefix('Edge', 'Apps', '10.1.2.15') is None
@@ -0,0 +1,64 @@
+'''Typeahead prefix search over rule addresses and hosts, paged with a keyset cursor'''
+from src.prback.extensions import db
+from src.prback.models import FirewallRule
+
+
+def add_rules(*rules):
+    for system_type, source_ip, source_host, destination_ip in rules:
+        db.session.add(FirewallRule(system_type=system_type, category='Apps', source_ip=source_ip,
+                                    source_host=source_host, destination_ip=destination_ip,
+                                    destination_host='db', service='tcp/443', description='api'))
+    db.session.commit()
+
+
+def search(client, headers, **params):
+    response = client.get('/api/v1/rules/search', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_prefix_search_filters_by_field_and_scope(client, user_headers):
+    add_rules(('Core', '10.1.0.1', 'app-a', '10.9.0.1'),
+              ('Core', '10.1.0.2', 'app-b', '10.9.0.2'),
+              ('Core', '10.2.0.1', 'web-a', '10.1.0.3'),
+              ('Edge', '10.1.0.4', 'app-c', '10.9.0.4'))
+
+    page = search(client, user_headers, q='10.1.', field='source_ip', system_type='Core')
+    assert [result['value'] for result in page['results']] == ['10.1.0.1', '10.1.0.2']
+    assert page['results'][0]['corresponding_ip'] == '10.9.0.1'
+
+    page = search(client, user_headers, q='app-', field='source_host')
+    assert [result['value'] for result in page['results']] == ['app-a', 'app-b', 'app-c']
+    assert page['results'][0]['host'] == '10.1.0.1'
+
+
+def test_like_wildcards_in_the_query_are_literal(client, user_headers):
+    add_rules(('Core', '10.1.0.1', 'app_a', '10.9.0.1'), ('Core', '10.1.0.2', 'appxa', '10.9.0.2'))
+
+    page = search(client, user_headers, q='app_', field='source_host')
+
+    assert [result['value'] for result in page['results']] == ['app_a']
+
+
+def test_cursor_walks_every_match_once(client, user_headers):
+    add_rules(*[('Core', f'10.1.0.{n}', f'app-{n}', '10.9.0.1') for n in range(1, 8)])
+    # A repeated value is split across pages by id
+    add_rules(('Core', '10.1.0.3', 'app-3b', '10.9.0.1'))
+
+    seen = []
+    cursor = None
+    while True:
+        params = {'q': '10.1', 'limit': 3, **({'cursor': cursor} if cursor else {})}
+        page = search(client, user_headers, **params)
+        seen.extend((result['value'], result['id']) for result in page['results'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 8
+    assert seen == sorted(seen)
+
+
+def test_bad_field_and_cursor_are_rejected(client, user_headers):
+    assert client.get('/api/v1/rules/search?field=service', headers=user_headers).status_code == 400
+    assert client.get('/api/v1/rules/search?cursor=not-a-cursor', headers=user_headers).status_code == 400
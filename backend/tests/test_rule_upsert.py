@@ -0,0 +1,61 @@
+'''Rule upserts on natural_key, natively and through the portable fallback'''
+import logging
+
+import pytest
+
+from src.prback import main
+from src.prback.extensions import db
+from src.prback.models import FirewallRule
+
+
+def rule_row(source_ip, description, generation=1):
+    row = {
+        "natural_key": main.rule_natural_key('Core', 'Apps', source_ip, '10.9.0.1', 'tcp/443'),
+        "system_type": 'Core',
+        "category": 'Apps',
+        "source_ip": source_ip,
+        "source_host": 'app',
+        "destination_ip": '10.9.0.1',
+        "destination_host": 'db',
+        "service": 'tcp/443',
+        "description": description,
+        "sync_generation": generation,
+    }
+    row["fingerprint"] = main.rule_fingerprint(row)
+    return row
+
+
+@pytest.fixture(params=['native', 'fallback'])
+def dialect(request, monkeypatch):
+    if request.param == 'fallback':
+        monkeypatch.setattr(db.session.get_bind().dialect, 'name', 'postgresql')
+    return request.param
+
+
+def test_upsert_inserts_new_keys_and_updates_existing_ones(dialect):
+    main.upsert_rules([rule_row('10.0.0.1', 'first'), rule_row('10.0.0.2', 'second')])
+    db.session.commit()
+
+    main.upsert_rules([rule_row('10.0.0.2', 'second, edited', 2), rule_row('10.0.0.3', 'third', 2)])
+    db.session.commit()
+
+    assert (main.build_upsert_statement([rule_row('10.0.0.4', 'fourth')]) is None) == (dialect == 'fallback')
+    rules = FirewallRule.query.order_by(FirewallRule.source_ip).all()
+    assert [(rule.source_ip, rule.description, rule.sync_generation) for rule in rules] == [
+        ('10.0.0.1', 'first', 1), ('10.0.0.2', 'second, edited', 2), ('10.0.0.3', 'third', 2)]
+
+
+def test_backfill_keys_legacy_rules_and_logs_the_rows_written(caplog):
+    for description in ('legacy', 'legacy duplicate'):
+        db.session.add(FirewallRule(system_type='Core', category='Apps', source_ip='10.0.0.1',
+                                    destination_ip='10.9.0.1', service='tcp/443',
+                                    description=description))
+    db.session.commit()
+
+    with caplog.at_level(logging.INFO):
+        main.backfill_natural_keys()
+    db.session.commit()
+
+    keys = [rule.natural_key for rule in FirewallRule.query.order_by(FirewallRule.id)]
+    assert keys == [main.rule_natural_key('Core', 'Apps', '10.0.0.1', '10.9.0.1', 'tcp/443'), None]
+    assert 'Backfilled natural keys for 1 of 2 legacy rules' in caplog.text
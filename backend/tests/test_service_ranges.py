@@ -0,0 +1,62 @@
+'''Service lists kept as protocol and port ranges in service_ranges and queried for overlaps'''
+from src.prback.addressing import parse_service_ranges
+from src.prback.extensions import db
+from src.prback.indexing import index_missing_services
+from src.prback.models import FirewallRule
+
+SERVICES = ['tcp/443', '80-90', 'icmp', 'any', 'dns', 'gre']
+
+
+def overlap_ids(client, headers, service):
+    response = client.get('/api/v1/services/overlaps', headers=headers, query_string={'service': service})
+    assert response.status_code == 200
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def test_service_lists_parse_into_unique_ranges():
+    assert parse_service_ranges('https, tcp/443, 8080-8090, dns, icmp, ip, bogus, 70000') == [
+        ('tcp', 443, 443), ('any', 8080, 8090), ('tcp', 53, 53), ('udp', 53, 53),
+        ('icmp', 0, 255), ('any', 0, 65535)]
+
+
+def test_protocols_only_match_compatible_ranges(client, user_headers):
+    for service in SERVICES:
+        db.session.add(FirewallRule(system_type='Core', category='Apps', source_ip='10.0.0.1',
+                                    destination_ip='10.9.0.1', service=service))
+    db.session.commit()
+    index_missing_services('rule')
+    db.session.commit()
+
+    # A bare port matches port-bearing ranges of any protocol
+    assert overlap_ids(client, user_headers, '443') == [1, 4]
+    assert overlap_ids(client, user_headers, 'tcp/85') == [2, 4]
+    assert overlap_ids(client, user_headers, 'udp/53') == [4, 5]
+    # ICMP types and GRE never match port ranges, only a protocol-wide any
+    assert overlap_ids(client, user_headers, 'icmp') == [3, 4]
+    assert overlap_ids(client, user_headers, 'gre') == [4, 6]
+    assert overlap_ids(client, user_headers, 'any') == [1, 2, 3, 4, 5, 6]
+
+
+def test_template_services_are_reindexed_on_update(client, admin_headers):
+    response = client.post('/api/v1/admin/templates/multi-rule', headers=admin_headers, json={
+        'template_name': 'web', 'rules': [{
+            'system_type': 'Core', 'category': 'Apps', 'source_ip': '10.0.0.1',
+            'destination_ip': '10.9.0.1', 'service': 'tcp/443', 'description': 'web tier'}]})
+    assert response.status_code == 201
+    template_id = response.get_json()['rules'][0]['id']
+
+    assert client.get('/api/v1/services/overlaps?service=https&owner_type=template',
+                      headers=admin_headers).get_json()['count'] == 1
+
+    client.put(f'/api/v1/admin/templates/{template_id}', headers=admin_headers, json={'service': 'ssh'})
+
+    assert client.get('/api/v1/services/overlaps?service=https&owner_type=template',
+                      headers=admin_headers).get_json()['count'] == 0
+    assert client.get('/api/v1/services/overlaps?service=tcp/22&owner_type=template',
+                      headers=admin_headers).get_json()['count'] == 1
+
+
+def test_bad_queries_are_rejected(client, user_headers):
+    assert client.get('/api/v1/services/overlaps?service=bogus', headers=user_headers).status_code == 400
+    assert client.get('/api/v1/services/overlaps?service=80&owner_type=request',
+                      headers=user_headers).status_code == 403
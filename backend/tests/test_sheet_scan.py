@@ -0,0 +1,75 @@
+'''The vectorized structure detection agrees with the row-by-row checks it replaced'''
+from src.prback import main
+
+HEADERS = ['Source IP', 'Source Host', 'Destination IP', 'Destination Host', 'Service', 'Description']
+MAPPING = main.detect_column_mapping(HEADERS, 'Core')
+
+SHEET = [
+    ['Firewall rules', '', '', '', '', ''],
+    HEADERS,
+    ['Databases', '', '', '', '', ''],
+    ['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db'],
+    ['subnet', '', 'Subnet', '', 'tcp/22', ''],
+    ['', '', '', '', 'https', 'description only'],
+    ['10.0.0.2', '', '', '', 'nan', 'no service'],
+    ['10.0.0.3', '', '', '', 'NaN', 'service spelled nan'],
+    ['', '', '', '', '', ''],
+    [' 10.0.0.4 ', '', ' 10.0.1.9 ', '', ' udp/53 ', ''],
+    ['Source', 'Destination', '', '', '', ''],
+    ['80', '', '', '', '', ''],
+]
+
+
+def test_valid_rule_mask_matches_has_valid_rule_data():
+    scan = main.scan_sheet(SHEET)
+
+    assert list(main.valid_rule_mask(scan, MAPPING)) == [
+        main.has_valid_rule_data(row, MAPPING) for row in SHEET]
+
+
+def test_valid_rule_mask_handles_ragged_rows():
+    rows = [HEADERS, ['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432'], ['10.0.0.2']]
+    scan = main.scan_sheet(rows)
+
+    assert scan["width"] == 6
+    assert list(main.valid_rule_mask(scan, MAPPING)) == [
+        main.has_valid_rule_data(row, MAPPING) for row in rows]
+
+
+def test_scan_keeps_cells_as_python_strings():
+    rows = [HEADERS, ['10.0.0.1', '', '', '', 'tcp/22', 'x' * 2000]]
+    scan = main.scan_sheet(rows)
+
+    # A fixed-width string matrix would size every cell to the longest one
+    assert all(column.dtype == object for column in scan["columns"])
+    assert list(scan["non_empty_count"]) == [6, 3]
+    assert list(scan["header_hits"]) == [6, 0]
+
+
+def test_header_row_is_the_first_row_with_two_header_cells():
+    header_row_idx, headers = main.find_header_row(SHEET)
+
+    assert header_row_idx == next(idx for idx, row in enumerate(SHEET) if main.looks_like_header_row(row))
+    assert headers == HEADERS
+    assert main.find_header_row([['10.0.0.1', 'tcp/22']]) == (None, None)
+
+
+def test_label_mask_matches_the_per_cell_checks():
+    values = main.scan_sheet(SHEET)["first_cell"]
+
+    assert list(main.label_cell_mask(values)) == [
+        bool(value) and not main.looks_like_ip(value) and not main.looks_like_service(value)
+        for value in values]
+
+
+def test_uncategorized_rows_match_the_row_by_row_rules():
+    header_row_idx = 1
+    data = main.process_uncategorized_data(SHEET, header_row_idx, HEADERS, MAPPING)
+
+    expected = [row for idx, row in enumerate(SHEET)
+                if idx > header_row_idx and any(row)
+                and not main.looks_like_header_row(row)
+                and not main.looks_like_category_row(row)
+                and main.has_valid_rule_data(row, MAPPING)]
+    assert data["data_rows"] == expected
+    assert len(expected) == 3
@@ -0,0 +1,94 @@
+'''Manual sync jobs: one active job at a time, and progress recorded as the sync runs'''
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import make_workbook, rule_sheet
+from src.prback import jobs, main
+from src.prback.extensions import db
+from src.prback.models import SyncJob
+
+# Kept before no_job_threads patches it out
+run_sync_job = jobs.run_sync_job
+
+
+@pytest.fixture(autouse=True)
+def no_job_threads(monkeypatch):
+    started = []
+    monkeypatch.setattr(jobs, 'run_sync_job', lambda app, job_id: started.append(job_id))
+    return started
+
+
+def test_second_request_joins_the_active_job(app, no_job_threads):
+    first, created = jobs.enqueue_sync_job(app, 'alice')
+    second, created_again = jobs.enqueue_sync_job(app, 'bob')
+
+    assert (created, created_again) == (True, False)
+    assert second.id == first.id
+    assert no_job_threads == [first.id]
+
+
+def test_concurrent_insert_of_an_active_job_is_coalesced(app, monkeypatch):
+    existing, _ = jobs.enqueue_sync_job(app, 'alice')
+    find_active_job = jobs.find_active_job
+    calls = []
+
+    # The check runs before the other request's insert is visible
+    def stale_then_real():
+        calls.append(1)
+        return None if len(calls) == 1 else find_active_job()
+
+    monkeypatch.setattr(jobs, 'find_active_job', stale_then_real)
+    job, created = jobs.enqueue_sync_job(app, 'bob')
+
+    assert not created
+    assert job.id == existing.id
+    assert SyncJob.query.count() == 1
+
+
+def test_orphaned_job_is_expired_before_a_new_one_is_queued(app):
+    orphan = SyncJob(requested_by='alice', status='running', active_key=jobs.ACTIVE_JOB_KEY,
+                     created_at=datetime.utcnow() - timedelta(days=2))
+    db.session.add(orphan)
+    db.session.commit()
+
+    job, created = jobs.enqueue_sync_job(app, 'bob')
+
+    assert created and job.id != orphan.id
+    db.session.refresh(orphan)
+    assert (orphan.status, orphan.active_key) == ('failed', None)
+
+
+def test_job_records_stages_and_rows_as_the_sync_runs(app, monkeypatch):
+    job = SyncJob(requested_by='alice', status='queued', active_key=jobs.ACTIVE_JOB_KEY)
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+    stages = []
+
+    def fake_leased_sync(force, progress):
+        progress('fetch')
+        progress('upsert', 0)
+        for rows in (10, 20):
+            progress('upsert', rows, in_transaction=True)
+        stages.append(db.session.get(SyncJob, job_id).stage)
+        return 'synced'
+
+    monkeypatch.setattr(jobs, 'leased_sync', fake_leased_sync)
+    run_sync_job(app, job_id)
+
+    db.session.expire_all()
+    job = db.session.get(SyncJob, job_id)
+    assert stages == ['upsert']
+    assert (job.status, job.rows_processed, job.active_key) == ('succeeded', 20, None)
+
+
+def test_sync_to_mysql_reports_rows_per_written_chunk(monkeypatch):
+    monkeypatch.setitem(main.GOOGLE_SHEETS, 'UPSERT_CHUNK_SIZE', 2)
+    rules = [[f'10.0.0.{i}', f'app{i}', '10.9.0.1', 'db', 'tcp/443', f'rule {i}'] for i in range(5)]
+    sheet_structures, _ = main.load_excel_data(make_workbook({'Core': rule_sheet(*rules)}))
+    reported = []
+
+    main.sync_to_mysql(sheet_structures, sweep=True, progress=reported.append)
+
+    assert reported == [0, 2, 4, 5]
@@ -0,0 +1,100 @@
+'''The sync lease lets one worker sync at a time across every process sharing the database'''
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.prback import main
+from src.prback.extensions import db
+from src.prback.models import SyncLease
+
+
+def test_held_lease_cannot_be_taken_until_released():
+    holder = main.acquire_sync_lease()
+    assert holder
+
+    assert main.acquire_sync_lease() is None
+
+    main.release_sync_lease(holder)
+    assert main.acquire_sync_lease()
+    assert SyncLease.query.count() == 1
+
+
+def test_expired_lease_is_taken_over():
+    db.session.add(SyncLease(name=main.SYNC_LEASE_NAME, holder='crashed-worker',
+                             acquired_at=datetime.utcnow() - timedelta(hours=2),
+                             expires_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+
+    holder = main.acquire_sync_lease()
+
+    assert holder
+    lease = SyncLease.query.filter_by(name=main.SYNC_LEASE_NAME).one()
+    assert lease.holder == holder
+    assert lease.expires_at > datetime.utcnow()
+
+
+def test_release_leaves_another_holders_lease_alone():
+    holder = main.acquire_sync_lease()
+
+    main.release_sync_lease('some-other-worker')
+
+    assert main.acquire_sync_lease() is None
+    main.release_sync_lease(holder)
+
+
+def test_sync_is_skipped_while_another_worker_holds_the_lease(monkeypatch):
+    holder = main.acquire_sync_lease()
+    monkeypatch.setattr(main, 'sync_from_source', sync_without_lease)
+
+    assert main.leased_sync() == 'already_running'
+    main.release_sync_lease(holder)
+
+
+def test_lease_is_released_after_a_failed_sync(monkeypatch):
+    def failing_sync(force=False, progress=None):
+        raise RuntimeError('export unavailable')
+
+    monkeypatch.setattr(main, 'sync_from_source', failing_sync)
+
+    with pytest.raises(RuntimeError):
+        main.leased_sync()
+    assert main.acquire_sync_lease()
+
+
+def sync_without_lease(force=False, progress=None):
+    raise AssertionError('sync ran without the lease')
+
+
+def test_renewal_extends_the_lease_until_it_is_taken_over():
+    holder = main.acquire_sync_lease()
+    lease = SyncLease.query.filter_by(name=main.SYNC_LEASE_NAME).one()
+    lease.expires_at = datetime.utcnow() + timedelta(seconds=5)
+    db.session.commit()
+
+    assert main.renew_sync_lease(holder)
+    assert SyncLease.query.one().expires_at > datetime.utcnow() + timedelta(seconds=60)
+
+    SyncLease.query.one().holder = 'other-worker'
+    db.session.commit()
+    assert not main.renew_sync_lease(holder)
+    assert not main.release_sync_lease(holder)
+
+
+def test_sync_renews_its_lease_and_stops_once_it_is_lost(monkeypatch):
+    monkeypatch.setitem(main.GOOGLE_SHEETS, 'LEASE_TTL', 0)
+    stages = []
+
+    def long_sync(force=False, progress=None):
+        progress('fetch')
+        stages.append('fetch')
+        SyncLease.query.one().holder = 'other-worker'
+        db.session.commit()
+        progress('parse')
+        stages.append('parse')
+        return 'synced'
+
+    monkeypatch.setattr(main, 'sync_from_source', long_sync)
+
+    assert main.leased_sync() == 'lease_lost'
+    assert stages == ['fetch']
+    assert SyncLease.query.one().holder == 'other-worker'
@@ -0,0 +1,63 @@
+'''The sweep in sync_to_mysql removes rules gone from a sheet, never those of an empty sheet'''
+from conftest import make_workbook, rule_sheet
+from src.prback import main
+from src.prback.models import FirewallRule
+
+PAYROLL = [['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db'],
+           ['10.0.0.2', 'app3', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll replica']]
+BILLING = [['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']]
+
+
+def sync(sheets):
+    sheet_structures, failed_sheets = main.load_excel_data(make_workbook(sheets))
+    assert not failed_sheets
+    return main.sync_to_mysql(sheet_structures, sweep=True)
+
+
+def rule_descriptions():
+    return sorted(rule.description for rule in FirewallRule.query.all())
+
+
+def test_rules_gone_from_a_sheet_are_removed():
+    sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    result = sync({'Payroll': rule_sheet(PAYROLL[0]), 'Billing': rule_sheet(*BILLING)})
+
+    assert result['removed'] == 1
+    assert rule_descriptions() == ['billing api', 'payroll db']
+
+
+def test_sheet_without_rules_keeps_its_rules():
+    sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    result = sync({'Payroll': rule_sheet(PAYROLL[0]), 'Billing': rule_sheet()})
+
+    assert result['removed'] == 1
+    assert rule_descriptions() == ['billing api', 'payroll db']
+
+
+def test_missing_sheet_keeps_its_rules():
+    sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    result = sync({'Payroll': rule_sheet(*PAYROLL)})
+
+    assert result['removed'] == 0
+    assert len(rule_descriptions()) == 3
+
+
+def test_sweep_stamps_the_kept_rules_and_removes_older_generations():
+    first = sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    result = sync({'Payroll': rule_sheet(PAYROLL[0]), 'Billing': rule_sheet(*BILLING)})
+
+    assert result['generation'] == first['generation'] + 1
+    assert {rule.sync_generation for rule in FirewallRule.query} == {result['generation']}
+
+
+def test_sweep_without_removals_restamps_nothing():
+    first = sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    result = sync({'Payroll': rule_sheet(*PAYROLL), 'Billing': rule_sheet(*BILLING)})
+
+    assert (result['removed'], result['generation']) == (0, first['generation'])
+    assert {rule.sync_generation for rule in FirewallRule.query} == {first['generation']}
@@ -0,0 +1,77 @@
+'''Validation verdicts and their exact messages, which the forms and bulk reports show as-is'''
+import pytest
+
+from src.prback.validation import (validate_ip, validate_service, validate_description,
+                                   validate_request_payload, validate_bulk_requests)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('10.0.0.1', (True, "")),
+    ('10.0.0.0/24, any, 192.168.1.1', (True, "")),
+    ('', (False, "Ip adress cannot be empty")),
+    ('10.0.0.0/33', (False, "Invalid CIDR prefix: 10.0.0.0/33, Must be 0-32")),
+    ('10.0.0', (False, "Invalid IP format: '10.0.0'. Expected format: x.x.x.x")),
+    ('300.1.1.1', (False, "Octet 1 is 300, must be 0-255")),
+    ('10.01.1.1', (False, "Octet 2 has leading zero: '01'")),
+    ('10.0.0.1, 10.0.0.256', (False, "Octet 4 is 256, must be 0-255")),
+])
+def test_ip_messages(value, expected):
+    assert validate_ip(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('tcp/443, https, 8000-8080, icmp', (True, "")),
+    ('', (False, "Service cannot be empty")),
+    ('icmp/300', (False, "ICMP type 300 out of range. Must be between 0-255")),
+    ('tcp/70000', (False, "Port 70000 out of range. Must be between 1-65535")),
+    ('0', (False, "Port 0 out of range. Must be between 1-65535")),
+    ('0-80', (False, "Start port 0 out of range. Must be between 1-65535")),
+    ('80-70000', (False, "End port 70000 out of range. Must be between 1-65535")),
+    ('90-80', (False, "Invalid range: 90 - 80. Start must be less than the end port")),
+    ('80-80', (False, "Use single port 80 instead of range 80-80")),
+    ('foo', (False, "Invalid service format: 'foo'. Use port (80), range (80-90), "
+                    "procol/port (tcp/80) or service name (http)")),
+])
+def test_service_messages(value, expected):
+    assert validate_service(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('nightly backup', (True, "")),
+    ('', (False, "Description cannot be empty")),
+    ('   ', (False, "Description too short (0 chars). Minimum 1 characters")),
+    ('x' * 501, (False, "Description too long (501 chars). Maximum 500 chars")),
+    ('a <b>', (False, "Description contains invalid character(s): '<'")),
+    ('please DROP  TABLE users', (False, "Description contains suspicious content")),
+])
+def test_description_messages(value, expected):
+    assert validate_description(value) == expected
+
+
+def test_payload_messages():
+    assert validate_request_payload({'sourceIP': '10.0.0.1'}) == [
+        "missing required field destinationIP",
+        "missing required field service",
+        "missing required field description",
+    ]
+    assert validate_request_payload({'sourceIP': '10.0.0.1', 'destinationIP': '1.2.3',
+                                     'service': 'foo', 'description': 'ok'}) == [
+        "destinationIP . Invalid IP format: '1.2.3'. Expected format: x.x.x.x",
+        "service . Invalid service format: 'foo'. Use port (80), range (80-90), "
+        "procol/port (tcp/80) or service name (http)",
+    ]
+
+
+def test_bulk_repeats_give_the_same_errors_per_row():
+    bad = {'sourceIP': '10.0.0.1', 'destinationIP': '10.0.0.2', 'service': 'tcp/0', 'description': 'x'}
+    good = {'sourceIP': '10.0.0.1', 'destinationIP': '10.0.0.2', 'service': 'tcp/80', 'description': 'x'}
+    unhashable = {**bad, 'sourceIP': ['10.0.0.1']}
+
+    errors = validate_bulk_requests([bad, good, dict(bad), bad, unhashable])
+
+    assert sorted(errors) == [0, 2, 3, 4]
+    assert errors[0] == errors[2] == errors[3] == [
+        "service . Port 0 out of range. Must be between 1-65535"]
+    # Each row gets its own list
+    errors[0].append('changed')
+    assert errors[3] == ["service . Port 0 out of range. Must be between 1-65535"]
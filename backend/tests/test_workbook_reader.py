@@ -0,0 +1,61 @@
+'''load_excel_data parses the downloaded workbook once and streams every sheet from it'''
+import openpyxl
+
+from conftest import make_workbook, rule_sheet
+from src.prback import main
+
+PAYROLL = ['10.0.0.1', 'app1', '10.0.1.0/24', 'db1', 'tcp/5432', 'payroll db']
+BILLING = ['10.0.2.1', 'app2', '10.0.3.5', 'db2', 'https', 'billing api']
+
+
+def test_workbook_is_opened_once_for_every_sheet(monkeypatch):
+    opened = []
+    load_workbook = openpyxl.load_workbook
+
+    def counting_load_workbook(*args, **kwargs):
+        opened.append(kwargs)
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(main.openpyxl, 'load_workbook', counting_load_workbook)
+    sheet_structures, failed_sheets = main.load_excel_data(make_workbook({
+        'Payroll': rule_sheet(PAYROLL), 'Billing': rule_sheet(BILLING), 'Empty': []}))
+
+    assert opened == [{'read_only': True, 'data_only': True}]
+    assert failed_sheets == []
+    assert list(sheet_structures) == ['Payroll', 'Billing', 'Empty']
+    assert sheet_structures['Payroll']['Uncategorized']['data_rows'] == [PAYROLL]
+    assert sheet_structures['Billing']['Uncategorized']['data_rows'] == [BILLING]
+
+
+def test_failed_sheet_is_reported_and_the_rest_still_parse(monkeypatch):
+    process_sheet = main.process_sheet_data_structured
+
+    def failing_process_sheet(sheet_rows, sheet_name):
+        if sheet_name == 'Billing':
+            raise ValueError('unreadable sheet')
+        return process_sheet(sheet_rows, sheet_name)
+
+    monkeypatch.setattr(main, 'process_sheet_data_structured', failing_process_sheet)
+    sheet_structures, failed_sheets = main.load_excel_data(make_workbook({
+        'Payroll': rule_sheet(PAYROLL), 'Billing': rule_sheet(BILLING)}))
+
+    assert failed_sheets == ['Billing']
+    assert sheet_structures['Billing'] == {}
+    assert sheet_structures['Payroll']['Uncategorized']['data_rows'] == [PAYROLL]
+
+
+def test_sheet_matrix_stringifies_cells_and_drops_empty_rows_and_columns():
+    rows = [(None, 'a', None, 1.5), (None, None, None, None), (2, 'b', None, None)]
+
+    assert main.sheet_matrix(rows) == [['', 'a', '1.5'], ['2', 'b', '']]
+    assert main.sheet_matrix(rows, drop_empty_rows=False) == [
+        ['', 'a', '1.5'], ['', '', ''], ['2', 'b', '']]
+
+
+def test_category_rows_group_the_rules_below_them():
+    sheet_structures, failed_sheets = main.load_excel_data(make_workbook({
+        'Payroll': rule_sheet(PAYROLL, category='Databases')}))
+
+    assert failed_sheets == []
+    assert list(sheet_structures['Payroll']) == ['Databases']
+    assert sheet_structures['Payroll']['Databases']['data_rows'] == [PAYROLL]
@@ -1,11 +1,18 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import '../css/reviewer.css';
 import { useNavigate } from 'react-router-dom';
 import LogoutButton from '../components/logout'
 import { API_BASE_URL } from '../config';
 
+const REQUESTS_PAGE_SIZE = 100;
+
 function ReviewerPage() {
   const [requests, setRequests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [stats, setStats] = useState({ total: 0, by_status: {}, categories: [], system_types: [] });
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Bumped on every first-page fetch so pages for an older filter are dropped
+  const listGeneration = useRef(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const navigate = useNavigate();
@@ -34,19 +41,43 @@ function ReviewerPage() {
     window.location.href = checkoutUrl
   };
 
-  const fetchRequests = async () => {
+  // /acl_requests is paginated and filtered on the server; each call returns one page and the cursor of the next
+  const fetchRequestPage = async (cursor = null) => {
+    const token = localStorage.getItem('token')
+    const params = new URLSearchParams({ limit: REQUESTS_PAGE_SIZE });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== "all") params.set(key, value);
+    });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/acl_requests?${params}`, {
+      headers: { "Authorization": `Bearer ${token}` }
+    });
+    if (!response.ok) throw new Error("Failed to fetch requests");
+    return response.json();
+  };
+
+  // Counts cover every request, not only the pages loaded so far
+  const fetchStats = async () => {
     try {
-      setLoading(true);
       const token = localStorage.getItem('token')
-      const response = await fetch(`${API_BASE_URL}/acl_requests`, {
+      const response = await fetch(`${API_BASE_URL}/api/v1/acl_requests/stats`, {
         headers: { "Authorization": `Bearer ${token}` }
       });
-      if (response.ok) {
-        const data = await response.json();
-        setRequests(data.acl_requests || []);
-      } else {
-        throw new Error("Failed to fetch requests");
-      }
+      if (!response.ok) throw new Error("Failed to fetch request counts");
+      setStats(await response.json());
+    } catch (err) {
+      setError(`Error loading request counts: ${err.message}`);
+    }
+  };
+
+  // Starts again from the first page, so a filter change drops the old cursor
+  const fetchRequests = async () => {
+    const generation = ++listGeneration.current;
+    try {
+      const data = await fetchRequestPage();
+      if (generation !== listGeneration.current) return;
+      setRequests(data.acl_requests || []);
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       setError(`Error loading requests: ${err.message}`);
     } finally {
@@ -54,6 +85,27 @@ function ReviewerPage() {
     }
   };
 
+  const refreshData = () => {
+    fetchRequests();
+    fetchStats();
+  };
+
+  const loadMoreRequests = async () => {
+    if (!nextCursor) return;
+    const generation = listGeneration.current;
+    try {
+      setLoadingMore(true);
+      const data = await fetchRequestPage(nextCursor);
+      if (generation !== listGeneration.current) return;
+      setRequests(prev => [...prev, ...(data.acl_requests || [])]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      setError(`Error loading requests: ${err.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateRequestStatus = async (requestId, newStatus, comments = "") => {
     try {
       const token = localStorage.getItem('token')
@@ -71,7 +123,7 @@ function ReviewerPage() {
       });
 
       if (response.ok) {
-        fetchRequests();
+        refreshData();
         if (selectedRequest && selectedRequest.id === requestId) {
           setSelectedRequest(prev => ({ ...prev, status: newStatus }));
         }
@@ -104,28 +156,21 @@ function ReviewerPage() {
       if (response.ok) {
         setNewComment("");
         fetchRequests();
-        const updatedReq = await fetch(`${API_BASE_URL}/acl_requests`, {
+        const updatedReq = await fetch(`${API_BASE_URL}/acl_requests/${requestId}`, {
           headers: { "Authorization": `Bearer ${token}` }
         });
         const data = await updatedReq.json();
-        const freshData = data.acl_requests.find(r => r.id === requestId);
-        if (freshData) setSelectedRequest(freshData);
+        if (data.request) setSelectedRequest(data.request);
       }
     } catch (err) {
       setError(`Error adding comment: ${err.message}`);
     }
   };
 
-  const filteredRequests = requests.filter(request => {
-    if (filters.status !== "all" && request.status !== filters.status) return false;
-    if (filters.category !== "all" && request.category !== filters.category) return false;
-    if (filters.system_type !== "all" && request.system_type !== filters.system_type) return false;
-    return true;
-  });
-
-  const getUniqueValues = (key) => [...new Set(requests.map(req => req[key]).filter(Boolean))];
+  const countStatus = (...statuses) => statuses.reduce((sum, status) => sum + (stats.by_status[status] || 0), 0);
 
-  useEffect(() => { fetchRequests(); }, []);
+  useEffect(() => { fetchStats(); }, []);
+  useEffect(() => { fetchRequests(); }, [filters]);
 
   const handleDownloadExcel = async () => {
     try {
@@ -185,28 +230,28 @@ function ReviewerPage() {
           <div className="stat-icon">📊</div>
           <div>
             <h3>Total Requests</h3>
-            <div className="number">{requests.length}</div>
+            <div className="number">{stats.total}</div>
           </div>
         </div>
         <div className="stat-card pending">
           <div className="stat-icon">⏳</div>
           <div>
             <h3>Pending</h3>
-            <div className="number">{requests.filter(r => r.status === 'Pending').length}</div>
+            <div className="number">{countStatus('Pending')}</div>
           </div>
         </div>
         <div className="stat-card approved">
           <div className="stat-icon">✅</div>
           <div>
             <h3>Approved</h3>
-            <div className="number">{requests.filter(r => ['Approved', 'Completed'].includes(r.status)).length}</div>
+            <div className="number">{countStatus('Approved', 'Completed')}</div>
           </div>
         </div>
         <div className="stat-card rejected">
           <div className="stat-icon">❌</div>
           <div>
             <h3>Rejected</h3>
-            <div className="number">{requests.filter(r => r.status === 'Rejected').length}</div>
+            <div className="number">{countStatus('Rejected')}</div>
           </div>
         </div>
       </div>
@@ -226,17 +271,17 @@ function ReviewerPage() {
           <label>Category</label>
           <select value={filters.category} onChange={e => setFilters({ ...filters, category: e.target.value })}>
             <option value="all">All Categories</option>
-            {getUniqueValues('category').map(c => <option key={c} value={c}>{c}</option>)}
+            {stats.categories.map(c => <option key={c} value={c}>{c}</option>)}
           </select>
         </div>
         <div className="filter-group">
           <label>System</label>
           <select value={filters.system_type} onChange={e => setFilters({ ...filters, system_type: e.target.value })}>
             <option value="all">All Systems</option>
-            {getUniqueValues('system_type').map(s => <option key={s} value={s}>{s}</option>)}
+            {stats.system_types.map(s => <option key={s} value={s}>{s}</option>)}
           </select>
         </div>
-        <button className="btn-icon" onClick={fetchRequests} title="Refresh Data">
+        <button className="btn-icon" onClick={refreshData} title="Refresh Data">
           <svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round"><path d="M21 2v6h-6"></path><path d="M3 12a9 9 0 0 1 15-6.7L21 8"></path><path d="M3 22v-6h6"></path><path d="M21 12a9 9 0 0 1-15 6.7L3 16"></path></svg>
         </button>
       </div>
@@ -256,10 +301,10 @@ function ReviewerPage() {
             </tr>
           </thead>
           <tbody>
-            {filteredRequests.length === 0 ? (
+            {requests.length === 0 ? (
               <tr><td colSpan="7" className="empty-cell">No requests match your filters.</td></tr>
             ) : (
-              filteredRequests.map(req => (
+              requests.map(req => (
                 <tr key={req.id}>
                   <td><span className="id-badge">#{req.id}</span></td>
                   <td>
@@ -291,6 +336,13 @@ function ReviewerPage() {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <div className="load-more">
+            <button className="btn-refresh" onClick={loadMoreRequests} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* MODAL */}